@@ -0,0 +1,163 @@
+"""
+End-to-end benchmark against the offline Reddit/OpenAI HTTP stand-ins in benchmarks/fakes.py.
+
+Drives RedditBot.post, reply and learn_and_post and BotManager.execute_command_for_all through
+unmodified PRAW and openai clients, and reports throughput plus p50/p95/p99 latency for each scenario.
+
+Usage:
+    python benchmarks/bench_e2e.py --bots 8 --iterations 50 --reddit-latency 0.05 --openai-latency 0.3
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.fakes import FakeOpenAIBackend, FakeRedditBackend, FakeTransport, LatencyModel
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of a list of numbers.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+def summarize(name, latencies, wall_time, failures=0):
+    return {
+        "scenario": name,
+        "operations": len(latencies),
+        "failures": failures,
+        "throughput": len(latencies) / wall_time if wall_time else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+def build_system(bots, reddit_latency, openai_latency, data_dir, parallel=True):
+    """
+    Build an AccountManager and BotManager whose shared Reddit and OpenAI sessions are served by
+    a FakeTransport over fresh fake backends, keeping their corpus and queue files under data_dir
+    (which the caller creates and removes). Returns (transport, bot_manager).
+    """
+    from core.account_manager import AccountManager
+    from core.bot_manager import BotManager
+    from core.http_session import session_factory
+    transport = FakeTransport(FakeRedditBackend(latency=reddit_latency), FakeOpenAIBackend(latency=openai_latency))
+    accounts = [
+        {"username": f"bench_bot_{i}", "password": "offline", "client_id": f"bench_client_{i}",
+         "client_secret": "offline", "user_agent": "bench_e2e"}
+        for i in range(bots)
+    ]
+    config = {
+        "accounts": accounts,
+        "subreddits": ["bench_subreddit"],
+        "openai_api_key": "offline",
+        "personalities": {},
+        "learning": {"corpus_dir": os.path.join(data_dir, "corpus")},
+        "execution": {"parallel": parallel, "max_workers": bots},
+        "http": {"pool_maxsize": max(bots, 4)},
+    }
+    reddit_sessions = session_factory(config, "reddit")
+    transport.mount(reddit_sessions())
+    account_manager = AccountManager(accounts, session_factory=reddit_sessions)
+    bot_manager = BotManager(config, account_manager)
+    transport.mount(bot_manager.openai_session_factory())
+    return transport, bot_manager
+
+def _time_each(operation, iterations):
+    latencies = []
+    failures = 0
+    start = time.perf_counter()
+    for i in range(iterations):
+        op_start = time.perf_counter()
+        if operation(i) is None:
+            failures += 1
+        latencies.append(time.perf_counter() - op_start)
+    return latencies, time.perf_counter() - start, failures
+
+def run_benchmarks(bots=4, iterations=20, reddit_latency=None, openai_latency=None, data_dir=None):
+    """
+    Run every scenario and return a list of summary dicts. Corpus files go to data_dir, or to a
+    temporary directory removed afterwards, so every run starts cold.
+    """
+    reddit_latency = reddit_latency or LatencyModel()
+    openai_latency = openai_latency or LatencyModel()
+    temporary_dir = None
+    if data_dir is None:
+        data_dir = temporary_dir = tempfile.mkdtemp(prefix="bench_e2e_")
+    try:
+        transport, bot_manager = build_system(bots, reddit_latency, openai_latency, data_dir=data_dir)
+        try:
+            return _run_scenarios(bot_manager, iterations)
+        finally:
+            bot_manager.shutdown()
+    finally:
+        if temporary_dir is not None:
+            shutil.rmtree(temporary_dir, ignore_errors=True)
+
+def _run_scenarios(bot_manager, iterations):
+    bot = bot_manager.get_bots()[0]
+    reports = []
+
+    latencies, wall, failures = _time_each(lambda i: bot.post(), iterations)
+    reports.append(summarize("RedditBot.post", latencies, wall, failures))
+
+    target = bot.reddit.subreddit("bench_subreddit").submit(title="Reply target", selftext="Reply here.")
+    thread = [target.reply("Top-level comment")]
+    for depth in range(5):
+        thread.append(thread[-1].reply(f"Nested comment {depth}"))
+    latencies, wall, failures = _time_each(lambda i: bot.reply(thread[i % len(thread)]), iterations)
+    reports.append(summarize("RedditBot.reply", latencies, wall, failures))
+
+    latencies, wall, failures = _time_each(lambda i: bot.learn_and_post("bench_subreddit"), iterations)
+    reports.append(summarize("RedditBot.learn_and_post", latencies, wall, failures))
+
+    for parallel in (False, True):
+        def fan_out(i):
+            results = bot_manager.execute_command_for_all("post", parallel=parallel)
+            return results if all(result.ok for result in results) else None
+        latencies, wall, failures = _time_each(fan_out, max(1, iterations // 4))
+        mode = "parallel" if parallel else "sequential"
+        reports.append(summarize(f"BotManager.execute_command_for_all[{mode}]", latencies, wall, failures))
+    return reports
+
+def print_reports(reports):
+    print(f"{'scenario':<48} {'ops':>5} {'fail':>5} {'ops/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for report in reports:
+        print(
+            f"{report['scenario']:<48} {report['operations']:>5} {report['failures']:>5} {report['throughput']:>9.2f} "
+            f"{report['p50_ms']:>9.2f} {report['p95_ms']:>9.2f} {report['p99_ms']:>9.2f}"
+        )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark.")
+    parser.add_argument("--bots", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--reddit-latency", type=float, default=0.05, help="mean seconds per Reddit request")
+    parser.add_argument("--openai-latency", type=float, default=0.3, help="mean seconds per completion")
+    parser.add_argument("--jitter", type=float, default=0.25, help="jitter as a fraction of the mean")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="failure probability per request")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--data-dir", default=None, help="directory for corpus files (default: a fresh temporary one)")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args(argv)
+    reddit_latency = LatencyModel(args.reddit_latency, args.reddit_latency * args.jitter, args.error_rate, args.seed)
+    openai_latency = LatencyModel(args.openai_latency, args.openai_latency * args.jitter, args.error_rate, args.seed)
+    reports = run_benchmarks(args.bots, args.iterations, reddit_latency, openai_latency, data_dir=args.data_dir)
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        print_reports(reports)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Memory retrieval benchmark: fills a MemoryStore with synthetic posts (Zipf-distributed vocabulary,
+like real text) and measures MemoryStore.retrieve latency for thread-sized queries.
+
+Usage:
+    python benchmarks/bench_memory.py --entries 200000 --queries 200
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.bench_e2e import percentile
+from core.memory_store import MemoryStore
+
+def run_benchmark(path, entries, queries, vocabulary=30000, entry_words=40, query_words=300, seed=1):
+    """
+    Return (seconds to insert all entries, list of retrieval latencies in seconds).
+    """
+    rng = random.Random(seed)
+    words = [f"word{index}" for index in range(vocabulary)]
+    cumulative = list(itertools.accumulate(1 / (rank + 1) for rank in range(vocabulary)))
+    store = MemoryStore(path, max_entries=entries)
+    start = time.perf_counter()
+    db = store._connect()
+    with store._lock:
+        for _ in range(entries):
+            store._insert(db, "post", " ".join(rng.choices(words, cum_weights=cumulative, k=entry_words)), None, 0)
+        db.commit()
+    inserted = time.perf_counter() - start
+    latencies = []
+    for _ in range(queries):
+        query = " ".join(rng.choices(words, cum_weights=cumulative, k=query_words))
+        start = time.perf_counter()
+        store.retrieve(query, top_k=5)
+        latencies.append(time.perf_counter() - start)
+    store.close()
+    return inserted, latencies
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure memory store retrieval latency.")
+    parser.add_argument("--entries", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--path", default=None, help="SQLite file to use (default: a temporary file)")
+    args = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory() as directory:
+        inserted, latencies = run_benchmark(args.path or os.path.join(directory, "bench.db"), args.entries, args.queries)
+    latencies = [latency * 1000 for latency in latencies]
+    print(f"inserted {args.entries} entries in {inserted:.1f}s")
+    print(f"retrieve ms: median {statistics.median(latencies):.2f}  p95 {percentile(latencies, 95):.2f}  "
+          f"max {max(latencies):.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Startup-time benchmark: measures how long a fresh interpreter takes to import the bot system
+and construct AccountManager and BotManager for a large account file.
+
+Usage:
+    python benchmarks/bench_startup.py --accounts 1000 --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from core.account_manager import AccountManager
+from core.bot_manager import BotManager
+imported = time.perf_counter()
+accounts = [
+    {"username": f"bot_user_{i}", "password": "pass", "client_id": f"cid{i}",
+     "client_secret": f"cs{i}", "user_agent": f"ua{i}"}
+    for i in range(int(sys.argv[1]))
+]
+config = {"accounts": accounts, "openai_api_key": "dummy_key", "personalities": {}}
+account_manager = AccountManager(accounts)
+bot_manager = BotManager(config, account_manager)
+ready = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "construct_ms": (ready - imported) * 1000,
+    "total_ms": (ready - start) * 1000,
+    "praw_imported": "praw" in sys.modules,
+    "openai_imported": "openai" in sys.modules,
+}))
+"""
+
+def measure_startup(accounts, repeat):
+    """
+    Run the startup script in fresh interpreters and return one result dict per run.
+    """
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT, str(accounts)],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return runs
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure bot system startup time.")
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    runs = measure_startup(args.accounts, args.repeat)
+    for key in ("import_ms", "construct_ms", "total_ms"):
+        values = [run[key] for run in runs]
+        print(f"{key:>13}: median {statistics.median(values):8.2f}  min {min(values):8.2f}  max {max(values):8.2f}")
+    print(f"praw imported: {runs[0]['praw_imported']}, openai imported: {runs[0]['openai_imported']}")
+
+if __name__ == "__main__":
+    main()
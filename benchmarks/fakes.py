@@ -0,0 +1,304 @@
+"""
+Offline stand-ins for the Reddit and OpenAI HTTP APIs this project uses.
+
+FakeTransport is a requests transport adapter. Mounted on the shared sessions from
+core/http_session.py, it answers the requests PRAW and the openai client send with canned JSON
+from FakeRedditBackend and FakeOpenAIBackend. PRAW, prawcore and openai run unmodified, including
+OAuth, response parsing, rate-limit headers and retries, so measurements include their cost.
+Latency and error rates are configurable per backend.
+"""
+import itertools
+import json
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+class LatencyModel:
+    def __init__(self, mean=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        """
+        Simulated request cost.
+
+        Parameters:
+            mean: Average latency in seconds.
+            jitter: Maximum deviation from the mean, drawn uniformly.
+            error_rate: Probability (0-1) that a request fails with HTTP 503.
+            seed: Optional seed for reproducible runs.
+        """
+        self.mean = mean
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        """
+        Return (delay in seconds, whether the request fails) for one request.
+        """
+        with self._lock:
+            delay = max(0.0, self.mean + self._random.uniform(-self.jitter, self.jitter))
+            fail = self._random.random() < self.error_rate
+        return delay, fail
+
+
+def _listing(things):
+    return {"kind": "Listing", "data": {"after": None, "before": None, "dist": len(things),
+                                        "children": [thing.to_json() for thing in things]}}
+
+
+class FakeRedditBackend:
+    # Requests allowed per rate-limit window; generous so prawcore never has to pace the benchmark.
+    RATE_LIMIT = 100000
+    WINDOW = 600
+
+    def __init__(self, latency=None, seed_posts=25):
+        """
+        In-memory Reddit "server" shared by every account.
+
+        Parameters:
+            latency: LatencyModel applied to every request.
+            seed_posts: Number of submissions pre-populated in each subreddit on first access.
+        """
+        self.latency = latency or LatencyModel()
+        self.seed_posts = seed_posts
+        self.things = {}
+        self.subreddits = {}
+        self._used = {}
+        self._window_start = time.time()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_id(self):
+        with self._lock:
+            return format(next(self._ids), "x")
+
+    def listing(self, name):
+        with self._lock:
+            listing = self.subreddits.get(name)
+            if listing is not None:
+                return list(listing)
+            self.subreddits[name] = []
+        for i in range(self.seed_posts):
+            self.add_submission(name, f"Seed post {i} in r/{name}", f"Body of seed post {i}. " * 5, None)
+        with self._lock:
+            return list(self.subreddits[name])
+
+    def add_submission(self, subreddit_name, title, selftext, author):
+        submission = FakeSubmission(self.next_id(), subreddit_name, title, selftext, author)
+        with self._lock:
+            self.things[submission.fullname] = submission
+            self.subreddits.setdefault(subreddit_name, []).insert(0, submission)
+        return submission
+
+    def add_comment(self, parent_fullname, body, author):
+        with self._lock:
+            parent = self.things[parent_fullname]
+        comment = FakeComment(self.next_id(), parent, body, author)
+        with self._lock:
+            self.things[comment.fullname] = comment
+            parent.children.append(comment)
+        return comment
+
+    def rate_limit_headers(self, username):
+        with self._lock:
+            now = time.time()
+            if now - self._window_start >= self.WINDOW:
+                self._window_start, self._used = now, {}
+            used = self._used[username] = self._used.get(username, 0) + 1
+            reset = int(self._window_start + self.WINDOW - now)
+        return {"x-ratelimit-used": str(used), "x-ratelimit-remaining": str(float(self.RATE_LIMIT - used)),
+                "x-ratelimit-reset": str(reset)}
+
+    def handle(self, method, path, params, form, username):
+        """
+        Answer one Reddit API request. Returns (operation, status, payload).
+        """
+        parts = [part for part in path.split("/") if part]
+        if parts == ["api", "v1", "me"]:
+            return "me", 200, {"name": username, "id": username, "created_utc": 0}
+        if len(parts) == 3 and parts[0] == "r" and parts[2] == "new":
+            return "listing", 200, _listing(self._new(parts[1], params))
+        if parts == ["api", "submit"] and method == "POST":
+            submission = self.add_submission(form["sr"], form["title"], form.get("text", ""), username)
+            return "submit", 200, {"json": {"errors": [], "data": {
+                "url": f"https://www.reddit.com/r/{form['sr']}/comments/{submission.id}/",
+                "id": submission.id, "name": submission.fullname}}}
+        if parts == ["api", "comment"] and method == "POST":
+            if form["thing_id"] not in self.things:
+                return "reply", 404, {"message": "Not Found", "error": 404}
+            comment = self.add_comment(form["thing_id"], form["text"], username)
+            return "reply", 200, {"json": {"errors": [], "data": {"things": [comment.to_json(replies=False)]}}}
+        if parts == ["api", "info"]:
+            fullnames = params.get("id", "").split(",")
+            return "info", 200, _listing([self.things[name] for name in fullnames if name in self.things])
+        if len(parts) >= 2 and parts[0] == "comments":
+            submission = self.things.get(f"t3_{parts[1]}")
+            if submission is None:
+                return "comments", 404, {"message": "Not Found", "error": 404}
+            return "comments", 200, [_listing([submission]), _listing(submission.children)]
+        return "unknown", 404, {"message": "Not Found", "error": 404}
+
+    def _new(self, name, params):
+        listing = self.listing(name)
+        limit = int(params.get("limit", 25))
+        before = params.get("before")
+        if before is not None:
+            newer = []
+            for submission in listing:
+                if submission.fullname == before:
+                    break
+                newer.append(submission)
+            # Reddit returns the submissions closest to the anchor.
+            return newer[-limit:]
+        return listing[:limit]
+
+
+class FakeSubmission:
+    def __init__(self, id, subreddit_name, title, selftext, author):
+        self.id = id
+        self.fullname = f"t3_{id}"
+        self.subreddit_name = subreddit_name
+        self.title = title
+        self.selftext = selftext
+        self.author = author
+        self.created_utc = time.time()
+        self.children = []
+
+    def to_json(self, replies=True):
+        return {"kind": "t3", "data": {
+            "id": self.id, "name": self.fullname, "title": self.title, "selftext": self.selftext,
+            "author": self.author or "[deleted]", "subreddit": self.subreddit_name,
+            "created_utc": self.created_utc, "num_comments": len(self.children),
+            "permalink": f"/r/{self.subreddit_name}/comments/{self.id}/"
+        }}
+
+
+class FakeComment:
+    def __init__(self, id, parent, body, author):
+        self.id = id
+        self.fullname = f"t1_{id}"
+        self.body = body
+        self.author = author
+        self.parent_id = parent.fullname
+        self.link_id = parent.fullname if isinstance(parent, FakeSubmission) else parent.link_id
+        self.subreddit_name = parent.subreddit_name
+        self.created_utc = time.time()
+        self.children = []
+
+    def to_json(self, replies=True):
+        return {"kind": "t1", "data": {
+            "id": self.id, "name": self.fullname, "body": self.body, "author": self.author or "[deleted]",
+            "parent_id": self.parent_id, "link_id": self.link_id, "subreddit": self.subreddit_name,
+            "created_utc": self.created_utc,
+            "replies": _listing(self.children) if replies and self.children else ""
+        }}
+
+
+class FakeOpenAIBackend:
+    def __init__(self, latency=None):
+        """
+        Chat completions endpoint. Token usage is estimated at four characters per token.
+        """
+        self.latency = latency or LatencyModel()
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def handle(self, method, path, body):
+        """
+        Answer one OpenAI API request. Returns (operation, status, payload).
+        """
+        if method != "POST" or not path.rstrip("/").endswith("/chat/completions"):
+            return "unknown", 404, {"error": {"message": "Not Found", "type": "invalid_request_error"}}
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        prompt = "".join(message["content"] for message in body.get("messages", []))
+        text = f"Generated title {call}\nGenerated body for call {call}."
+        prompt_tokens, completion_tokens = max(1, len(prompt) // 4), max(1, len(text) // 4)
+        return "chat_completion", 200, {
+            "id": f"chatcmpl-{call}", "object": "chat.completion", "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens}
+        }
+
+
+class FakeTransport(HTTPAdapter):
+    def __init__(self, reddit=None, openai=None):
+        """
+        requests transport adapter serving www.reddit.com and oauth.reddit.com from a
+        FakeRedditBackend and api.openai.com from a FakeOpenAIBackend. It subclasses HTTPAdapter so it
+        can be mounted in place of the real adapter; nothing leaves the process.
+
+        Parameters:
+            reddit: FakeRedditBackend answering Reddit requests.
+            openai: FakeOpenAIBackend answering OpenAI requests.
+        """
+        super().__init__()
+        self.reddit = reddit or FakeRedditBackend()
+        self.openai = openai or FakeOpenAIBackend()
+        self.request_counts = {}
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def mount(self, session):
+        """
+        Route every request of a requests.Session through this transport. Returns the session.
+        """
+        session.mount("https://", self)
+        session.mount("http://", self)
+        return session
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        url = urlsplit(request.url)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        body = request.body.decode() if isinstance(request.body, bytes) else (request.body or "")
+        headers = {}
+        if url.hostname == "api.openai.com":
+            backend = self.openai
+            operation, status, payload = backend.handle(request.method, url.path, json.loads(body or "{}"))
+        elif url.hostname in ("www.reddit.com", "oauth.reddit.com"):
+            backend = self.reddit
+            form = {key: values[-1] for key, values in parse_qs(body).items()}
+            if url.path.rstrip("/") == "/api/v1/access_token":
+                operation, status, payload = "access_token", 200, self._token(form.get("username"))
+            else:
+                username = self._username(request.headers.get("Authorization", ""))
+                operation, status, payload = backend.handle(request.method, url.path, params, form, username)
+                headers.update(backend.rate_limit_headers(username))
+        else:
+            raise requests.ConnectionError(f"FakeTransport has no backend for {url.hostname}", request=request)
+        delay, fail = backend.latency.draw()
+        if delay:
+            time.sleep(delay)
+        if fail:
+            status, payload = 503, {"message": f"simulated {operation} failure", "error": 503}
+        with self._lock:
+            self.request_counts[operation] = self.request_counts.get(operation, 0) + 1
+        return self._response(request, status, payload, headers)
+
+    def _token(self, username):
+        with self._lock:
+            token = f"fake-token-{len(self._tokens) + 1}"
+            self._tokens[token] = username
+        return {"access_token": token, "token_type": "bearer", "expires_in": 86400, "scope": "*"}
+
+    def _username(self, authorization):
+        with self._lock:
+            return self._tokens.get(authorization.rpartition(" ")[2])
+
+    def _response(self, request, status, payload, headers):
+        response = requests.Response()
+        response.status_code = status
+        response.reason = "OK" if status < 400 else "Error"
+        response._content = json.dumps(payload).encode()
+        response.headers = CaseInsensitiveDict({"Content-Type": "application/json; charset=UTF-8", **headers})
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
@@ -0,0 +1,303 @@
+import asyncio
+import contextlib
+from bots.reddit_bot import RedditBot
+from core.metrics import REGISTRY
+
+
+class ThreadSnapshot:
+    def __init__(self, target, thread_parts):
+        """
+        Plain copy of a reply target and its thread, read on the event loop, so content providers
+        can build reply context without making Reddit requests of their own.
+
+        Parameters:
+            target: The asyncpraw submission or comment (fetched).
+            thread_parts: Context parts ordered from the submission down to the target itself.
+        """
+        self.id = target.id
+        self.fullname = target.fullname
+        self.thread_parts = thread_parts
+        if self.fullname.startswith("t3_"):
+            self.title = target.title
+            self.selftext = target.selftext
+        else:
+            self.body = target.body
+
+
+class AsyncRedditBot(RedditBot):
+    # Reply targets may be given as fullnames, URLs or queued {"fullname": ...} dicts; they are
+    # resolved on the event loop (see CommandWorker.run_once).
+    resolves_targets = True
+    # Ancestors read when collecting a comment's thread context.
+    MAX_THREAD_DEPTH = 10
+
+    def __init__(self, account_manager, config, pool=None, **kwargs):
+        """
+        RedditBot on asyncpraw (reddit.backend: asyncpraw). handle_command and the commands it runs
+        are coroutines, so many bots' Reddit requests can be in flight on one event loop.
+
+        Content generation stays synchronous and runs in the loop's default executor, so a slow
+        model call does not hold up other bots' Reddit I/O.
+
+        Parameters:
+            account_manager: An instance of AccountManager.
+            config: The configuration dictionary.
+            pool: Optional GenerationPool running the event loop; its per-loop semaphore bounds the
+                Reddit requests in flight across all bots.
+            **kwargs: As for RedditBot. reddit_factory is called on the event loop and should return
+                an asyncpraw Reddit instance.
+        """
+        super().__init__(account_manager, config, **kwargs)
+        self.pool = pool
+
+    @property
+    def reddit(self):
+        # Built by areddit() on the event loop; None until the first command.
+        return self._reddit
+
+    @reddit.setter
+    def reddit(self, reddit_instance):
+        self._reddit = reddit_instance
+
+    async def areddit(self):
+        if self._reddit is None:
+            if self._reddit_factory is None:
+                raise RuntimeError(f"No Reddit instance for {self.username}")
+            self._reddit = self._reddit_factory()
+        return self._reddit
+
+    async def aclose(self):
+        """
+        Close the asyncpraw instance (and its HTTP session). It is rebuilt on the next command.
+        """
+        reddit, self._reddit = self._reddit, None
+        if reddit is not None:
+            await reddit.close()
+
+    async def _areddit_call(self, operation, coro_factory):
+        """
+        Await an asyncpraw call under the reddit deadline, retry policy and circuit breaker, like
+        RedditBot._reddit_call. Submits and replies are never retried.
+        """
+        async def attempt():
+            limiter = self.pool.semaphore() if self.pool is not None else contextlib.nullcontext()
+            async with limiter:
+                self._note_write(operation)
+                with REGISTRY.time_request("reddit", operation, bot=self.username):
+                    return await coro_factory()
+        return await self.resilience.acall(operation, attempt, idempotent=operation not in self.NON_IDEMPOTENT)
+
+    async def _run_blocking(self, fn, *args):
+        # Content generation and file/SQLite I/O (memory, corpus, style profiles) run in the loop's
+        # default executor so they do not stall other bots' Reddit requests.
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, fn, *args)
+
+    async def resolve(self, target):
+        """
+        Turn a fullname (t3_abc, t1_def), a submission/comment URL or a queued {"fullname": ...}
+        dict into a lazy asyncpraw object. Lists are resolved item by item; objects pass through.
+        """
+        if isinstance(target, (list, tuple)):
+            return [await self.resolve(item) for item in target]
+        if isinstance(target, dict) and "fullname" in target:
+            target = target["fullname"]
+        if not isinstance(target, str):
+            return target
+        reddit = await self.areddit()
+        if target.startswith(("http://", "https://")):
+            path = [part for part in target.rstrip("/").split("/comments/")[-1].split("/") if part]
+            if "/comments/" in target and len(path) >= 3:
+                return await reddit.comment(url=target, fetch=False)
+            return await reddit.submission(url=target, fetch=False)
+        prefix, _, thing_id = target.partition("_")
+        if prefix == "t3":
+            return await reddit.submission(thing_id, fetch=False)
+        if prefix == "t1":
+            return await reddit.comment(thing_id, fetch=False)
+        raise ValueError(f"Unsupported target {target}")
+
+    async def snapshot(self, target, memo=None):
+        """
+        Read target and up to MAX_THREAD_DEPTH of its ancestors and return a ThreadSnapshot for the
+        content provider.
+
+        A comment is refreshed with its context, which brings its nearest ancestors along in the
+        same response, so the walk up the thread only makes requests for the submission and for
+        ancestors beyond that context.
+
+        Parameters:
+            target: Submission, comment or anything resolve() accepts.
+            memo: Optional dict shared between snapshots (see reply_many), so things several
+                targets have in common are read once.
+        """
+        memo = {} if memo is None else memo
+        node = await self._thread_node(await self.resolve(target), memo)
+        target = node
+        parts = []
+        for _ in range(self.MAX_THREAD_DEPTH + 1):
+            if not node.fullname.startswith("t1_"):
+                parts.append(f"Post Title: {node.title}\nPost Body: {node.selftext}")
+                break
+            if node.body:
+                parts.append(node.body)
+            node = await self._thread_node(await node.parent(), memo)
+        parts.reverse()
+        return ThreadSnapshot(target, parts)
+
+    async def _thread_node(self, node, memo):
+        # One read per thing across the memo; things that came with a comment's context are
+        # already fetched and cost nothing.
+        task = memo.get(node.fullname)
+        if task is None:
+            async def read():
+                if not getattr(node, "_fetched", False):
+                    fetch = node.refresh if node.fullname.startswith("t1_") else node.load
+                    await self._areddit_call("thread_context", fetch)
+                return node
+            task = memo[node.fullname] = asyncio.ensure_future(read())
+        return await task
+
+    async def post(self, content=None, idempotency_key=None):
+        """
+        Post to every configured subreddit concurrently. Returns the created submissions, or None
+        if nothing was posted.
+        """
+        title, body = content or await self._run_blocking(self.generate_post_content, None, idempotency_key)
+        if not self.subreddits:
+            self.logger.warning("No subreddits configured.")
+            return None
+        reddit = await self.areddit()
+
+        async def submit(sub):
+            try:
+                subreddit = await reddit.subreddit(sub)
+                submission = await self._areddit_call(
+                    "submit", lambda: subreddit.submit(title=title, selftext=body)
+                )
+                await self._run_blocking(self._remember, "post", f"Posted in r/{sub}: {title}\n{body}",
+                                         getattr(submission, "fullname", None))
+                self.logger.info(f"Posted to r/{sub} using account {self.username} (Submission ID: {submission.id})")
+                return submission
+            except Exception as e:
+                self.logger.error(f"Error posting to r/{sub}: {e}")
+                return None
+
+        submissions = [s for s in await asyncio.gather(*(submit(sub) for sub in self.subreddits)) if s is not None]
+        return submissions or None
+
+    async def reply(self, submission, content=None, snapshot=None):
+        """
+        Reply to a submission or comment. Returns the created comment, or None on failure.
+        """
+        try:
+            submission = await self.resolve(submission)
+            if content is None:
+                snapshot = snapshot or await self.snapshot(submission)
+                content = await self._run_blocking(self.generate_reply_content, snapshot, 0)
+            comment = await self._areddit_call("reply", lambda: submission.reply(content))
+            await self._run_blocking(self._remember, "reply",
+                                     f"Replied to: {self._target_text(snapshot or submission)}\n{content}",
+                                     getattr(comment, "fullname", None))
+            self.logger.info(
+                f"Replied to submission {submission.id} with comment {comment.id} using account {self.username}"
+            )
+            return comment
+        except Exception as e:
+            self.logger.error(f"Error replying to submission {getattr(submission, 'id', submission)}: {e}")
+            return None
+
+    async def reply_many(self, targets):
+        """
+        Reply to several submissions or comments: their threads are read concurrently, replies are
+        generated in batched model requests when the provider supports it, and posted concurrently.
+        Returns the created comments (None for failed replies), or None if no reply was posted.
+        """
+        try:
+            targets = await self.resolve(targets)
+            memo = {}
+            snapshots = await asyncio.gather(*(self.snapshot(target, memo) for target in targets))
+            if self.content_provider and hasattr(self.content_provider, "generate_reply_contents"):
+                texts = await self._run_blocking(self.content_provider.generate_reply_contents, snapshots, 0)
+            else:
+                texts = [await self._run_blocking(self.generate_reply_content, snapshot, 0) for snapshot in snapshots]
+        except Exception as e:
+            self.logger.error(f"Error generating replies for {len(targets)} target(s): {e}")
+            return None
+        comments = await asyncio.gather(*(
+            self.reply(target, text, snapshot) for target, text, snapshot in zip(targets, texts, snapshots)
+        ))
+        return comments if any(comment is not None for comment in comments) else None
+
+    async def handle_command(self, command, target=None, content=None, idempotency_key=None):
+        """
+        Coroutine version of RedditBot.handle_command. Profiles include the work of other bots
+        interleaved on the same event loop.
+        """
+        if self.profiler is not None:
+            with self.profiler.profile(command, bot=self.username):
+                return await self._handle_command(command, target, content, idempotency_key)
+        return await self._handle_command(command, target, content, idempotency_key)
+
+    async def _handle_command(self, command, target=None, content=None, idempotency_key=None):
+        if command.lower() == "post":
+            return await self.post(content, idempotency_key)
+        elif command.lower() == "reply":
+            if isinstance(target, (list, tuple)):
+                return await self.reply_many(list(target))
+            if target is not None:
+                return await self.reply(target, content)
+            self.logger.error("No target provided for reply command.")
+        elif command.lower() == "learn_and_post":
+            if target is not None:
+                return await self.learn_and_post(target, idempotency_key)
+            self.logger.error("No subreddit provided for learn_and_post command.")
+        else:
+            self.logger.error(f"Unknown command: {command}")
+        return None
+
+    async def learn(self, subreddit_name, offline=False):
+        """
+        Coroutine version of RedditBot.learn: returns the subreddit's recent posts as learned
+        context, or None on failure.
+        """
+        if offline:
+            return await self._run_blocking(lambda: RedditBot.learn(self, subreddit_name, offline=True))
+        try:
+            subreddit = await (await self.areddit()).subreddit(subreddit_name)
+            if self.corpus_store is not None:
+                window = await self._areddit_call("listing", lambda: self.corpus_store.arefresh(subreddit, subreddit_name))
+                return await self._run_blocking(self._window_context, subreddit_name, window)
+            else:
+                async def fetch():
+                    return [submission async for submission in subreddit.new(limit=self.context_posts)]
+                submissions = await self._areddit_call("listing", fetch)
+                posts = [{"title": submission.title, "selftext": submission.selftext} for submission in submissions]
+        except Exception as e:
+            self.logger.error(f"Error learning from subreddit {subreddit_name}: {e}")
+            return None
+        return self._learned_context(posts)
+
+    async def learn_and_post(self, subreddit_name, idempotency_key=None):
+        """
+        Coroutine version of RedditBot.learn_and_post. Returns the new submission, or None on failure.
+        """
+        learned_context = await self.learn(subreddit_name)
+        if learned_context is None:
+            return None
+        if not self.content_provider:
+            self.logger.error("No content provider available for generating post content.")
+            return None
+        title, body = await self._run_blocking(self.generate_post_content, learned_context, idempotency_key)
+        try:
+            subreddit = await (await self.areddit()).subreddit(subreddit_name)
+            new_submission = await self._areddit_call("submit", lambda: subreddit.submit(title=title, selftext=body))
+            await self._run_blocking(self._remember, "post", f"Posted in r/{subreddit_name}: {title}\n{body}",
+                                     getattr(new_submission, "fullname", None))
+            self.logger.info(
+                f"Learned and posted to r/{subreddit_name} using account {self.username} (Submission ID: {new_submission.id})"
+            )
+            return new_submission
+        except Exception as e:
+            self.logger.error(f"Error posting to r/{subreddit_name}: {e}")
+        return None
@@ -1,7 +1,15 @@
 import logging
+import threading
+from core.metrics import REGISTRY
+from core.resilience import Resilience
 
 class RedditBot:
-    def __init__(self, account_manager, config, content_provider=None, reddit_instance=None, username=None):
+    # Operations that create content on Reddit.
+    NON_IDEMPOTENT = ("submit", "reply")
+
+    def __init__(self, account_manager, config, content_provider=None, reddit_instance=None, username=None,
+                 corpus_store=None, reddit_factory=None, content_provider_factory=None, profiler=None,
+                 memory_store=None, style_profiles=None):
         """
         RedditBot that can post, reply, and learn about a subreddit.
         
@@ -11,23 +19,106 @@ class RedditBot:
             content_provider: An optional content provider (e.g., OpenAIProvider) for generating posts/replies.
             reddit_instance: A dedicated Reddit instance for this bot/account.
             username: The Reddit account's username.
+            corpus_store: An optional SubredditCorpusStore used by learn_and_post to read subreddits incrementally.
+            reddit_factory: Optional callable that builds the Reddit instance on first use.
+            content_provider_factory: Optional callable that builds the content provider on first use.
+            profiler: Optional CommandProfiler that profiles every handled command.
+            memory_store: Optional MemoryStore that records every post and reply this bot makes.
+            style_profiles: Optional StyleProfileStore; learn then returns the subreddit's cached style
+                profile (built from the whole corpus window) instead of its most recent raw posts.
         """
         self.account_manager = account_manager
-        self.config = config
-        self.content_provider = content_provider
-        self.reddit = reddit_instance
+        self._content_provider = content_provider
+        self._content_provider_factory = content_provider_factory
+        self._reddit = reddit_instance
+        self._reddit_factory = reddit_factory
         self.username = username
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.corpus_store = corpus_store
+        self.profiler = profiler
+        self.memory_store = memory_store
+        self.style_profiles = style_profiles
+        # Submit/reply requests sent so far. Callers compare it before and after a command to tell
+        # a failure before anything was sent to Reddit (safe to retry) from one after.
+        self.write_attempts = 0
+        self._write_lock = threading.Lock()
+        self.apply_config(config)
+
+    def apply_config(self, config):
+        """
+        Read the settings this bot uses from config. Called again when the configuration is reloaded.
+        """
+        self.config = config
         self.subreddits = config.get("subreddits", [])
         self.chain_length = config.get("replies", {}).get("chain_length", 1)
+        self.context_posts = config.get("learning", {}).get("context_posts", 5)
+        self.resilience = Resilience.from_config(config, "reddit")
+
+    @property
+    def reddit(self):
+        if self._reddit is None and self._reddit_factory is not None:
+            self._reddit = self._reddit_factory()
+        return self._reddit
+
+    @reddit.setter
+    def reddit(self, reddit_instance):
+        self._reddit = reddit_instance
+
+    @property
+    def content_provider(self):
+        if self._content_provider is None and self._content_provider_factory is not None:
+            self._content_provider = self._content_provider_factory()
+        return self._content_provider
+
+    @content_provider.setter
+    def content_provider(self, content_provider):
+        self._content_provider = content_provider
 
     def get_reddit(self):
         if self.reddit is not None:
             return self.reddit
         return self.account_manager.get_next_account()
 
-    def generate_post_content(self, learned_context=None):
+    def _reddit_call(self, operation, fn, *args, **kwargs):
+        """
+        Run a PRAW call under the reddit deadline, retry policy and circuit breaker, recording each
+        attempt's latency and errors under this bot's name. Submits and replies are never retried,
+        since a request that timed out may still have gone through.
+        """
+        def attempt():
+            self._note_write(operation)
+            with REGISTRY.time_request("reddit", operation, bot=self.username):
+                return fn(*args, **kwargs)
+        return self.resilience.call(operation, attempt, idempotent=operation not in self.NON_IDEMPOTENT)
+
+    def _note_write(self, operation):
+        if operation in self.NON_IDEMPOTENT:
+            with self._write_lock:
+                self.write_attempts += 1
+
+    def _remember(self, kind, content, ref=None):
+        # A failing memory store must not fail the post or reply that was already made.
+        if self.memory_store is None:
+            return
+        try:
+            self.memory_store.add(kind, content, ref)
+        except Exception as e:
+            self.logger.warning(f"Could not record {kind} in memory: {e}")
+
+    @staticmethod
+    def _target_text(target, limit=200):
+        try:
+            return (getattr(target, "title", None) or getattr(target, "body", None) or "")[:limit]
+        except Exception:
+            return ""
+
+    def get_identity(self, reddit):
+        return self.account_manager.get_identity(reddit)
+
+    def generate_post_content(self, learned_context=None, idempotency_key=None):
         if self.content_provider:
+            if idempotency_key is not None:
+                return self.content_provider.generate_post_content(learned_context, idempotency_key=idempotency_key)
             return self.content_provider.generate_post_content(learned_context)
         return ("Default Title", "Default content body.")
 
@@ -36,77 +127,172 @@ class RedditBot:
             return self.content_provider.generate_reply_content(target, chain_index)
         return f"Default reply #{chain_index+1}"
 
-    def post(self):
-        title, body = self.generate_post_content()
+    def post(self, content=None, idempotency_key=None):
+        """
+        Post to every configured subreddit. Returns the created submissions, or None if nothing was posted.
+        idempotency_key identifies the command across retries, so a retry can reuse generated content.
+        """
+        title, body = content or self.generate_post_content(idempotency_key=idempotency_key)
         if not self.subreddits:
             self.logger.warning("No subreddits configured.")
-            return
+            return None
 
         reddit = self.get_reddit()
+        submissions = []
         for sub in self.subreddits:
             try:
                 subreddit = reddit.subreddit(sub)
-                submission = subreddit.submit(title=title, selftext=body)
+                submission = self._reddit_call("submit", subreddit.submit, title=title, selftext=body)
+                submissions.append(submission)
+                self._remember("post", f"Posted in r/{sub}: {title}\n{body}", getattr(submission, "fullname", None))
                 self.logger.info(
-                    f"Posted to r/{sub} using account {reddit.user.me()} (Submission ID: {submission.id})"
+                    f"Posted to r/{sub} using account {self.get_identity(reddit)} (Submission ID: {submission.id})"
                 )
             except Exception as e:
                 self.logger.error(f"Error posting to r/{sub}: {e}")
+        return submissions or None
 
-    def reply(self, submission):
-        reddit = self.get_reddit()
+    def reply(self, submission, content=None, reddit=None):
+        """
+        Reply to a submission or comment. Returns the created comment, or None on failure.
+        reddit is the instance the caller fetched submission with, when it is not the bot's own.
+        """
+        reddit = reddit or self.get_reddit()
         try:
-            reply_text = self.generate_reply_content(submission, 0)
-            comment = submission.reply(reply_text)
+            reply_text = content or self.generate_reply_content(submission, 0)
+            comment = self._reddit_call("reply", submission.reply, reply_text)
+            self._remember("reply", f"Replied to: {self._target_text(submission)}\n{reply_text}",
+                           getattr(comment, "fullname", None))
             self.logger.info(
-                f"Replied to submission {submission.id} with comment {comment.id} using account {reddit.user.me()}"
+                f"Replied to submission {submission.id} with comment {comment.id} using account {self.get_identity(reddit)}"
             )
+            return comment
         except Exception as e:
             self.logger.error(f"Error replying to submission {submission.id}: {e}")
+            return None
+
+    def reply_many(self, targets):
+        """
+        Reply to several submissions or comments, generating all replies in batched model requests
+        when the content provider supports it. Returns the created comments (None for failed replies),
+        or None if no reply was posted.
+        """
+        try:
+            if self.content_provider and hasattr(self.content_provider, "generate_reply_contents"):
+                texts = self.content_provider.generate_reply_contents(targets, 0)
+            else:
+                texts = [self.generate_reply_content(target, 0) for target in targets]
+        except Exception as e:
+            self.logger.error(f"Error generating replies for {len(targets)} target(s): {e}")
+            return None
+        comments = [self.reply(target, text) for target, text in zip(targets, texts)]
+        return comments if any(comment is not None for comment in comments) else None
 
-    def handle_command(self, command, target=None):
+    def handle_command(self, command, target=None, content=None, idempotency_key=None):
+        """
+        Run a command and return its result (the created submission(s) or comment), or None on failure.
+        A reply command given a list of targets replies to all of them.
+        """
+        if self.profiler is not None:
+            with self.profiler.profile(command, bot=self.username):
+                return self._handle_command(command, target, content, idempotency_key)
+        return self._handle_command(command, target, content, idempotency_key)
+
+    def _handle_command(self, command, target=None, content=None, idempotency_key=None):
         if command.lower() == "post":
-            self.post()
+            return self.post(content, idempotency_key)
         elif command.lower() == "reply":
+            if isinstance(target, (list, tuple)):
+                return self.reply_many(list(target))
             if target is not None:
-                self.reply(target)
-            else:
-                self.logger.error("No target provided for reply command.")
+                return self.reply(target, content)
+            self.logger.error("No target provided for reply command.")
         elif command.lower() == "learn_and_post":
             if target is not None:
-                self.learn_and_post(target)
-            else:
-                self.logger.error("No subreddit provided for learn_and_post command.")
+                return self.learn_and_post(target, idempotency_key)
+            self.logger.error("No subreddit provided for learn_and_post command.")
         else:
             self.logger.error(f"Unknown command: {command}")
+        return None
 
-    def learn_and_post(self, subreddit_name):
+    def learn(self, subreddit_name, offline=False):
         """
-        Learn about a subreddit by reading the first 5 posts (ignoring comments),
-        then generate and post content that reflects the subreddit's style combined with the bot's personality.
-        
+        Read a subreddit's most recent posts (ignoring comments) and return them as learned context,
+        or None on failure. With a corpus store, only posts newer than the stored window are fetched;
+        with offline=True the stored window is used as-is and Reddit is not contacted. With style
+        profiles enabled, the subreddit's style profile is returned instead of raw posts.
+
         Parameters:
             subreddit_name: The name of the subreddit to learn from.
+            offline: Only use the stored corpus.
         """
-        reddit = self.get_reddit()
-        subreddit = reddit.subreddit(subreddit_name)
-        learned_context = ""
         try:
-            for submission in subreddit.new(limit=5):
-                # Only learn from the post itself (title and selftext)
-                learned_context += f"Post Title: {submission.title}\nPost Body: {submission.selftext}\n\n"
+            if offline:
+                if self.corpus_store is None:
+                    return None
+                return self._window_context(subreddit_name, self.corpus_store.load(subreddit_name).get("posts", []))
+            elif self.corpus_store is not None:
+                subreddit = self.get_reddit().subreddit(subreddit_name)
+                window = self._reddit_call("listing", self.corpus_store.refresh, subreddit, subreddit_name)
+                return self._window_context(subreddit_name, window)
+            else:
+                subreddit = self.get_reddit().subreddit(subreddit_name)
+                submissions = self._reddit_call("listing", list, subreddit.new(limit=self.context_posts))
+                posts = [{"title": submission.title, "selftext": submission.selftext} for submission in submissions]
         except Exception as e:
             self.logger.error(f"Error learning from subreddit {subreddit_name}: {e}")
-            return
+            return None
+        return self._learned_context(posts)
+
+    def _window_context(self, subreddit_name, window):
+        """
+        Learned context from a corpus window (newest first): the style profile when style profiles
+        are enabled, else the most recent context_posts posts.
+        """
+        if self.style_profiles is not None and window:
+            try:
+                return self.style_profiles.get(subreddit_name, window)
+            except Exception as e:
+                self.logger.warning(f"Could not build style profile for r/{subreddit_name}, using raw posts: {e}")
+        return self._learned_context(window[:self.context_posts])
+
+    @staticmethod
+    def _learned_context(posts):
+        # Only learn from the post itself (title and selftext)
+        return "".join(
+            f"Post Title: {post['title']}\nPost Body: {post['selftext']}\n\n" for post in posts
+        )
+
+    def learn_and_post(self, subreddit_name, idempotency_key=None):
+        """
+        Learn about a subreddit from its most recent posts (ignoring comments),
+        then generate and post content that reflects the subreddit's style combined with the bot's personality.
+        With a corpus store, only posts newer than the stored window are fetched.
+        
+        Parameters:
+            subreddit_name: The name of the subreddit to learn from.
+            idempotency_key: Identifies the command across retries, so a retry can reuse generated content.
+
+        Returns the new submission, or None on failure.
+        """
+        learned_context = self.learn(subreddit_name)
+        if learned_context is None:
+            return None
 
         if self.content_provider:
-            title, body = self.content_provider.generate_post_content(learned_context)
+            reddit = self.get_reddit()
+            subreddit = reddit.subreddit(subreddit_name)
+            title, body = self.generate_post_content(learned_context, idempotency_key)
             try:
-                new_submission = subreddit.submit(title=title, selftext=body)
+                new_submission = self._reddit_call("submit", subreddit.submit, title=title, selftext=body)
+                self._remember("post", f"Posted in r/{subreddit_name}: {title}\n{body}",
+                               getattr(new_submission, "fullname", None))
                 self.logger.info(
-                    f"Learned and posted to r/{subreddit_name} using account {reddit.user.me()} (Submission ID: {new_submission.id})"
+                    f"Learned and posted to r/{subreddit_name} using account {self.get_identity(reddit)} (Submission ID: {new_submission.id})"
                 )
+                return new_submission
             except Exception as e:
                 self.logger.error(f"Error posting to r/{subreddit_name}: {e}")
         else:
             self.logger.error("No content provider available for generating post content.")
+        return None
@@ -1,9 +1,221 @@
-import yaml
+import logging
+import os
+import threading
 
-def load_config(filepath="config/config.yml"):
+DEFAULT_CONFIG_PATH = "config/config.yaml"
+
+# Content providers selectable in the provider section.
+PROVIDERS = ("openai", "local")
+BUDGET_POLICIES = ("queue", "degrade", "reject")
+REDDIT_BACKENDS = ("praw", "asyncpraw")
+# Top-level sections holding lists; every other section is a mapping.
+LIST_SECTIONS = ("accounts", "subreddits", "schedule")
+
+class ConfigError(ValueError):
+    pass
+
+
+class Config(dict):
+    """
+    Validated configuration. Behaves like the parsed YAML mapping, so the bot system reads it with
+    .get() lookups; sections left empty in the file are normalized to {} (or [] for lists).
+    """
+
+
+def _check_type(errors, value, expected, path):
+    if value is not None and not isinstance(value, expected):
+        names = expected.__name__ if isinstance(expected, type) else "/".join(t.__name__ for t in expected)
+        errors.append(f"{path} must be a {names}, got {type(value).__name__}")
+        return False
+    return value is not None
+
+def _check_positive(errors, section, key, path, allow_zero=False):
+    value = section.get(key)
+    if value is None:
+        return
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0 or (value == 0 and not allow_zero):
+        errors.append(f"{path}.{key} must be a {'non-negative' if allow_zero else 'positive'} number, got {value!r}")
+
+def validate_config(raw):
+    """
+    Validate a parsed configuration mapping and return it as a Config.
+    Raises ConfigError listing every problem found.
+    """
+    if raw is None:
+        raw = {}
+    if not isinstance(raw, dict):
+        raise ConfigError(f"Configuration must be a mapping, got {type(raw).__name__}")
+    # A section written as "learning:" with nothing under it parses as None; callers expect a mapping.
+    raw = {key: ([] if key in LIST_SECTIONS else {}) if value is None else value for key, value in raw.items()}
+    errors = []
+
+    if _check_type(errors, raw.get("accounts"), list, "accounts"):
+        seen = set()
+        for index, acc in enumerate(raw["accounts"]):
+            path = f"accounts[{index}]"
+            if not isinstance(acc, dict):
+                errors.append(f"{path} must be a mapping")
+                continue
+            username = acc.get("username")
+            if not isinstance(username, str) or not username:
+                errors.append(f"{path}.username is required")
+            elif username in seen:
+                errors.append(f"{path}.username {username!r} is duplicated")
+            seen.add(username)
+            for key in ("password", "client_id", "client_secret", "user_agent"):
+                _check_type(errors, acc.get(key), str, f"{path}.{key}")
+
+    if _check_type(errors, raw.get("subreddits"), list, "subreddits"):
+        for index, name in enumerate(raw["subreddits"]):
+            _check_type(errors, name, str, f"subreddits[{index}]")
+
+    if _check_type(errors, raw.get("posting"), dict, "posting"):
+        _check_positive(errors, raw["posting"], "interval", "posting")
+
+    if _check_type(errors, raw.get("replies"), dict, "replies"):
+        chain_length = raw["replies"].get("chain_length")
+        if chain_length is not None and (not isinstance(chain_length, int) or chain_length < 1):
+            errors.append(f"replies.chain_length must be an integer >= 1, got {chain_length!r}")
+
+    _check_type(errors, raw.get("openai_api_key"), str, "openai_api_key")
+    if _check_type(errors, raw.get("openai"), dict, "openai"):
+        for key in ("post_prompt", "reply_prompt"):
+            _check_type(errors, raw["openai"].get(key), str, f"openai.{key}")
+        _check_positive(errors, raw["openai"], "max_in_flight", "openai", allow_zero=True)
+        _check_positive(errors, raw["openai"], "context_token_budget", "openai")
+        _check_positive(errors, raw["openai"], "max_batch_size", "openai")
+
+    if _check_type(errors, raw.get("personalities"), dict, "personalities"):
+        for username, info in raw["personalities"].items():
+            if _check_type(errors, info, dict, f"personalities.{username}"):
+                for key in ("description", "memory"):
+                    _check_type(errors, info.get(key), str, f"personalities.{username}.{key}")
+
+    if _check_type(errors, raw.get("provider"), dict, "provider"):
+        provider_config = raw["provider"]
+        choices = [("provider.default", provider_config.get("default")), ("provider.fallback", provider_config.get("fallback"))]
+        if _check_type(errors, provider_config.get("bots"), dict, "provider.bots"):
+            choices += [(f"provider.bots.{username}", name) for username, name in provider_config["bots"].items()]
+        for path, name in choices:
+            if name is not None and name not in PROVIDERS:
+                errors.append(f"{path} must be one of {', '.join(PROVIDERS)}, got {name!r}")
+
+    if _check_type(errors, raw.get("budgets"), dict, "budgets"):
+        budget_config = raw["budgets"]
+        policy = budget_config.get("policy")
+        if policy is not None and policy not in BUDGET_POLICIES:
+            errors.append(f"budgets.policy must be one of {', '.join(BUDGET_POLICIES)}, got {policy!r}")
+        _check_positive(errors, budget_config, "max_wait", "budgets", allow_zero=True)
+        limits = [("budgets.global", budget_config.get("global")), ("budgets.per_bot", budget_config.get("per_bot"))]
+        if _check_type(errors, budget_config.get("bots"), dict, "budgets.bots"):
+            limits += [(f"budgets.bots.{username}", bot_limits) for username, bot_limits in budget_config["bots"].items()]
+        for path, bot_limits in limits:
+            if _check_type(errors, bot_limits, dict, path):
+                for key in ("tokens_per_minute", "tokens_per_day"):
+                    _check_positive(errors, bot_limits, key, path)
+
+    if _check_type(errors, raw.get("learning"), dict, "learning"):
+        for key in ("window_size", "fetch_limit", "context_posts", "profile_refresh_after", "profile_max_age",
+                    "profile_token_budget"):
+            _check_positive(errors, raw["learning"], key, "learning")
+        _check_positive(errors, raw["learning"], "profile_example_posts", "learning", allow_zero=True)
+
+    if _check_type(errors, raw.get("reddit"), dict, "reddit"):
+        backend = raw["reddit"].get("backend")
+        if backend is not None and backend not in REDDIT_BACKENDS:
+            errors.append(f"reddit.backend must be one of {', '.join(REDDIT_BACKENDS)}, got {backend!r}")
+        _check_positive(errors, raw["reddit"], "max_in_flight", "reddit")
+
+    for section in ("cache", "execution", "scheduler", "metrics", "queue", "mentions", "http", "resilience",
+                    "profiling", "memory"):
+        _check_type(errors, raw.get(section), dict, section)
+    if _check_type(errors, raw.get("schedule"), list, "schedule"):
+        for index, job in enumerate(raw["schedule"]):
+            if not isinstance(job, dict) or not isinstance(job.get("command"), str):
+                errors.append(f"schedule[{index}] must be a mapping with a command")
+
+    if errors:
+        raise ConfigError("Invalid configuration:\n  " + "\n  ".join(errors))
+    return Config(raw)
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+def _resolve_path(filepath):
     """
-    Load configuration from a YAML file.
+    Accept either the .yaml or the .yml spelling of the config file name.
     """
-    with open(filepath, 'r') as f:
-        config = yaml.safe_load(f)
+    if os.path.exists(filepath):
+        return filepath
+    root, ext = os.path.splitext(filepath)
+    alternative = {".yaml": ".yml", ".yml": ".yaml"}.get(ext)
+    if alternative and os.path.exists(root + alternative):
+        return root + alternative
+    return filepath
+
+def _stat_key(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def load_config(filepath=DEFAULT_CONFIG_PATH):
+    """
+    Load and validate configuration from a YAML file.
+    The parsed Config is cached per file and only re-parsed when the file's mtime or size changes.
+    """
+    path = _resolve_path(filepath)
+    key = _stat_key(path)
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+    import yaml
+    with open(path, 'r') as f:
+        config = validate_config(yaml.safe_load(f))
+    with _cache_lock:
+        _cache[path] = (key, config)
     return config
+
+
+def changed_sections(old, new):
+    """
+    Return the names of top-level sections that differ between two configurations.
+    """
+    old = old or {}
+    return {key for key in set(old) | set(new) if old.get(key) != new.get(key)}
+
+
+class ConfigWatcher:
+    def __init__(self, filepath=DEFAULT_CONFIG_PATH):
+        """
+        Watches a config file by mtime so running bots can pick up changes without a restart.
+        """
+        self.filepath = filepath
+        self.config = load_config(filepath)
+        self._key = _stat_key(_resolve_path(filepath))
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def poll(self):
+        """
+        Check the file for changes. Returns (config, changed_sections) when a valid new version was
+        loaded, or (None, set()) when nothing changed or the new version is invalid (the old one stays active).
+        """
+        path = _resolve_path(self.filepath)
+        try:
+            key = _stat_key(path)
+        except OSError as e:
+            self.logger.error(f"Cannot stat config file {path}: {e}")
+            return None, set()
+        if key == self._key:
+            return None, set()
+        self._key = key
+        try:
+            config = load_config(self.filepath)
+        except Exception as e:
+            self.logger.error(f"Ignoring invalid configuration change in {path}: {e}")
+            return None, set()
+        changed = changed_sections(self.config, config)
+        self.config = config
+        if changed:
+            self.logger.info(f"Configuration reloaded; changed sections: {', '.join(sorted(changed))}")
+        return (config, changed) if changed else (None, set())
@@ -1,28 +1,163 @@
-import praw
 import logging
 import threading
 
 class AccountManager:
-    def __init__(self, accounts):
-        self.reddit_instances = []
+    def __init__(self, accounts, session_factory=None):
+        """
+        Hands out Reddit instances for the configured accounts.
+        Instances (and the praw import) are created on first use, so startup cost does not
+        grow with the number of configured accounts.
+
+        Parameters:
+            accounts: The configured account dictionaries.
+            session_factory: Optional callable returning the requests.Session every Reddit instance
+                should use (see core/http_session.py), so all accounts share one tuned connection pool.
+        """
+        self.accounts = list(accounts)
+        self.session_factory = session_factory
         self._lock = threading.Lock()  # Remove if single-threaded.
         self.current_index = 0
-        for acc in accounts:
-            reddit = praw.Reddit(
-                client_id=acc.get("client_id"),
-                client_secret=acc.get("client_secret"),
-                username=acc.get("username"),
-                password=acc.get("password"),
-                user_agent=acc.get("user_agent", "MultiAccountBot")
-            )
-            self.reddit_instances.append(reddit)
+        self.usernames = [acc.get("username") for acc in self.accounts]
+        self._instances = [None] * len(self.accounts)
+        self._identities = {}
         self.logger = logging.getLogger(self.__class__.__name__)
-        self.logger.info(f"Initialized {len(self.reddit_instances)} Reddit account(s).")
+        self.logger.info(f"Configured {len(self.accounts)} Reddit account(s).")
+
+    @property
+    def reddit_instances(self):
+        """
+        All Reddit instances, creating any that have not been used yet.
+        """
+        return [self.get_instance(index) for index in range(len(self._instances))]
+
+    @reddit_instances.setter
+    def reddit_instances(self, instances):
+        with self._lock:
+            self._instances = list(instances)
+            self.current_index = 0
+
+    def get_instance(self, index):
+        """
+        Return the Reddit instance for the account at index, creating it on first use.
+        """
+        with self._lock:
+            reddit = self._instances[index]
+            if reddit is None:
+                reddit = self._build_reddit(self.accounts[index])
+                self._instances[index] = reddit
+                self.logger.info(f"Initialized Reddit instance for account: {self.usernames[index]}")
+            return reddit
+
+    def update_accounts(self, accounts):
+        """
+        Replace the account list after a configuration reload.
+        Instances of accounts whose settings are unchanged are kept; the rest are rebuilt on next use.
+        Returns the usernames of changed or removed accounts.
+        """
+        accounts = list(accounts)
+        with self._lock:
+            previous = {acc.get("username"): (acc, instance) for acc, instance in zip(self.accounts, self._instances)}
+            instances = []
+            for acc in accounts:
+                old_acc, instance = previous.get(acc.get("username"), (None, None))
+                instances.append(instance if old_acc == acc else None)
+            current = {acc.get("username"): acc for acc in accounts}
+            dropped = {username for username, (acc, _) in previous.items() if current.get(username) != acc}
+            kept = {id(instance) for instance in instances if instance is not None}
+            self._identities = {key: value for key, value in self._identities.items() if key in kept}
+            self.accounts = accounts
+            self.usernames = [acc.get("username") for acc in accounts]
+            self._instances = instances
+            self.current_index = 0
+        self.logger.info(f"Reconfigured {len(accounts)} Reddit account(s).")
+        return dropped
+
+    def set_session_factory(self, session_factory):
+        """
+        Use a new session factory after the http settings changed. Existing instances hold the old
+        session, so all of them are rebuilt on next use. Returns the usernames of every account.
+        """
+        with self._lock:
+            self.session_factory = session_factory
+            self._instances = [None] * len(self.accounts)
+            self._identities = {}
+        self.logger.info(f"Rebuilding {len(self.accounts)} Reddit instance(s) with new HTTP settings.")
+        return set(self.usernames)
+
+    def _build_reddit(self, acc):
+        import praw
+        kwargs = {}
+        if self.session_factory is not None:
+            session = self.session_factory()
+            kwargs["requestor_kwargs"] = {"session": session, "timeout": getattr(session, "read_timeout", 16.0)}
+        return praw.Reddit(
+            client_id=acc.get("client_id"),
+            client_secret=acc.get("client_secret"),
+            username=acc.get("username"),
+            password=acc.get("password"),
+            user_agent=acc.get("user_agent", "MultiAccountBot"),
+            **kwargs
+        )
+
+    def build_reddit(self, index):
+        """
+        Build a separate praw Reddit instance for the account at index, independent of the one
+        get_instance hands out. PRAW instances are not thread-safe, so a component running on
+        its own thread (the mention listener) uses one of these. The caller owns the instance.
+        """
+        with self._lock:
+            acc = self.accounts[index]
+            reddit = self._build_reddit(acc)
+        self.logger.info(f"Initialized separate Reddit instance for account: {acc.get('username')}")
+        return reddit
+
+    def build_async_reddit(self, index):
+        """
+        Build an asyncpraw Reddit instance for the account at index (reddit.backend: asyncpraw).
+        Instances are not cached here: the caller owns it and must close() it on the event loop
+        it was used on.
+        """
+        import asyncpraw
+        acc = self.accounts[index]
+        self.logger.info(f"Initialized asyncpraw Reddit instance for account: {acc.get('username')}")
+        return asyncpraw.Reddit(
+            client_id=acc.get("client_id"),
+            client_secret=acc.get("client_secret"),
+            username=acc.get("username"),
+            password=acc.get("password"),
+            user_agent=acc.get("user_agent", "MultiAccountBot")
+        )
 
     def get_next_account(self):
         with self._lock:
-            if not self.reddit_instances:
+            if not self._instances:
                 raise Exception("No Reddit accounts available")
-            reddit = self.reddit_instances[self.current_index]
-            self.current_index = (self.current_index + 1) % len(self.reddit_instances)
-            return reddit
+            index = self.current_index
+            self.current_index = (self.current_index + 1) % len(self._instances)
+        return self.get_instance(index)
+
+    def get_identity(self, reddit):
+        """
+        Return the account name for a Reddit instance.
+        Resolved lazily with reddit.user.me() on first use and cached for the life of the instance,
+        falling back to the configured username if the lookup fails.
+        """
+        key = id(reddit)
+        with self._lock:
+            cached = self._identities.get(key)
+            if cached is not None and cached[0] is reddit:
+                return cached[1]
+        try:
+            identity = str(reddit.user.me())
+        except Exception as e:
+            identity = self._configured_username(reddit)
+            self.logger.warning(f"Could not resolve identity, using configured username {identity}: {e}")
+        with self._lock:
+            self._identities[key] = (reddit, identity)
+        return identity
+
+    def _configured_username(self, reddit):
+        for index, instance in enumerate(self._instances):
+            if instance is reddit and index < len(self.usernames):
+                return self.usernames[index]
+        return "unknown"
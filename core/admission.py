@@ -0,0 +1,239 @@
+import logging
+import threading
+import time
+from collections import deque
+from core.metrics import REGISTRY
+
+POLICIES = ("queue", "degrade", "reject")
+
+# Budget settings and the window (seconds) each one limits.
+WINDOWS = (("tokens_per_minute", 60), ("tokens_per_day", 86400))
+
+
+class BudgetExceeded(RuntimeError):
+    pass
+
+
+class _Window:
+    def __init__(self, limit, seconds):
+        """
+        Sliding-window token counter. Entries are [timestamp, tokens, live] lists so a reservation
+        can be corrected to the tokens actually used after the response arrives.
+        """
+        self.limit = limit
+        self.seconds = seconds
+        self.used = 0
+        self.entries = deque()
+
+    def _expire(self, now):
+        while self.entries and self.entries[0][0] <= now - self.seconds:
+            entry = self.entries.popleft()
+            entry[2] = False
+            self.used -= entry[1]
+
+    def wait_time(self, now, tokens):
+        """
+        Seconds until tokens fit in the window (0 if they fit now, None if they never can).
+        """
+        if self.limit is None:
+            return 0.0
+        if tokens > self.limit:
+            return None
+        self._expire(now)
+        excess = self.used + tokens - self.limit
+        if excess <= 0:
+            return 0.0
+        for timestamp, used, _ in self.entries:
+            excess -= used
+            if excess <= 0:
+                return timestamp + self.seconds - now
+        return 0.0
+
+    def add(self, now, tokens):
+        self._expire(now)
+        entry = [now, tokens, True]
+        self.entries.append(entry)
+        self.used += tokens
+        return entry
+
+    def adjust(self, entry, tokens):
+        if entry[2]:
+            self.used += tokens - entry[1]
+        entry[1] = tokens
+
+
+class _Ticket:
+    def __init__(self, bot, tokens, entries):
+        self.bot = bot
+        self.tokens = tokens
+        self.entries = entries
+        self.settled = False
+
+
+class AdmissionController:
+    def __init__(self, global_limits=None, bot_limits=None, bot_overrides=None, policy="queue", max_wait=30.0,
+                 clock=time.monotonic, sleep=time.sleep):
+        """
+        Token budgets per bot and across all bots, per minute and per day, checked before every
+        model request. A request reserves its estimated tokens (prompt plus max_tokens); the
+        reservation is corrected to the usage the response reports, or released if the request fails.
+
+        Each bot is checked against its own budget before the global one, so a noisy bot runs out of
+        its own allowance long before it can use up the shared quota.
+
+        Parameters:
+            global_limits: {"tokens_per_minute": n, "tokens_per_day": n} shared by all bots (None = unlimited).
+            bot_limits: The same limits applied to each bot separately.
+            bot_overrides: {username: limits} replacing bot_limits for individual bots.
+            policy: What to do when a budget is used up: "queue" (wait up to max_wait seconds for
+                capacity, then give up), "degrade" or "reject" (give up at once). Giving up raises
+                BudgetExceeded; with "degrade" BotManager falls back to the local provider.
+            max_wait: Longest a request queues for capacity.
+            clock: Time source, replaceable in tests.
+            sleep: Sleep function, replaceable in tests.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown admission policy: {policy}")
+        self.policy = policy
+        self.max_wait = max_wait
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._global = self._windows(global_limits or {})
+        self.bot_limits = bot_limits or {}
+        self.bot_overrides = bot_overrides or {}
+        self._bots = {}
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Return a controller when budgets.enabled is set, else None.
+        """
+        budget_config = config.get("budgets", {})
+        if not budget_config.get("enabled", False):
+            return None
+        return cls(
+            global_limits=budget_config.get("global"),
+            bot_limits=budget_config.get("per_bot"),
+            bot_overrides=budget_config.get("bots"),
+            policy=budget_config.get("policy", "queue"),
+            max_wait=budget_config.get("max_wait", 30.0)
+        )
+
+    def apply_config(self, config):
+        """
+        Take new limits and policy from a reloaded configuration, keeping the usage already recorded.
+        """
+        budget_config = config.get("budgets", {})
+        with self._lock:
+            self.policy = budget_config.get("policy", "queue")
+            self.max_wait = budget_config.get("max_wait", 30.0)
+            self._set_limits(self._global, budget_config.get("global") or {})
+            self.bot_limits = budget_config.get("per_bot") or {}
+            self.bot_overrides = budget_config.get("bots") or {}
+            for bot, windows in self._bots.items():
+                self._set_limits(windows, self._limits_for(bot))
+
+    @staticmethod
+    def _windows(limits):
+        return [_Window(limits.get(setting), seconds) for setting, seconds in WINDOWS]
+
+    @staticmethod
+    def _set_limits(windows, limits):
+        for window, (setting, _) in zip(windows, WINDOWS):
+            window.limit = limits.get(setting)
+
+    def _limits_for(self, bot):
+        return {**self.bot_limits, **self.bot_overrides.get(bot, {})}
+
+    def _bot_windows(self, bot):
+        windows = self._bots.get(bot)
+        if windows is None:
+            windows = self._bots[bot] = self._windows(self._limits_for(bot))
+        return windows
+
+    def _try_admit(self, bot, tokens):
+        """
+        Reserve tokens if every budget has room. Returns (ticket, 0) on success, else (None, seconds
+        until there may be room) with None seconds when the request can never fit.
+        """
+        with self._lock:
+            now = self.clock()
+            windows = self._bot_windows(bot) + self._global
+            waits = [window.wait_time(now, tokens) for window in windows]
+            if any(wait is None for wait in waits):
+                return None, None
+            wait = max(waits)
+            if wait > 0:
+                return None, wait
+            return _Ticket(bot, tokens, [(window, window.add(now, tokens)) for window in windows]), 0.0
+
+    def _refuse(self, bot, tokens, waited):
+        REGISTRY.inc("admission_total", bot=bot, outcome="refused")
+        raise BudgetExceeded(f"Token budget exhausted for {bot} ({tokens} token(s) requested"
+                             + (f", waited {waited:.1f}s)" if waited else ")"))
+
+    def _admitted(self, ticket, waited):
+        REGISTRY.inc("admission_total", bot=ticket.bot, outcome="queued" if waited else "admitted")
+        if waited:
+            REGISTRY.observe("admission_wait_seconds", waited, bot=ticket.bot)
+        return ticket
+
+    def admit(self, bot, tokens):
+        """
+        Reserve tokens for one request by bot, queueing for capacity under the "queue" policy.
+        Returns a ticket for settle/release; raises BudgetExceeded when the request is not admitted.
+        """
+        start = self.clock()
+        while True:
+            ticket, wait = self._try_admit(bot, tokens)
+            if ticket is not None:
+                return self._admitted(ticket, self.clock() - start)
+            waited = self.clock() - start
+            if wait is None or self.policy != "queue" or waited + wait > self.max_wait:
+                self._refuse(bot, tokens, waited)
+            self.sleep(wait)
+
+    async def aadmit(self, bot, tokens):
+        """
+        admit() for coroutines: queueing waits without blocking the event loop.
+        """
+        import asyncio
+        start = self.clock()
+        while True:
+            ticket, wait = self._try_admit(bot, tokens)
+            if ticket is not None:
+                return self._admitted(ticket, self.clock() - start)
+            waited = self.clock() - start
+            if wait is None or self.policy != "queue" or waited + wait > self.max_wait:
+                self._refuse(bot, tokens, waited)
+            await asyncio.sleep(wait)
+
+    def settle(self, ticket, tokens):
+        """
+        Replace a ticket's reservation with the tokens the response actually used.
+        """
+        with self._lock:
+            if ticket.settled:
+                return
+            ticket.settled = True
+            for window, entry in ticket.entries:
+                window.adjust(entry, tokens)
+
+    def release(self, ticket):
+        """
+        Return a failed request's reservation.
+        """
+        self.settle(ticket, 0)
+
+    def usage(self, bot=None):
+        """
+        Tokens used in the current minute and day windows, for one bot or (bot=None) all bots.
+        """
+        with self._lock:
+            now = self.clock()
+            windows = self._global if bot is None else self._bot_windows(bot)
+            for window in windows:
+                window._expire(now)
+            return {setting: window.used for window, (setting, _) in zip(windows, WINDOWS)}
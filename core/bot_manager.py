@@ -1,57 +1,627 @@
+import functools
 import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from bots.reddit_bot import RedditBot
+from core.admission import AdmissionController, BudgetExceeded
+from core.corpus_store import SubredditCorpusStore
+from core.profiling import CommandProfiler
+from core.resilience import Resilience
+from core.style_profiles import StyleProfileStore
 from providers.openai_provider import OpenAIProvider
+from providers.thread_context import ThreadContextBuilder
+
+# Outcome of one bot's command: ok is True when the command ran without raising and produced a result.
+# wrote is False only when the command is known not to have sent a submit or reply to Reddit,
+# so a failed command can be retried safely.
+CommandResult = namedtuple("CommandResult", ["username", "command", "ok", "result", "error", "elapsed", "wrote"],
+                           defaults=(True,))
+
+class BotBusy(RuntimeError):
+    """
+    Reported instead of running a command while the bot's previous command (one that timed out) is still running.
+    """
 
 class BotManager:
-    def __init__(self, config, account_manager):
+    def __init__(self, config, account_manager, completion_client=None, profiler=None):
+        """
+        Parameters:
+            config: The configuration dictionary.
+            account_manager: The AccountManager supplying Reddit instances.
+            completion_client: Optional stand-in for openai.ChatCompletion passed to every provider
+                (used by the offline benchmarks).
+            profiler: Optional CommandProfiler; overrides the profiling config section (e.g. main.py --profile).
+        """
         self.config = config
+        self.completion_client = completion_client
         self.account_manager = account_manager
         self.bots = []
+        self.bots_by_username = {}
+        self.generation_pool = None
+        self.completion_cache = None
+        self.thread_context = ThreadContextBuilder()
+        learning_config = self.config.get("learning", {})
+        self.corpus_store = SubredditCorpusStore(
+            directory=learning_config.get("corpus_dir", "data/corpus"),
+            window_size=learning_config.get("window_size", 50),
+            fetch_limit=learning_config.get("fetch_limit", 25)
+        )
+        self.style_profiles = StyleProfileStore.from_config(self.config)
+        execution_config = self.config.get("execution", {})
+        self.parallel = execution_config.get("parallel", False)
+        self.max_workers = execution_config.get("max_workers", 8)
+        self.command_timeout = execution_config.get("timeout", None)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._running = {}  # username -> future of the command a worker thread is still running
+        self._running_lock = threading.Lock()
+        self.openai_session_factory = self._build_session_factory("openai")
+        self.profiler = profiler or CommandProfiler.from_config(self.config)
+        self.command_queue = None
+        if self.config.get("queue", {}).get("enabled", False):
+            from core.command_queue import CommandQueue
+            self.command_queue = CommandQueue.from_config(self.config)
+        self.memory_stores = {}
+        self.admission = AdmissionController.from_config(self.config)
+        self.reddit_backend = self.config.get("reddit", {}).get("backend", "praw")
+        self.reddit_pool = None
         self.logger = logging.getLogger(self.__class__.__name__)
         self._initialize_bots()
 
     def _initialize_bots(self):
-        accounts = self.config.get("accounts", [])
+        """
+        Create one RedditBot per configured account. Reddit instances and content providers
+        are built on first use, so startup does not pay for accounts a run never touches.
+        """
+        self._build_generation_pool()
+        self._build_completion_cache()
+        self._build_reddit_pool()
+        self._account_indices = {}
+        for i, acc in enumerate(self.config.get("accounts", [])):
+            username = acc.get("username")
+            self._account_indices[username] = i
+            self._add_bot(username)
+        self.logger.info(f"Initialized {len(self.bots)} RedditBot(s).")
+
+    def _add_bot(self, username):
+        kwargs = dict(username=username, corpus_store=self.corpus_store,
+                      content_provider_factory=functools.partial(self._build_content_provider, username),
+                      profiler=self.profiler, memory_store=self._memory_store(username),
+                      style_profiles=self.style_profiles)
+        if self.reddit_pool is not None:
+            from bots.async_reddit_bot import AsyncRedditBot
+            bot = AsyncRedditBot(self.account_manager, self.config, pool=self.reddit_pool,
+                                 reddit_factory=functools.partial(self._async_reddit_for, username), **kwargs)
+        else:
+            bot = RedditBot(self.account_manager, self.config,
+                            reddit_factory=functools.partial(self._reddit_for, username), **kwargs)
+        self.bots.append(bot)
+        self.bots_by_username[username] = bot
+        return bot
+
+    def _memory_store(self, username):
+        """
+        The bot's MemoryStore (one SQLite file per bot under memory.directory), or None when
+        memory.enabled is off. The file is opened on first use.
+        """
+        memory_config = self.config.get("memory", {})
+        if not memory_config.get("enabled", False):
+            return None
+        store = self.memory_stores.get(username)
+        if store is None:
+            from core.memory_store import MemoryStore
+            store = self.memory_stores[username] = MemoryStore(
+                path=os.path.join(memory_config.get("directory", "data/memory"), f"{username}.db"),
+                max_entries=memory_config.get("max_entries", 200000),
+                max_query_terms=memory_config.get("max_query_terms", 8)
+            )
+        return store
+
+    def _close_memory_stores(self, usernames=None):
+        for username in list(self.memory_stores if usernames is None else usernames):
+            store = self.memory_stores.pop(username, None)
+            if store is not None:
+                store.close()
+
+    def _reddit_for(self, username):
+        return self.account_manager.get_instance(self._account_indices[username])
+
+    def build_reddit_for(self, username):
+        """
+        Build a new praw instance for a bot's account, separate from the one the bot uses, for
+        callers on another thread (PRAW instances are not thread-safe).
+        """
+        return self.account_manager.build_reddit(self._account_indices[username])
+
+    def _async_reddit_for(self, username):
+        return self.account_manager.build_async_reddit(self._account_indices[username])
+
+    def _build_reddit_pool(self):
+        reddit_config = self.config.get("reddit", {})
+        if self.reddit_backend == "asyncpraw":
+            # Every bot's asyncpraw instance lives on this one loop; the pool bounds requests in flight.
+            from core.generation_pool import GenerationPool
+            self.reddit_pool = GenerationPool(reddit_config.get("max_in_flight", 32), name="RedditPool")
+
+    def _close_reddit_pool(self):
+        if self.reddit_pool is None:
+            return
+        self.reddit_pool.gather([bot.aclose() for bot in self.bots if hasattr(bot, "aclose")], return_exceptions=True)
+        self.reddit_pool.close()
+        self.reddit_pool = None
+
+    def _build_generation_pool(self):
+        openai_config = self.config.get("openai", {})
+        max_in_flight = openai_config.get("max_in_flight", 0)
+        if self.config.get("openai_api_key") and max_in_flight:
+            # asyncio is only imported when async generation is enabled.
+            from core.generation_pool import GenerationPool
+            self.generation_pool = GenerationPool(max_in_flight)
+
+    def _build_completion_cache(self):
+        cache_config = self.config.get("cache", {})
+        if self.config.get("openai_api_key") and cache_config.get("enabled", False):
+            from providers.completion_cache import CompletionCache
+            self.completion_cache = CompletionCache(
+                memory_max_entries=cache_config.get("memory_max_entries", 256),
+                memory_ttl=cache_config.get("memory_ttl", 3600),
+                disk_path=cache_config.get("disk_path"),
+                disk_ttl=cache_config.get("disk_ttl", 86400),
+                disk_max_entries=cache_config.get("disk_max_entries", 10000)
+            )
+
+    def apply_config(self, config, changed=None):
+        """
+        Apply a reloaded configuration to the running bots, rebuilding only what the change affects:
+        providers of bots whose personality changed (or all of them when the openai, cache, resilience
+        or http settings changed), Reddit instances of changed accounts (or all of them when the http
+        settings changed), and bots for added or removed accounts.
+        Subreddits, chain length and other per-call settings take effect on the next command.
+
+        Parameters:
+            config: The new configuration.
+            changed: Names of the top-level sections that changed. Computed when omitted.
+        """
+        from config.config import changed_sections
+        old_config = self.config
+        if changed is None:
+            changed = changed_sections(old_config, config)
+        self.config = config
+        if not changed:
+            return
+
+        if "execution" in changed:
+            execution_config = config.get("execution", {})
+            self.parallel = execution_config.get("parallel", False)
+            self.command_timeout = execution_config.get("timeout", None)
+            max_workers = execution_config.get("max_workers", 8)
+            if max_workers != self.max_workers:
+                self.max_workers = max_workers
+                with self._executor_lock:
+                    if self._executor is not None:
+                        self._executor.shutdown(wait=False)
+                        self._executor = None
+
+        if "profiling" in changed:
+            self.profiler = CommandProfiler.from_config(config)
+            for bot in self.bots:
+                bot.profiler = self.profiler
+
+        if "learning" in changed:
+            learning_config = config.get("learning", {})
+            self.corpus_store.directory = learning_config.get("corpus_dir", "data/corpus")
+            self.corpus_store.window_size = learning_config.get("window_size", 50)
+            self.corpus_store.fetch_limit = learning_config.get("fetch_limit", 25)
+            self.style_profiles = StyleProfileStore.from_config(config)
+            for bot in self.bots:
+                bot.style_profiles = self.style_profiles
+
+        if "budgets" in changed:
+            if self.admission is None or not config.get("budgets", {}).get("enabled", False):
+                self.admission = AdmissionController.from_config(config)
+            else:
+                # Keep the usage already recorded; only the limits and policy change.
+                self.admission.apply_config(config)
+
+        if "reddit" in changed:
+            # asyncpraw sessions belong to the old loop, so they are closed with it and rebuilt on next use.
+            self._close_reddit_pool()
+            backend = config.get("reddit", {}).get("backend", "praw")
+            switched = backend != self.reddit_backend
+            self.reddit_backend = backend
+            self._build_reddit_pool()
+            if switched:
+                usernames = [bot.username for bot in self.bots]
+                self.bots, self.bots_by_username = [], {}
+                for username in usernames:
+                    self._add_bot(username)
+                self.logger.info(f"Switched {len(usernames)} bot(s) to the {backend} backend.")
+            else:
+                for bot in self.bots:
+                    bot.pool = self.reddit_pool
+
+        if "memory" in changed:
+            self._close_memory_stores()
+            for bot in self.bots:
+                bot.memory_store = self._memory_store(bot.username)
+
+        rebuild_all = bool(changed & {"openai", "openai_api_key", "cache", "provider", "memory", "budgets",
+                                      "resilience", "http"})
+        old_openai = old_config.get("openai", {})
+        new_openai = config.get("openai", {})
+        if "openai_api_key" in changed or old_openai.get("max_in_flight") != new_openai.get("max_in_flight"):
+            if self.generation_pool is not None:
+                self.generation_pool.close()
+                self.generation_pool = None
+            self._build_generation_pool()
+        if changed & {"openai_api_key", "cache"}:
+            if self.completion_cache is not None:
+                self.completion_cache.close()
+                self.completion_cache = None
+            self._build_completion_cache()
+
+        rebuild = set()
+        if "personalities" in changed:
+            old_personalities = old_config.get("personalities", {})
+            new_personalities = config.get("personalities", {})
+            rebuild = {
+                bot.username for bot in self.bots
+                if old_personalities.get(bot.username) != new_personalities.get(bot.username)
+            }
+        if "subreddits" in changed:
+            # Local providers train on the stored corpus of the configured subreddits.
+            rebuild |= {bot.username for bot in self.bots if self.provider_name(bot.username) == "local"}
+
+        reconnect = set()
+        if "accounts" in changed:
+            reconnect = self._apply_accounts(config.get("accounts", []))
+        if "http" in changed:
+            # Sessions are shared, so new pool sizes and timeouts need new sessions for every client.
+            self.openai_session_factory = self._build_session_factory("openai")
+            set_session_factory = getattr(self.account_manager, "set_session_factory", None)
+            if set_session_factory is not None:
+                reconnect |= set_session_factory(self._build_session_factory("reddit"))
+
+        for bot in self.bots:
+            bot.apply_config(config)
+            if rebuild_all or bot.username in rebuild:
+                bot.content_provider = None
+            if bot.username in reconnect:
+                if self.reddit_pool is not None:
+                    self.reddit_pool.run(bot.aclose())
+                bot.reddit = None
+        self.logger.info(
+            f"Applied configuration change to {', '.join(sorted(changed))}: "
+            f"{len(self.bots) if rebuild_all else len(rebuild)} provider(s) and {len(reconnect)} account(s) rebuilt."
+        )
+
+    def _apply_accounts(self, accounts):
+        """
+        Add and remove bots to match the configured accounts. Returns the usernames whose Reddit
+        instance must be rebuilt.
+        """
+        reconnect = self.account_manager.update_accounts(accounts)
+        self._account_indices = {acc.get("username"): i for i, acc in enumerate(accounts)}
+        for bot in list(self.bots):
+            if bot.username not in self._account_indices:
+                self.bots.remove(bot)
+                del self.bots_by_username[bot.username]
+                if self.reddit_pool is not None:
+                    self.reddit_pool.run(bot.aclose())
+                self._close_memory_stores([bot.username])
+                self.logger.info(f"Removed bot for account: {bot.username}")
+        for username in self._account_indices:
+            if username not in self.bots_by_username:
+                self._add_bot(username)
+                self.logger.info(f"Added bot for account: {username}")
+        self.bots.sort(key=lambda bot: self._account_indices[bot.username])
+        return reconnect
+
+    def provider_name(self, username):
+        """
+        Provider configured for a bot: provider.bots.<username>, else provider.default, else openai
+        when an API key is configured and local otherwise.
+        """
+        provider_config = self.config.get("provider", {})
+        default = provider_config.get("default") or ("openai" if self.config.get("openai_api_key") else "local")
+        name = provider_config.get("bots", {}).get(username, default)
+        if name == "openai" and not self.config.get("openai_api_key"):
+            self.logger.warning(f"No OpenAI API key configured; using the local provider for {username}.")
+            name = "local"
+        return name
+
+    def _build_content_provider(self, username):
+        name = self.provider_name(username)
+        if name == "local":
+            provider = self._build_local_provider(username)
+        elif name == "openai":
+            provider = self._build_openai_provider(username)
+            fallback = self.config.get("provider", {}).get("fallback")
+            policy = self.admission.policy if self.admission is not None else None
+            if fallback == "local" or policy == "degrade":
+                from providers.base import FallbackProvider
+                # Under the reject policy, work refused for budget reasons is not redone locally.
+                provider = FallbackProvider(provider, self._build_local_provider(username), name=username,
+                                            no_fallback=(BudgetExceeded,) if policy == "reject" else ())
+        else:
+            self.logger.error(f"Unknown provider '{name}' for account {username}; using the local provider.")
+            provider = self._build_local_provider(username)
+        self.logger.info(f"Initialized {name} content provider for account: {username}")
+        return provider
+
+    def _build_local_provider(self, username):
+        from providers.local_provider import LocalProvider
+        personality_info = self.config.get("personalities", {}).get(username, {})
+        return LocalProvider(
+            personality=personality_info.get("description", ""),
+            memory=personality_info.get("memory", ""),
+            corpus_store=self.corpus_store,
+            subreddits=self.config.get("subreddits", []),
+            seed=self.config.get("provider", {}).get("seed"),
+            name=username
+        )
+
+    def _build_openai_provider(self, username):
         personalities = self.config.get("personalities", {})
         openai_config = self.config.get("openai", {})
-        post_prompt = openai_config.get("post_prompt")
-        reply_prompt = openai_config.get("reply_prompt")
-        openai_api_key = self.config.get("openai_api_key", None)
+        personality_info = personalities.get(username, {"description": "", "memory": ""})
+        provider_kwargs = {
+            "post_prompt": openai_config.get("post_prompt"),
+            "reply_prompt": openai_config.get("reply_prompt"),
+            "personality": personality_info.get("description", ""),
+            "memory": personality_info.get("memory", ""),
+            "cache": self.completion_cache,
+            "thread_context": self.thread_context,
+            "completion_client": self.completion_client,
+            "name": username,
+            "context_token_budget": openai_config.get("context_token_budget"),
+            "max_batch_size": openai_config.get("max_batch_size", 5),
+            "session_factory": self.openai_session_factory,
+            "request_timeout": self._openai_timeout(),
+            "resilience": Resilience.from_config(self.config, "openai"),
+            "admission": self.admission
+        }
+        memory_store = self.memory_stores.get(username)
+        if memory_store is not None:
+            # The configured memory becomes notes in the store, retrieved only when relevant.
+            memory_store.set_notes(provider_kwargs["memory"])
+            memory_config = self.config.get("memory", {})
+            provider_kwargs.update(memory_store=memory_store, memory_top_k=memory_config.get("top_k", 5),
+                                   memory_token_budget=memory_config.get("token_budget", 200))
+        openai_api_key = self.config.get("openai_api_key")
+        if self.generation_pool is not None:
+            from providers.async_openai_provider import AsyncOpenAIProvider
+            return AsyncOpenAIProvider(openai_api_key, pool=self.generation_pool, **provider_kwargs)
+        return OpenAIProvider(openai_api_key, **provider_kwargs)
 
-        for i, acc in enumerate(accounts):
-            username = acc.get("username")
-            personality_info = personalities.get(username, {"description": "", "memory": ""})
-            personality = personality_info.get("description", "")
-            memory = personality_info.get("memory", "")
-            content_provider = None
-            if openai_api_key:
-                content_provider = OpenAIProvider(
-                    openai_api_key,
-                    post_prompt=post_prompt,
-                    reply_prompt=reply_prompt,
-                    personality=personality,
-                    memory=memory
-                )
-            reddit_instance = self.account_manager.reddit_instances[i]
-            bot = RedditBot(self.account_manager, self.config, content_provider=content_provider,
-                            reddit_instance=reddit_instance, username=username)
-            self.bots.append(bot)
-            self.logger.info(f"Initialized RedditBot for account: {username}")
+    def _build_session_factory(self, client):
+        if "http" not in self.config:
+            return None
+        from core.http_session import session_factory
+        return session_factory(self.config, client)
+
+    def _openai_timeout(self):
+        if self.openai_session_factory is None:
+            return None
+        options = self.openai_session_factory.options
+        if "connect_timeout" not in options and "read_timeout" not in options:
+            return None
+        return (options.get("connect_timeout", 5.0), options.get("read_timeout", 30.0))
 
     def get_bots(self):
         return self.bots
 
-    def execute_command_for_all(self, command, target=None):
-        for bot in self.bots:
-            bot.handle_command(command, target)
+    def get_bot(self, bot_username):
+        return self.bots_by_username.get(bot_username)
+
+    def execute_command_for_all(self, command, target=None, parallel=None, timeout=None):
+        """
+        Run a command on every bot and return one CommandResult per bot, in bot order.
 
-    def execute_command_for_bot(self, bot_username, command, target=None):
-        found = False
+        Parameters:
+            command: The command name (post, reply, learn_and_post).
+            target: The command target (submission/comment for reply, subreddit name for learn_and_post).
+            parallel: Run bots concurrently on a bounded thread pool. Defaults to execution.parallel.
+            timeout: Seconds, counted from submission (time spent queued for a worker included), after
+                which a bot that has not finished is reported as timed out. Defaults to execution.timeout.
+                A timed-out command keeps running in the background, and the bot is reported as BotBusy
+                until it finishes.
+        """
+        if self.profiler is not None:
+            with self.profiler.profile(f"dispatch-{command}"):
+                return self._execute_command_for_all(command, target, parallel, timeout)
+        return self._execute_command_for_all(command, target, parallel, timeout)
+
+    def _execute_command_for_all(self, command, target=None, parallel=None, timeout=None):
+        parallel = self.parallel if parallel is None else parallel
+        timeout = self.command_timeout if timeout is None else timeout
+        prefetched = self._prefetch_content(command, target)
+        if self.reddit_pool is not None and parallel:
+            # All bots' commands run concurrently on the Reddit event loop; no worker threads needed.
+            return self.reddit_pool.gather([
+                self._arun_command(bot, command, target, prefetched.get(bot.username), timeout) for bot in self.bots
+            ])
+        if not parallel:
+            return [self._run_command(bot, command, target, prefetched.get(bot.username)) for bot in self.bots]
+
+        executor = self._get_executor()
+        submitted = time.perf_counter()
+        results = {}
+        futures = {}
         for bot in self.bots:
-            if bot.username == bot_username:
-                bot.handle_command(command, target)
-                self.logger.info(f"Executed command '{command}' for bot: {bot_username}")
-                found = True
+            busy = self._busy_result(bot, command)
+            if busy is not None:
+                results[bot.username] = busy
+                continue
+            future = executor.submit(self._run_command, bot, command, target, prefetched.get(bot.username))
+            self._track(bot.username, future)
+            futures[future] = bot
+        pending = set(futures)
+        while pending:
+            remaining = max(0.0, submitted + timeout - time.perf_counter()) if timeout else None
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[futures[future].username] = future.result()
+            elapsed = time.perf_counter() - submitted
+            if timeout and pending and elapsed >= timeout:
+                for future in pending:
+                    # The worker thread cannot be interrupted; it finishes in the background.
+                    bot = futures[future]
+                    self.logger.error(f"Command '{command}' timed out for bot {bot.username} after {timeout}s")
+                    results[bot.username] = CommandResult(
+                        bot.username, command, False, None, TimeoutError(f"timed out after {timeout}s"), elapsed
+                    )
                 break
-        if not found:
+        return [results[bot.username] for bot in self.bots]
+
+    def _track(self, username, future):
+        with self._running_lock:
+            self._running[username] = future
+        future.add_done_callback(lambda done: self._untrack(username, done))
+
+    def _untrack(self, username, future):
+        with self._running_lock:
+            if self._running.get(username) is future:
+                del self._running[username]
+
+    def _busy_result(self, bot, command):
+        """
+        CommandResult reporting the bot as busy when a previous command is still running, else None.
+        """
+        with self._running_lock:
+            if bot.username not in self._running:
+                return None
+        self.logger.warning(f"Skipping '{command}' for bot {bot.username}: its previous command is still running")
+        return CommandResult(bot.username, command, False, None,
+                             BotBusy(f"previous command still running for {bot.username}"), 0.0, False)
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="BotWorker")
+            return self._executor
+
+    def _run_command(self, bot, command, target=None, content=None, idempotency_key=None):
+        if self.reddit_pool is not None:
+            return self.reddit_pool.run(self._arun_command(bot, command, target, content,
+                                                           idempotency_key=idempotency_key))
+        start = time.perf_counter()
+        writes = getattr(bot, "write_attempts", None)
+        try:
+            result = bot.handle_command(command, target, **self._command_kwargs(content, idempotency_key))
+            error = None
+        except Exception as e:
+            self.logger.error(f"Command '{command}' failed for bot {bot.username}: {e}")
+            result, error = None, e
+        return CommandResult(bot.username, command, error is None and result is not None, result, error,
+                             time.perf_counter() - start, self._wrote(bot, writes))
+
+    @staticmethod
+    def _command_kwargs(content, idempotency_key):
+        # Only passed when set, so bots and test doubles without these parameters keep working.
+        kwargs = {"content": content, "idempotency_key": idempotency_key}
+        return {name: value for name, value in kwargs.items() if value is not None}
+
+    @staticmethod
+    def _wrote(bot, writes_before):
+        # Bots that do not count their writes are assumed to have written.
+        return writes_before is None or getattr(bot, "write_attempts", None) != writes_before
+
+    async def _arun_command(self, bot, command, target=None, content=None, timeout=None, idempotency_key=None):
+        """
+        _run_command for AsyncRedditBot. A command that runs past timeout is cancelled.
+        """
+        import asyncio
+        start = time.perf_counter()
+        writes = getattr(bot, "write_attempts", None)
+        coro = bot.handle_command(command, target, **self._command_kwargs(content, idempotency_key))
+        try:
+            result = await (asyncio.wait_for(coro, timeout) if timeout else coro)
+            error = None
+        except asyncio.TimeoutError:
+            self.logger.error(f"Command '{command}' timed out for bot {bot.username} after {timeout}s")
+            result, error = None, TimeoutError(f"timed out after {timeout}s")
+        except Exception as e:
+            self.logger.error(f"Command '{command}' failed for bot {bot.username}: {e}")
+            result, error = None, e
+        return CommandResult(bot.username, command, error is None and result is not None, result, error,
+                             time.perf_counter() - start, self._wrote(bot, writes))
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+        self._close_reddit_pool()
+        if self.generation_pool is not None:
+            self.generation_pool.close()
+        if self.command_queue is not None:
+            self.command_queue.close()
+        self._close_memory_stores()
+
+    def _prefetch_content(self, command, target=None):
+        """
+        Generate post or reply content for every async-backed bot concurrently, so the
+        model round-trips overlap and the cycle takes as long as the slowest one.
+        Bots whose generation fails are left out and generate their own content on dispatch.
+        """
+        command = command.lower()
+        if self.generation_pool is None or command not in ("post", "reply"):
+            return {}
+        if command == "reply" and (target is None or isinstance(target, (list, tuple))):
+            return {}
+        from providers.async_openai_provider import AsyncOpenAIProvider
+        providers = {bot.username: getattr(bot.content_provider, "primary", bot.content_provider) for bot in self.bots}
+        bots = [bot for bot in self.bots if isinstance(providers[bot.username], AsyncOpenAIProvider)]
+        if command == "post":
+            coros = [providers[bot.username].agenerate_post_content() for bot in bots]
+        else:
+            coros = [providers[bot.username].agenerate_reply_content(target, 0) for bot in bots]
+        results = self.generation_pool.gather(coros, return_exceptions=True)
+        prefetched = {}
+        for bot, result in zip(bots, results):
+            if isinstance(result, Exception):
+                self.logger.error(f"Error generating {command} content for bot {bot.username}: {result}")
+                continue
+            prefetched[bot.username] = result
+        return prefetched
+
+    def enqueue_command_for_all(self, command, target=None, idempotency_key=None):
+        """
+        Queue a command for every bot on the durable command queue instead of running it here.
+        Returns the queued command ids, in bot order.
+        """
+        return [self.enqueue_command_for_bot(bot.username, command, target, idempotency_key) for bot in self.bots]
+
+    def enqueue_command_for_bot(self, bot_username, command, target=None, idempotency_key=None):
+        """
+        Queue a command for one bot; a worker process runs it. The idempotency key (suffixed with the
+        username) makes re-queuing the same logical command a no-op. Returns the command id.
+        """
+        if self.command_queue is None:
+            raise RuntimeError("The command queue is not enabled (queue.enabled).")
+        if bot_username not in self.bots_by_username:
+            self.logger.error(f"No bot found for username: {bot_username}")
+            return None
+        key = f"{idempotency_key}:{bot_username}" if idempotency_key else None
+        return self.command_queue.enqueue(bot_username, command, target, idempotency_key=key)
+
+    def execute_command_for_bot(self, bot_username, command, target=None, idempotency_key=None):
+        """
+        Run a command on one bot and return its CommandResult, or None when no bot has that username.
+        idempotency_key identifies the command across retries (see CommandWorker): a retried post reuses
+        the content generated for an earlier attempt when the completion cache is enabled.
+        """
+        bot = self.bots_by_username.get(bot_username)
+        if bot is None:
             self.logger.error(f"No bot found for username: {bot_username}")
+            return None
+        busy = self._busy_result(bot, command)
+        if busy is not None:
+            return busy
+        result = self._run_command(bot, command, target, idempotency_key=idempotency_key)
+        self.logger.info(f"Executed command '{command}' for bot: {bot_username}")
+        return result
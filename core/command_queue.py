@@ -0,0 +1,390 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+# A claimed command. target is already decoded (fullnames and subreddit names, not PRAW objects).
+QueuedCommand = namedtuple("QueuedCommand", ["id", "username", "command", "target", "attempts", "idempotency_key"])
+
+def encode_target(target):
+    """
+    Turn a command target into JSON-safe data. Submissions and comments are stored by fullname,
+    so a worker in another process can fetch them again; strings (subreddit names) are kept as-is.
+    """
+    if target is None or isinstance(target, str):
+        return target
+    if isinstance(target, (list, tuple)):
+        return [encode_target(item) for item in target]
+    fullname = getattr(target, "fullname", None)
+    if fullname is None:
+        raise ValueError(f"Cannot queue a target of type {type(target).__name__}")
+    return {"fullname": fullname}
+
+def resolve_target(reddit, target):
+    """
+    Inverse of encode_target: turn stored fullnames back into lazy PRAW submission/comment objects.
+    """
+    if isinstance(target, list):
+        return [resolve_target(reddit, item) for item in target]
+    if isinstance(target, dict) and "fullname" in target:
+        prefix, _, thing_id = target["fullname"].partition("_")
+        if prefix == "t3":
+            return reddit.submission(id=thing_id)
+        if prefix == "t1":
+            return reddit.comment(id=thing_id)
+        raise ValueError(f"Unsupported target {target['fullname']}")
+    return target
+
+def _describe_result(result):
+    if result is None:
+        return None
+    if isinstance(result, (list, tuple)):
+        return [_describe_result(item) for item in result]
+    if isinstance(result, (str, int, float, bool)):
+        return result
+    return getattr(result, "fullname", None) or getattr(result, "id", None) or str(result)
+
+
+class CommandQueue:
+    def __init__(self, path="data/queue.db", lease_seconds=300, max_attempts=3, retry_backoff=30, clock=time.time):
+        """
+        Durable work queue for bot commands, stored in SQLite so several worker processes can share it.
+
+        A worker claims a command by taking a lease on it. Completed commands are kept (so their
+        idempotency key keeps rejecting duplicates); failed ones are retried with exponential backoff
+        until max_attempts, unless the failure may have left a submission behind (see fail); a command
+        whose lease expires (its worker crashed) becomes claimable again. Workers renew the lease
+        while a command runs, so a slow command is not handed to a second worker.
+
+        Parameters:
+            path: Path of the SQLite file.
+            lease_seconds: How long a claimed command stays reserved for its worker.
+            max_attempts: Attempts before a command is marked failed.
+            retry_backoff: Seconds before the first retry; doubled on every further attempt.
+            clock: Time source, replaceable in tests.
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.clock = clock
+        self._db = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    @classmethod
+    def from_config(cls, config):
+        queue_config = config.get("queue", {})
+        return cls(
+            path=queue_config.get("path", "data/queue.db"),
+            lease_seconds=queue_config.get("lease_seconds", 300),
+            max_attempts=queue_config.get("max_attempts", 3),
+            retry_backoff=queue_config.get("retry_backoff", 30)
+        )
+
+    def _connect(self):
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit mode; claims open their own write transaction with BEGIN IMMEDIATE.
+            self._db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS commands ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, idempotency_key TEXT UNIQUE, "
+                "username TEXT NOT NULL, command TEXT NOT NULL, target TEXT, "
+                "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, available_at REAL NOT NULL, "
+                "lease_owner TEXT, lease_expires REAL, result TEXT, error TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS commands_ready ON commands (status, available_at)")
+        return self._db
+
+    def enqueue(self, username, command, target=None, idempotency_key=None, delay=0):
+        """
+        Add a command to the queue and return its id.
+        A command whose idempotency_key is already queued (or done) is not added again; the
+        existing id is returned instead.
+        """
+        now = self.clock()
+        with self._lock:
+            db = self._connect()
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO commands (idempotency_key, username, command, target, status, "
+                "available_at, created_at, updated_at) VALUES (?, ?, ?, ?, 'pending', ?, ?, ?)",
+                (idempotency_key, username, command, json.dumps(encode_target(target)), now + delay, now, now)
+            )
+            if cursor.rowcount:
+                return cursor.lastrowid
+            row = db.execute("SELECT id FROM commands WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+        self.logger.info(f"Command with idempotency key {idempotency_key} already queued as #{row[0]}")
+        return row[0]
+
+    def claim(self, worker_id, usernames=None):
+        """
+        Lease the oldest ready command (optionally only for the given usernames) to worker_id.
+        Returns a QueuedCommand, or None when nothing is ready.
+        """
+        now = self.clock()
+        query = (
+            "SELECT id FROM commands WHERE ((status = 'pending' AND available_at <= ?) "
+            "OR (status = 'leased' AND lease_expires <= ?))"
+        )
+        params = [now, now]
+        if usernames is not None:
+            usernames = list(usernames)
+            if not usernames:
+                return None
+            query += f" AND username IN ({', '.join('?' * len(usernames))})"
+            params.extend(usernames)
+        query += " ORDER BY available_at, id LIMIT 1"
+        with self._lock:
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                # Commands whose worker died on their last allowed attempt are not handed out again.
+                db.execute(
+                    "UPDATE commands SET status = 'failed', error = 'lease expired', lease_owner = NULL, "
+                    "updated_at = ? WHERE status = 'leased' AND lease_expires <= ? AND attempts >= ?",
+                    (now, now, self.max_attempts)
+                )
+                row = db.execute(query, params).fetchone()
+                if row is None:
+                    db.execute("COMMIT")
+                    return None
+                db.execute(
+                    "UPDATE commands SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (worker_id, now + self.lease_seconds, now, row[0])
+                )
+                claimed = db.execute(
+                    "SELECT id, username, command, target, attempts, idempotency_key FROM commands WHERE id = ?",
+                    (row[0],)
+                ).fetchone()
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        command_id, username, command, target, attempts, idempotency_key = claimed
+        return QueuedCommand(command_id, username, command, json.loads(target), attempts, idempotency_key)
+
+    def extend(self, command_id, worker_id):
+        """
+        Renew a lease held by worker_id. Returns False when the lease was lost.
+        """
+        now = self.clock()
+        with self._lock:
+            cursor = self._connect().execute(
+                "UPDATE commands SET lease_expires = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (now + self.lease_seconds, now, command_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, command_id, worker_id, result=None):
+        """
+        Mark a leased command done. Returns False if worker_id no longer holds the lease.
+        """
+        now = self.clock()
+        with self._lock:
+            cursor = self._connect().execute(
+                "UPDATE commands SET status = 'done', result = ?, error = NULL, lease_owner = NULL, "
+                "lease_expires = NULL, updated_at = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (json.dumps(_describe_result(result)), now, command_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, command_id, worker_id, error, retry=True):
+        """
+        Record a failed attempt: schedule a retry with backoff, or mark the command failed once
+        max_attempts is reached or when retry is False (the attempt may already have written to
+        Reddit). Returns the new status, or None if the lease was lost.
+        """
+        now = self.clock()
+        with self._lock:
+            db = self._connect()
+            row = db.execute(
+                "SELECT attempts FROM commands WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (command_id, worker_id)
+            ).fetchone()
+            if row is None:
+                return None
+            attempts = row[0]
+            status = "failed" if not retry or attempts >= self.max_attempts else "pending"
+            available_at = now + self.retry_backoff * 2 ** (attempts - 1)
+            db.execute(
+                "UPDATE commands SET status = ?, error = ?, available_at = ?, lease_owner = NULL, "
+                "lease_expires = NULL, updated_at = ? WHERE id = ?",
+                (status, str(error), available_at, now, command_id)
+            )
+        if status == "failed":
+            self.logger.error(f"Command #{command_id} failed after {attempts} attempt(s): {error}")
+        return status
+
+    def get(self, command_id):
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT id, username, command, status, attempts, result, error FROM commands WHERE id = ?",
+                (command_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("id", "username", "command", "status", "attempts", "result", "error")
+        record = dict(zip(keys, row))
+        record["result"] = json.loads(record["result"]) if record["result"] else None
+        return record
+
+    def stats(self):
+        """
+        Number of commands per status.
+        """
+        with self._lock:
+            rows = self._connect().execute("SELECT status, COUNT(*) FROM commands GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class CommandWorker:
+    def __init__(self, bot_manager, queue, worker_id=None, poll_interval=1.0, sleep=None):
+        """
+        Pulls commands from a CommandQueue and runs them on the BotManager's bots.
+
+        Parameters:
+            bot_manager: The BotManager that owns the bots.
+            queue: The CommandQueue to pull from.
+            worker_id: Identifier recorded as the lease owner. Defaults to host:pid:thread.
+            poll_interval: Seconds to wait when the queue is empty.
+            sleep: Function used to wait, replaceable in tests.
+        """
+        self.bot_manager = bot_manager
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        self.poll_interval = poll_interval
+        self._sleep = sleep
+        self._stop = threading.Event()
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def stop(self):
+        self._stop.set()
+
+    def _heartbeat(self, command_id, done, lost):
+        # Renew the lease every third of its length until the command finishes.
+        while not done.wait(self.queue.lease_seconds / 3):
+            if not self.queue.extend(command_id, self.worker_id):
+                lost.set()
+                self.logger.error(f"Lost the lease on command #{command_id} while it was running.")
+                return
+
+    def run_once(self):
+        """
+        Claim and run one command, renewing its lease while it runs. Returns the CommandResult, or
+        None when nothing was ready (or the lease was lost before the command started).
+        """
+        usernames = [bot.username for bot in self.bot_manager.get_bots()]
+        queued = self.queue.claim(self.worker_id, usernames)
+        if queued is None:
+            return None
+        bot = self.bot_manager.get_bot(queued.username)
+        try:
+            # Async bots resolve queued fullnames themselves, on their event loop.
+            target = queued.target if getattr(bot, "resolves_targets", False) else resolve_target(bot.reddit, queued.target)
+        except Exception as e:
+            # Nothing was written yet, so the command can be retried.
+            self.queue.fail(queued.id, self.worker_id, e)
+            self.logger.error(f"Could not resolve target for command #{queued.id}: {e}")
+            return None
+        if not self.queue.extend(queued.id, self.worker_id):
+            self.logger.error(f"Lost the lease on command #{queued.id}; not running it.")
+            return None
+        done, lost = threading.Event(), threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(queued.id, done, lost),
+                                     name=f"LeaseHeartbeat-{queued.id}", daemon=True)
+        heartbeat.start()
+        try:
+            # Every attempt at this command shares the key, so a retry can reuse generated content.
+            key = queued.idempotency_key or f"command-{queued.id}"
+            result = self.bot_manager.execute_command_for_bot(queued.username, queued.command, target,
+                                                              idempotency_key=key)
+        finally:
+            done.set()
+            heartbeat.join()
+        if lost.is_set():
+            # Another worker may own the command now; its outcome is no longer ours to record.
+            return result
+        if result is None:
+            # The bot disappeared (e.g. removed by a config reload) between claim and run.
+            self.queue.fail(queued.id, self.worker_id, f"no bot for {queued.username}")
+            self.logger.error(f"No bot for command #{queued.id} ({queued.username}).")
+            return None
+        if result.ok:
+            if not self.queue.complete(queued.id, self.worker_id, result.result):
+                self.logger.warning(f"Lease on command #{queued.id} expired before it completed.")
+        else:
+            # A failure after a submit or reply was sent may have posted anyway, so it is not retried;
+            # failures before that (learning, generation) are.
+            self.queue.fail(queued.id, self.worker_id, result.error or "command produced no result",
+                            retry=not result.wrote)
+        return result
+
+    def run(self, max_commands=None):
+        """
+        Process commands until stop() is called (or max_commands have been run).
+        """
+        processed = 0
+        self.logger.info(f"Worker {self.worker_id} started.")
+        while not self._stop.is_set() and (max_commands is None or processed < max_commands):
+            if self.run_once() is None:
+                if self._sleep is not None:
+                    self._sleep(self.poll_interval)
+                else:
+                    self._stop.wait(self.poll_interval)
+                continue
+            processed += 1
+        self.logger.info(f"Worker {self.worker_id} stopped after {processed} command(s).")
+        return processed
+
+
+def _worker_process(config, stop_event):
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(processName)s %(name)s: %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+    from core.account_manager import AccountManager
+    from core.bot_manager import BotManager
+    from core.http_session import session_factory
+    factory = session_factory(config, "reddit") if "http" in config else None
+    bot_manager = BotManager(config, AccountManager(config.get("accounts", []), session_factory=factory))
+    worker = CommandWorker(bot_manager, CommandQueue.from_config(config),
+                           poll_interval=config.get("queue", {}).get("poll_interval", 1.0))
+    threading.Thread(target=lambda: (stop_event.wait(), worker.stop()), daemon=True).start()
+    try:
+        worker.run()
+    finally:
+        bot_manager.shutdown()
+
+def start_worker_processes(config, processes):
+    """
+    Start worker processes that each build their own bots and pull from the configured queue.
+    Returns (processes, stop_event); set the event and join the processes to shut them down.
+    """
+    import multiprocessing
+    stop_event = multiprocessing.Event()
+    workers = [
+        multiprocessing.Process(target=_worker_process, args=(dict(config), stop_event),
+                                name=f"CommandWorker-{i}", daemon=True)
+        for i in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    return workers, stop_event
@@ -0,0 +1,139 @@
+import json
+import logging
+import os
+import threading
+import time
+
+class SubredditCorpusStore:
+    def __init__(self, directory="data/corpus", window_size=50, fetch_limit=25, full_refresh_after=86400, clock=time.time):
+        """
+        Rolling, on-disk window of recent submissions per subreddit.
+
+        Each refresh asks Reddit only for submissions newer than the newest one already stored,
+        so repeated learning runs cost one small listing request regardless of the window size.
+
+        Parameters:
+            directory: Directory holding one JSON file per subreddit.
+            window_size: Maximum number of submissions kept per subreddit.
+            fetch_limit: Listing size used for incremental refreshes.
+            full_refresh_after: Seconds after which the window is re-read from scratch
+                (guards against the anchor submission being deleted).
+            clock: Time source, replaceable in tests.
+        """
+        self.directory = directory
+        self.window_size = window_size
+        self.fetch_limit = fetch_limit
+        self.full_refresh_after = full_refresh_after
+        self.clock = clock
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def _path(self, subreddit_name):
+        return os.path.join(self.directory, f"{subreddit_name.lower()}.json")
+
+    def _lock_for(self, subreddit_name):
+        with self._locks_guard:
+            return self._locks.setdefault(subreddit_name.lower(), threading.Lock())
+
+    def modified_at(self, subreddit_name):
+        """
+        Modification time (ns) of a subreddit's stored window, or None when nothing is stored.
+        """
+        try:
+            return os.stat(self._path(subreddit_name)).st_mtime_ns
+        except OSError:
+            return None
+
+    def load(self, subreddit_name):
+        """
+        Return the stored state for a subreddit: {"posts": [...newest first], "full_refresh_at": ts}.
+        """
+        try:
+            with open(self._path(subreddit_name), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"posts": [], "full_refresh_at": 0}
+
+    def _save(self, subreddit_name, state):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(subreddit_name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    def refresh(self, subreddit, subreddit_name):
+        """
+        Fetch submissions newer than the stored window and return the updated window, newest first.
+
+        Parameters:
+            subreddit: The PRAW Subreddit to read from.
+            subreddit_name: The subreddit's name, used as the storage key.
+        """
+        with self._lock_for(subreddit_name):
+            state = self.load(subreddit_name)
+            now = self.clock()
+            incremental = self._incremental(state, now)
+            if incremental:
+                fetched = list(subreddit.new(limit=self.fetch_limit, params={"before": state["posts"][0]["fullname"]}))
+                if len(fetched) >= self.fetch_limit:
+                    # More new submissions than one page holds; re-read the window instead of leaving a gap.
+                    incremental = False
+            if not incremental:
+                fetched = list(subreddit.new(limit=self.window_size))
+            return self._merge(subreddit_name, state, fetched, incremental, now)
+
+    async def arefresh(self, subreddit, subreddit_name):
+        """
+        refresh() for an asyncpraw Subreddit. The stored window is read and written in the loop's
+        default executor. Concurrent refreshes of one subreddit are not serialized; each replaces
+        the file atomically, so the worst case is a duplicate listing request.
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        state = await loop.run_in_executor(None, self.load, subreddit_name)
+        now = self.clock()
+        incremental = self._incremental(state, now)
+        if incremental:
+            listing = subreddit.new(limit=self.fetch_limit, params={"before": state["posts"][0]["fullname"]})
+            fetched = [submission async for submission in listing]
+            if len(fetched) >= self.fetch_limit:
+                incremental = False
+        if not incremental:
+            fetched = [submission async for submission in subreddit.new(limit=self.window_size)]
+        return await loop.run_in_executor(None, self._merge, subreddit_name, state, fetched, incremental, now)
+
+    def _incremental(self, state, now):
+        return bool(state["posts"]) and now - state.get("full_refresh_at", 0) < self.full_refresh_after
+
+    def _merge(self, subreddit_name, state, fetched, incremental, now):
+        posts = state["posts"]
+        if not incremental:
+            posts = []
+            state["full_refresh_at"] = now
+        new_posts = [self._to_record(submission) for submission in fetched]
+        seen = set()
+        merged = []
+        for post in new_posts + posts:
+            if post["fullname"] in seen:
+                continue
+            seen.add(post["fullname"])
+            merged.append(post)
+        merged.sort(key=lambda post: post.get("created_utc", 0), reverse=True)
+        state["posts"] = merged[:self.window_size]
+        self._save(subreddit_name, state)
+        self.logger.info(
+            f"Corpus for r/{subreddit_name}: {len(new_posts)} new submission(s), {len(state['posts'])} in window."
+        )
+        return state["posts"]
+
+    @staticmethod
+    def _to_record(submission):
+        fullname = getattr(submission, "fullname", None) or f"t3_{getattr(submission, 'id', id(submission))}"
+        return {
+            "fullname": fullname,
+            "title": submission.title,
+            "selftext": submission.selftext,
+            "created_utc": getattr(submission, "created_utc", 0)
+        }
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import threading
+import weakref
+
+class GenerationPool:
+    def __init__(self, max_in_flight=4, name="GenerationPool"):
+        """
+        Background event loop run on its own thread, bounding how many requests are in flight.
+        Async providers share one for completions; BotManager runs asyncpraw bots on another.
+
+        Parameters:
+            max_in_flight: Maximum number of concurrent requests across all users of this pool.
+            name: Name of the loop's thread.
+        """
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._semaphores = weakref.WeakKeyDictionary()
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name=self.name, daemon=True)
+                self._thread.start()
+                self.logger.info(f"Started {self.name} loop (max {self.max_in_flight} in flight).")
+            return self._loop
+
+    def semaphore(self):
+        """
+        Return the in-flight limiter for the running event loop.
+        Callers awaiting providers on their own loop get a limiter of their own.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    def run(self, coro):
+        """
+        Run a coroutine on the pool's loop and block until it finishes.
+        Safe to call from any number of threads; their coroutines overlap on the shared loop.
+        """
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def gather(self, coros, return_exceptions=False):
+        """
+        Run several coroutines concurrently on the pool's loop and return their results in order.
+        """
+        async def _gather():
+            return await asyncio.gather(*coros, return_exceptions=return_exceptions)
+        return self.run(_gather())
+
+    def close(self):
+        with self._lock:
+            if self._loop is None:
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            self._thread = None
@@ -0,0 +1,167 @@
+import functools
+import logging
+import threading
+from core.metrics import REGISTRY
+
+logger = logging.getLogger("HTTP")
+
+# Keys of an http config section that are passed to build_session.
+SESSION_OPTIONS = ("pool_connections", "pool_maxsize", "connect_timeout", "read_timeout", "max_retries")
+
+@functools.lru_cache(maxsize=None)
+def _session_class():
+    # requests is imported on first use, like praw and openai.
+    import requests
+
+    class TunedSession(requests.Session):
+        def __init__(self, connect_timeout, read_timeout):
+            super().__init__()
+            self.connect_timeout = connect_timeout
+            self.read_timeout = read_timeout
+
+        def request(self, method, url, **kwargs):
+            timeout = kwargs.get("timeout")
+            if timeout is None:
+                kwargs["timeout"] = (self.connect_timeout, self.read_timeout)
+            elif isinstance(timeout, (int, float)):
+                # Clients such as prawcore pass one number; keep it as the read timeout but cap connects.
+                kwargs["timeout"] = (min(self.connect_timeout, timeout), timeout)
+            return super().request(method, url, **kwargs)
+
+    return TunedSession
+
+@functools.lru_cache(maxsize=None)
+def _adapter_class():
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    class CountedConnection:
+        adapter = None
+
+        def connect(self):
+            super().connect()
+            self.adapter.connection_opened()
+
+    class CountingAdapter(HTTPAdapter):
+        """
+        HTTPAdapter that counts the requests it sends and the connections its pools open. Connections
+        are counted as they connect, so the count survives pools being evicted and recreated.
+        """
+        def __init__(self, name, **kwargs):
+            self.name = name
+            self.requests_sent = 0
+            self.connections_opened = 0
+            self._count_lock = threading.Lock()
+            super().__init__(**kwargs)
+
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                scheme: type(pool_class.__name__, (pool_class,), {
+                    "ConnectionCls": type(connection_class.__name__, (CountedConnection, connection_class),
+                                          {"adapter": self})
+                })
+                for scheme, pool_class, connection_class in (("http", HTTPConnectionPool, HTTPConnection),
+                                                             ("https", HTTPSConnectionPool, HTTPSConnection))
+            }
+
+        def send(self, request, *args, **kwargs):
+            with self._count_lock:
+                self.requests_sent += 1
+            return super().send(request, *args, **kwargs)
+
+        def connection_opened(self):
+            with self._count_lock:
+                self.connections_opened += 1
+            REGISTRY.inc("http_connections_opened_total", client=self.name)
+
+    return CountingAdapter
+
+def build_session(name="http", pool_connections=4, pool_maxsize=16, connect_timeout=5.0, read_timeout=30.0,
+                  max_retries=0):
+    """
+    Build a keep-alive requests.Session with a sized connection pool and default timeouts.
+
+    Parameters:
+        name: Client label used in metrics and logs (reddit, openai).
+        pool_connections: Number of hosts a pool is kept for.
+        pool_maxsize: Connections kept open per host; size it to the number of concurrent callers.
+        connect_timeout: Seconds allowed to establish a connection.
+        read_timeout: Seconds allowed between bytes of a response.
+        max_retries: Connection-level retries done by urllib3 (request retries are handled elsewhere).
+    """
+    from http.cookiejar import DefaultCookiePolicy
+    session = _session_class()(connect_timeout, read_timeout)
+    adapter = _adapter_class()(name, pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                               max_retries=max_retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # The session is shared by every account, so no account may pick up another's cookies.
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    session.hooks["response"].append(functools.partial(_count_request, name))
+    logger.info(f"Built {name} HTTP session: pool_maxsize={pool_maxsize}, timeouts=({connect_timeout}, {read_timeout})s")
+    return session
+
+
+def pool_stats(session):
+    """
+    Requests sent and connections opened through a session's adapters.
+    Every request beyond the connections opened reused a kept-alive connection.
+    """
+    requests_sent = connections = 0
+    for adapter in set(session.adapters.values()):
+        requests_sent += getattr(adapter, "requests_sent", 0)
+        connections += getattr(adapter, "connections_opened", 0)
+    return {"requests": requests_sent, "connections": connections, "reused": max(0, requests_sent - connections)}
+
+
+def _count_request(name, response, *args, **kwargs):
+    # Response hook; runs for any mounted adapter (including test transports), unlike the adapter counters.
+    REGISTRY.inc("http_requests_total", client=name)
+    return response
+
+
+_openai_session = {"factory": None}
+_openai_session_lock = threading.Lock()
+
+def install_openai_session(factory):
+    """
+    Have the openai 0.x client build its requests sessions with factory, through openai's public
+    requestssession setting. The setting is process-wide, so it is assigned once per factory and
+    later calls are a no-op; openai picks a new factory up whenever it next builds a thread's
+    session. openai 1.x has no such setting and keeps its own client. Returns whether it is installed.
+    """
+    with _openai_session_lock:
+        if _openai_session["factory"] is factory:
+            return True
+        import openai
+        if int(openai.__version__.split(".")[0]) >= 1:
+            logger.warning(f"openai {openai.__version__} does not take a requests session; http.openai is ignored.")
+            return False
+        openai.requestssession = factory
+        _openai_session["factory"] = factory
+    logger.info("Installed the shared openai HTTP session.")
+    return True
+
+
+def session_factory(config, client):
+    """
+    Return a callable that builds the session for client (reddit or openai) on first call and then
+    keeps returning that same session, so all accounts and providers share one connection pool.
+    Options come from the http section, overridden by http.<client>.
+    """
+    http_config = dict(config.get("http", {}))
+    overrides = http_config.pop(client, None) or {}
+    options = {key: value for key, value in {**http_config, **overrides}.items() if key in SESSION_OPTIONS}
+    lock = threading.Lock()
+    sessions = []
+
+    def factory():
+        with lock:
+            if not sessions:
+                sessions.append(build_session(name=client, **options))
+            return sessions[0]
+
+    factory.options = options
+    return factory
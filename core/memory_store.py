@@ -0,0 +1,170 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from core.text_terms import content_words, stem
+
+class MemoryStore:
+    def __init__(self, path="data/memory/bot.db", max_entries=200000, max_query_terms=8, clock=time.time):
+        """
+        A bot's long-term memory: what it has posted and replied to, plus the notes from its configured
+        memory, in a SQLite FTS5 index so only the entries relevant to the current context are sent
+        to the model.
+
+        Queries match only the rarest terms of the context, ranked by bm25, so retrieval stays in the
+        low milliseconds with hundreds of thousands of entries. Document frequencies are kept in a
+        plain table next to the index, since FTS5's own vocabulary counts scan each term's postings.
+
+        Parameters:
+            path: Path of the bot's SQLite file.
+            max_entries: Entries kept; the oldest posts and replies are deleted beyond this (notes are kept).
+            max_query_terms: Number of context terms a query matches on.
+            clock: Time source, replaceable in tests.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_query_terms = max_query_terms
+        self.clock = clock
+        self._db = None
+        self._count = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def _connect(self):
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS memories USING fts5("
+                "content, kind UNINDEXED, ref UNINDEXED, created UNINDEXED, tokenize='porter unicode61')"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, docs INTEGER NOT NULL) WITHOUT ROWID")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._db.commit()
+            self._count = self._db.execute("SELECT count(*) FROM memories").fetchone()[0]
+        return self._db
+
+    @staticmethod
+    def _terms(text):
+        """
+        Map each stem in text to one of its words (stopwords left out).
+        """
+        return {stem(word): word for word in content_words(text)}
+
+    def _insert(self, db, kind, content, ref, created):
+        db.executemany("INSERT INTO terms (term, docs) VALUES (?, 1) ON CONFLICT (term) DO UPDATE SET docs = docs + 1",
+                       [(term,) for term in self._terms(content)])
+        self._count += 1
+        return db.execute("INSERT INTO memories (content, kind, ref, created) VALUES (?, ?, ?, ?)",
+                          (content, kind, ref, created)).lastrowid
+
+    def _delete(self, db, where, params=()):
+        rows = db.execute(f"SELECT rowid, content FROM memories WHERE {where}", params).fetchall()
+        counts = {}
+        for _, content in rows:
+            for term in self._terms(content):
+                counts[term] = counts.get(term, 0) + 1
+        db.executemany("UPDATE terms SET docs = docs - ? WHERE term = ?", [(n, term) for term, n in counts.items()])
+        db.execute("DELETE FROM terms WHERE docs <= 0")
+        db.executemany("DELETE FROM memories WHERE rowid = ?", [(rowid,) for rowid, _ in rows])
+        self._count -= len(rows)
+        return len(rows)
+
+    def add(self, kind, content, ref=None):
+        """
+        Record an entry (kind is "post", "reply" or "note"). Returns its row id.
+        """
+        if not content:
+            return None
+        with self._lock:
+            db = self._connect()
+            rowid = self._insert(db, kind, content, ref, self.clock())
+            if self._count > self.max_entries:
+                self._prune(db)
+            db.commit()
+            return rowid
+
+    def _prune(self, db):
+        # Delete 1% extra so pruning runs once per batch of inserts rather than on each one.
+        excess = self._count - self.max_entries + max(1, self.max_entries // 100)
+        deleted = self._delete(db, "rowid IN (SELECT rowid FROM memories WHERE kind != 'note' ORDER BY rowid LIMIT ?)",
+                               (excess,))
+        self.logger.info(f"Pruned {deleted} old memory entr{'y' if deleted == 1 else 'ies'} from {self.path}")
+
+    def set_notes(self, memory):
+        """
+        Store the configured memory text as one note per line or sentence, replacing the previous
+        notes when the text changed.
+        """
+        digest = hashlib.sha256((memory or "").encode("utf-8")).hexdigest()
+        with self._lock:
+            db = self._connect()
+            row = db.execute("SELECT value FROM meta WHERE key = 'notes'").fetchone()
+            if row is not None and row[0] == digest:
+                return
+            self._delete(db, "kind = 'note'")
+            now = self.clock()
+            for note in re.split(r"(?<=[.!?])\s+|\n+", memory or ""):
+                if note.strip():
+                    self._insert(db, "note", note.strip(), None, now)
+            db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('notes', ?)", (digest,))
+            db.commit()
+
+    def _query_terms(self, db, text):
+        words = self._terms(text)
+        stems = list(words)
+        frequencies = {}
+        for start in range(0, len(stems), 500):
+            chunk = stems[start:start + 500]
+            frequencies.update(db.execute(
+                f"SELECT term, docs FROM terms WHERE term IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall())
+        # Rarest terms first: they say the most about which entries are relevant.
+        return [words[stem] for stem in sorted(frequencies, key=frequencies.get)[:self.max_query_terms]]
+
+    def search(self, text, limit=5):
+        """
+        Return up to limit (content, kind) pairs most relevant to text, best first. When no term of
+        text appears in any entry, nothing is relevant and the result is empty.
+        """
+        with self._lock:
+            db = self._connect()
+            terms = self._query_terms(db, text)
+            if not terms:
+                return []
+            query = " OR ".join(f'"{term}"' for term in terms)
+            return db.execute("SELECT content, kind FROM memories WHERE memories MATCH ? ORDER BY rank LIMIT ?",
+                              (query, limit)).fetchall()
+
+    def retrieve(self, text, top_k=5, token_budget=None, token_counter=None):
+        """
+        Return the contents of the top_k entries most relevant to text that fit, best first, in
+        token_budget tokens (counted with token_counter; unlimited when either is None).
+        """
+        memories = []
+        used = 0
+        for content, _ in self.search(text, top_k):
+            if token_budget is not None and token_counter is not None:
+                tokens = token_counter.count(content)
+                if used + tokens > token_budget:
+                    continue
+                used += tokens
+            memories.append(content)
+        return memories
+
+    def __len__(self):
+        with self._lock:
+            self._connect()
+            return self._count
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
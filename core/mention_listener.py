@@ -0,0 +1,161 @@
+import logging
+import threading
+import time
+from core.metrics import REGISTRY
+from core.seen_index import SeenIndex
+
+class MentionListener:
+    def __init__(self, bot_manager, config, stream_factory=None, sleep=None, clock=time.time):
+        """
+        Long-running reply mode: every bot consumes its own inbox mention stream
+        (reddit.inbox.mentions()) and replies only where a user summoned it by name.
+
+        Each bot records handled mentions in a SeenIndex before replying, so after a restart no
+        mention is answered twice. The mention listing returns mentions of any age, so mentions older
+        than the retention window (whose ids may have been pruned) are skipped, and on a bot's first
+        run, when nothing is recorded yet, so is the backlog from before the listener started.
+        Mentions are polled round-robin from one thread; an idle stream
+        yields control straight away, so one slow inbox does not hold up the others. PRAW instances
+        are not thread-safe, so the listener reads and replies through its own instance per account
+        (built by BotManager.build_reddit_for) instead of the ones the scheduler's bots use.
+
+        Parameters:
+            bot_manager: The BotManager whose bots listen for mentions.
+            config: The configuration dictionary (mentions section).
+            stream_factory: Optional callable(bot) returning an iterator of mentions that yields None
+                when no new mention is available. Defaults to PRAW's stream_generator.
+            sleep: Function used to wait between idle passes. Defaults to waiting on the stop event.
+            clock: Time source, compared against the mentions' created_utc.
+        """
+        mentions_config = config.get("mentions", {})
+        self.bot_manager = bot_manager
+        self.seen_path = mentions_config.get("seen_path", "data/seen.db")
+        self.bucket_seconds = mentions_config.get("bucket_seconds", 3600)
+        self.memory_buckets = mentions_config.get("memory_buckets", 48)
+        self.retention = mentions_config.get("retention_days", 30) * 86400
+        self.mark_read = mentions_config.get("mark_read", True)
+        self.poll_interval = mentions_config.get("poll_interval", 15)
+        self.ignore_authors = {name.lower() for name in mentions_config.get("ignore_authors", [])}
+        self.stream_factory = stream_factory or self._praw_stream
+        self._sleep = sleep
+        self.clock = clock
+        self.started_at = clock()
+        self.backlog_cutoffs = {}
+        self._stop = threading.Event()
+        self.streams = {}
+        self.readers = {}
+        self.seen = {}
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def _reader(self, bot):
+        reader = self.readers.get(bot.username)
+        if reader is None:
+            reader = self.readers[bot.username] = self.bot_manager.build_reddit_for(bot.username)
+        return reader
+
+    def _praw_stream(self, bot):
+        from praw.models.util import stream_generator
+        return stream_generator(self._reader(bot).inbox.mentions, pause_after=0)
+
+    def _seen_for(self, bot):
+        seen = self.seen.get(bot.username)
+        if seen is None:
+            seen = self.seen[bot.username] = SeenIndex(
+                self.seen_path, owner=bot.username, bucket_seconds=self.bucket_seconds,
+                memory_buckets=self.memory_buckets, retention=self.retention, clock=self.clock
+            )
+            if seen.is_empty():
+                self.backlog_cutoffs[bot.username] = self.started_at
+        return seen
+
+    def _too_old(self, bot, mention):
+        created = getattr(mention, "created_utc", None)
+        if created is None:
+            return False
+        cutoff = max(self.clock() - self.retention, self.backlog_cutoffs.get(bot.username, 0))
+        return created < cutoff
+
+    def is_summoned(self, bot, mention):
+        """
+        True when the mention explicitly names the bot and was not written by one of our own accounts.
+        """
+        author = str(getattr(mention, "author", "") or "").lower()
+        own_accounts = {other.username.lower() for other in self.bot_manager.get_bots()}
+        if author in own_accounts or author in self.ignore_authors:
+            return False
+        body = (getattr(mention, "body", "") or "").lower()
+        return f"u/{bot.username.lower()}" in body
+
+    def process(self, bot, mention):
+        """
+        Reply to one mention unless it was already handled. Returns True when a reply was posted.
+        """
+        seen = self._seen_for(bot)
+        if self._too_old(bot, mention):
+            REGISTRY.inc("mentions_total", bot=bot.username, outcome="expired")
+            return False
+        # Claim the id before replying: a crash mid-reply may skip a mention but never answers one twice.
+        if not seen.add(mention.fullname, getattr(mention, "created_utc", None)):
+            return False
+        if not self.is_summoned(bot, mention):
+            REGISTRY.inc("mentions_total", bot=bot.username, outcome="ignored")
+            return False
+        # The mention was fetched with the listener's instance, so the reply goes out through it too.
+        comment = bot.reply(mention, reddit=self.readers.get(bot.username))
+        REGISTRY.inc("mentions_total", bot=bot.username, outcome="replied" if comment is not None else "failed")
+        if self.mark_read and comment is not None:
+            try:
+                mention.mark_read()
+            except Exception as e:
+                self.logger.warning(f"Could not mark mention {mention.fullname} read for {bot.username}: {e}")
+        return comment is not None
+
+    def poll(self, bot):
+        """
+        Drain the mentions currently available for one bot. Returns the number of replies posted.
+        """
+        stream = self.streams.get(bot.username)
+        if stream is None:
+            stream = self.streams[bot.username] = self.stream_factory(bot)
+        replied = 0
+        for mention in stream:
+            if mention is None or self._stop.is_set():
+                break
+            try:
+                replied += self.process(bot, mention)
+            except Exception as e:
+                self.logger.error(f"Error handling mention {getattr(mention, 'fullname', '?')} for {bot.username}: {e}")
+        return replied
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, max_passes=None):
+        """
+        Poll every bot's mentions until stop() is called (or max_passes rounds have run).
+        """
+        passes = 0
+        self.logger.info(f"Listening for mentions on {len(self.bot_manager.get_bots())} bot(s).")
+        try:
+            while not self._stop.is_set() and (max_passes is None or passes < max_passes):
+                for bot in self.bot_manager.get_bots():
+                    if self._stop.is_set():
+                        break
+                    try:
+                        self.poll(bot)
+                    except Exception as e:
+                        # Streams end on errors; the next pass starts a fresh one (on a fresh instance,
+                        # in case the account's settings were reloaded).
+                        self.streams.pop(bot.username, None)
+                        self.readers.pop(bot.username, None)
+                        self.logger.error(f"Mention stream failed for {bot.username}: {e}")
+                passes += 1
+                if self._sleep is not None:
+                    self._sleep(self.poll_interval)
+                else:
+                    self._stop.wait(self.poll_interval)
+        finally:
+            for seen in self.seen.values():
+                seen.close()
+            self.seen = {}
+        return passes
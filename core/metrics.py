@@ -0,0 +1,227 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds, in seconds.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Thread-safe counters and histograms with labels, exportable as Prometheus text or JSON.
+        """
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._timing_listeners = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram["buckets"][index] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    @contextmanager
+    def time_request(self, dependency, operation, **labels):
+        """
+        Time a call to an external dependency (reddit, openai).
+        Records external_request_seconds and, on failure, external_request_errors_total by exception kind.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.inc("external_request_errors_total", dependency=dependency, operation=operation,
+                     kind=type(e).__name__, **labels)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe("external_request_seconds", elapsed, dependency=dependency, operation=operation, **labels)
+            for listener in self._timing_listeners:
+                listener(dependency, operation, elapsed, labels)
+
+    def add_timing_listener(self, listener):
+        """
+        Call listener(dependency, operation, seconds, labels) after every time_request block.
+        """
+        with self._lock:
+            self._timing_listeners = self._timing_listeners + [listener]
+
+    def remove_timing_listener(self, listener):
+        with self._lock:
+            self._timing_listeners = [item for item in self._timing_listeners if item is not listener]
+
+    def snapshot(self):
+        """
+        Return all metrics as plain data: {"counters": [...], "histograms": [...]}.
+        """
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                {"name": name, "labels": dict(labels), "sum": data["sum"], "count": data["count"],
+                 "buckets": dict(zip(self.buckets, data["buckets"]))}
+                for (name, labels), data in sorted(self._histograms.items())
+            ]
+        return {"timestamp": time.time(), "counters": counters, "histograms": histograms}
+
+    def render_prometheus(self):
+        """
+        Render all metrics in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        typed = set()
+        for counter in snapshot["counters"]:
+            if counter["name"] not in typed:
+                lines.append(f"# TYPE {counter['name']} counter")
+                typed.add(counter["name"])
+            lines.append(f"{counter['name']}{_labels(counter['labels'])} {counter['value']}")
+        for histogram in snapshot["histograms"]:
+            name = histogram["name"]
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            for bound, count in histogram["buckets"].items():
+                lines.append(f"{name}_bucket{_labels(histogram['labels'], le=bound)} {count}")
+            lines.append(f"{name}_bucket{_labels(histogram['labels'], le='+Inf')} {histogram['count']}")
+            lines.append(f"{name}_sum{_labels(histogram['labels'])} {histogram['sum']}")
+            lines.append(f"{name}_count{_labels(histogram['labels'])} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def dump_json(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(labels, **extra):
+    items = list(labels.items()) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+# Process-wide registry used by RedditBot and the providers.
+REGISTRY = MetricsRegistry()
+
+
+class MetricsExporter:
+    def __init__(self, registry=REGISTRY, port=None, host="0.0.0.0", json_path=None, json_interval=60):
+        """
+        Publishes a registry as a Prometheus /metrics endpoint and/or a periodically rewritten JSON file.
+
+        Parameters:
+            registry: The MetricsRegistry to export.
+            port: Port for the HTTP endpoint (disabled when None).
+            host: Interface the HTTP endpoint binds to.
+            json_path: File the JSON snapshot is written to (disabled when None).
+            json_interval: Seconds between JSON dumps.
+        """
+        self.registry = registry
+        self.port = port
+        self.host = host
+        self.json_path = json_path
+        self.json_interval = json_interval
+        self._server = None
+        self._threads = []
+        self._stop = threading.Event()
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    @classmethod
+    def from_config(cls, config, registry=REGISTRY):
+        metrics_config = config.get("metrics", {})
+        return cls(
+            registry=registry,
+            port=metrics_config.get("prometheus_port"),
+            host=metrics_config.get("host", "0.0.0.0"),
+            json_path=metrics_config.get("json_path"),
+            json_interval=metrics_config.get("json_interval", 60)
+        )
+
+    def start(self):
+        if self.port is not None:
+            from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+            registry = self.registry
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split("?")[0] != "/metrics":
+                        self.send_error(404)
+                        return
+                    body = registry.render_prometheus().encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self._server = ThreadingHTTPServer((self.host, self.port), MetricsHandler)
+            self.port = self._server.server_address[1]
+            thread = threading.Thread(target=self._server.serve_forever, name="MetricsHTTP", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+            self.logger.info(f"Serving Prometheus metrics on {self.host}:{self.port}/metrics")
+        if self.json_path:
+            thread = threading.Thread(target=self._dump_loop, name="MetricsJSON", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+            self.logger.info(f"Writing metrics to {self.json_path} every {self.json_interval}s")
+        return self
+
+    def _dump_loop(self):
+        while not self._stop.wait(self.json_interval):
+            self._dump()
+        self._dump()
+
+    def _dump(self):
+        try:
+            self.registry.dump_json(self.json_path)
+        except OSError as e:
+            self.logger.error(f"Could not write metrics to {self.json_path}: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
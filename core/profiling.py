@@ -0,0 +1,218 @@
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from core.metrics import REGISTRY
+
+# time_request dependencies reported as network and model wait.
+NETWORK_DEPENDENCIES = ("reddit",)
+MODEL_DEPENDENCIES = ("openai",)
+
+_local = threading.local()
+
+class _StackSampler:
+    def __init__(self, thread_id, interval):
+        """
+        Samples one thread's Python stack every interval seconds from a background thread.
+        Stacks are counted in collapsed form (outermost;...;innermost), the input format of flame graph tools.
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ProfileSampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class _Profile:
+    def __init__(self, label, bot):
+        self.label = label
+        self.bot = bot
+        self.waits = {"network": 0.0, "model": 0.0}
+        self._lock = threading.Lock()
+
+    def record(self, dependency, seconds, labels):
+        if self.bot is not None and labels.get("bot") != self.bot:
+            return
+        kind = "network" if dependency in NETWORK_DEPENDENCIES else "model" if dependency in MODEL_DEPENDENCIES else None
+        if kind is not None:
+            with self._lock:
+                self.waits[kind] += seconds
+
+
+class CommandProfiler:
+    def __init__(self, output_dir="data/profiles", mode="deterministic", sample_interval=0.005, top=15):
+        """
+        Profiles bot commands and writes one profile file per command plus a JSON-lines summary.
+
+        The summary splits each command's wall time into network wait (Reddit), model wait (OpenAI),
+        local CPU time of the command's thread, and the remainder (locks, queues, sleeping). Waits are
+        taken from the metrics time_request hooks, attributed by the bot label, so completions run on
+        the async generation loop are counted too.
+
+        Parameters:
+            output_dir: Directory for profile files and summary.jsonl.
+            mode: "deterministic" (cProfile, written as .prof for pstats/snakeviz) or "sampling"
+                (periodic stack samples, written as .folded for flame graphs; lower overhead).
+            sample_interval: Seconds between stack samples in sampling mode.
+            top: Number of hottest functions logged per deterministic profile.
+        """
+        if mode not in ("deterministic", "sampling"):
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        self.output_dir = output_dir
+        self.mode = mode
+        self.sample_interval = sample_interval
+        self.top = top
+        self._active = []
+        self._active_lock = threading.Lock()
+        self._summary_lock = threading.Lock()
+        self._listening = False
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Return a profiler when profiling.enabled is set, else None.
+        """
+        profiling_config = config.get("profiling", {})
+        if not profiling_config.get("enabled", False):
+            return None
+        return cls(
+            output_dir=profiling_config.get("output_dir", "data/profiles"),
+            mode=profiling_config.get("mode", "deterministic"),
+            sample_interval=profiling_config.get("sample_interval", 0.005),
+            top=profiling_config.get("top", 15)
+        )
+
+    def _on_timing(self, dependency, operation, seconds, labels):
+        for profile in self._active:
+            profile.record(dependency, seconds, labels)
+
+    def _register(self, profile):
+        with self._active_lock:
+            self._active = self._active + [profile]
+            if not self._listening:
+                REGISTRY.add_timing_listener(self._on_timing)
+                self._listening = True
+
+    def _unregister(self, profile):
+        with self._active_lock:
+            self._active = [item for item in self._active if item is not profile]
+
+    def _start_collector(self):
+        """
+        Start cProfile or a stack sampler for the current thread. Only the outermost profiled block
+        in a thread collects, since nested cProfile instances would replace each other's hook.
+        """
+        if getattr(_local, "collecting", False):
+            return None
+        if self.mode == "sampling":
+            collector = _StackSampler(threading.get_ident(), self.sample_interval)
+            collector.start()
+        else:
+            import cProfile
+            collector = cProfile.Profile()
+            try:
+                collector.enable()
+            except ValueError as e:
+                # Python 3.12+ allows one cProfile at a time per process.
+                self.logger.debug(f"cProfile unavailable for this command: {e}")
+                return None
+        _local.collecting = True
+        return collector
+
+    def _stop_collector(self, collector, path):
+        _local.collecting = False
+        if self.mode == "sampling":
+            collector.stop()
+            collector.dump(path)
+            return None
+        collector.disable()
+        collector.dump_stats(path)
+        import io
+        import pstats
+        stream = io.StringIO()
+        pstats.Stats(collector, stream=stream).sort_stats("cumulative").print_stats(self.top)
+        return stream.getvalue()
+
+    def _profile_path(self, label, bot):
+        safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", f"{bot or 'all'}-{label}")
+        extension = "folded" if self.mode == "sampling" else "prof"
+        return os.path.join(self.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**9:09d}-{safe}.{extension}")
+
+    @contextmanager
+    def profile(self, label, bot=None):
+        """
+        Profile the enclosed block. With bot set, only that bot's network/model waits are attributed;
+        without it (a dispatch across all bots) every bot's waits are.
+        """
+        profile = _Profile(label, bot)
+        self._register(profile)
+        collector = self._start_collector()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield profile
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            self._unregister(profile)
+            path = None
+            stats_text = None
+            if collector is not None:
+                os.makedirs(self.output_dir, exist_ok=True)
+                path = self._profile_path(label, bot)
+                stats_text = self._stop_collector(collector, path)
+            self._write_summary(profile, wall, cpu, path, stats_text)
+
+    def _write_summary(self, profile, wall, cpu, path, stats_text):
+        network, model = profile.waits["network"], profile.waits["model"]
+        summary = {
+            "timestamp": time.time(),
+            "command": profile.label,
+            "bot": profile.bot,
+            "wall_seconds": wall,
+            "network_wait_seconds": network,
+            "model_wait_seconds": model,
+            "cpu_seconds": cpu,
+            "other_seconds": max(0.0, wall - network - model - cpu),
+            "profile": path,
+        }
+        os.makedirs(self.output_dir, exist_ok=True)
+        with self._summary_lock:
+            with open(os.path.join(self.output_dir, "summary.jsonl"), "a") as f:
+                f.write(json.dumps(summary) + "\n")
+        self.logger.info(
+            f"Profiled '{profile.label}' for {profile.bot or 'all bots'}: {wall:.3f}s wall = "
+            f"{network:.3f}s network + {model:.3f}s model + {cpu:.3f}s CPU + {summary['other_seconds']:.3f}s other"
+            + (f" ({path})" if path else "")
+        )
+        if stats_text:
+            self.logger.debug(stats_text)
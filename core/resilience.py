@@ -0,0 +1,272 @@
+import logging
+import random
+import threading
+import time
+from core.metrics import REGISTRY
+
+# Exception names that mean the request itself was wrong (bad input, auth, permissions, missing thing).
+# Retrying them cannot help and they say nothing about the dependency's health.
+NON_RETRYABLE_ERRORS = {
+    "InvalidRequestError", "AuthenticationError", "PermissionError", "SignatureVerificationError",
+    "BadRequest", "Forbidden", "NotFound", "InvalidToken", "InvalidInvocation", "OAuthException",
+    "Redirect", "UnavailableForLegalReasons", "RedditAPIException", "ClientException",
+    "ValueError", "TypeError", "KeyError", "AttributeError", "IndexError",
+}
+
+def is_retryable(error):
+    """
+    True for errors that may succeed on another attempt (timeouts, connection errors, 5xx, rate limits).
+    """
+    if isinstance(error, (CircuitOpenError, DeadlineExceeded)):
+        return False
+    return not any(cls.__name__ in NON_RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=10.0, random_source=random.random):
+        """
+        Bounded exponential backoff with full jitter: the wait before retry n is drawn uniformly
+        from [0, min(max_delay, base_delay * 2 ** (n - 1))], so callers that failed together do not
+        retry together.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.random_source = random_source
+
+    def delay(self, attempt):
+        return self.random_source() * min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, half_open_max_calls=1, clock=time.monotonic):
+        """
+        Per-dependency circuit breaker. After failure_threshold consecutive failures calls are
+        rejected immediately with CircuitOpenError for reset_timeout seconds; then up to
+        half_open_max_calls probe calls are let through, and the first result closes or reopens it.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def _transition(self, state):
+        if state != self.state:
+            self.logger.warning(f"Circuit for {self.name} is now {state} (was {self.state}).")
+            REGISTRY.inc("circuit_breaker_transitions_total", dependency=self.name, state=state)
+            self.state = state
+
+    def before_call(self):
+        """
+        Raise CircuitOpenError if the call must not be made now.
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                retry_in = self.opened_at + self.reset_timeout - self.clock()
+                if retry_in > 0:
+                    raise CircuitOpenError(f"{self.name} circuit is open; retry in {retry_in:.1f}s")
+                self._transition(self.HALF_OPEN)
+                self._probes = 0
+            if self.state == self.HALF_OPEN:
+                if self._probes >= self.half_open_max_calls:
+                    raise CircuitOpenError(f"{self.name} circuit is half-open and a probe is in flight")
+                self._probes += 1
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._transition(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+                self._transition(self.OPEN)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(dependency, failure_threshold=5, reset_timeout=30.0):
+    """
+    Return the process-wide breaker for a dependency, so every bot and provider trips the same circuit.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(dependency)
+        if breaker is None:
+            breaker = _breakers[dependency] = CircuitBreaker(dependency, failure_threshold, reset_timeout)
+        else:
+            breaker.failure_threshold = failure_threshold
+            breaker.reset_timeout = reset_timeout
+        return breaker
+
+def reset_breakers():
+    with _breakers_lock:
+        _breakers.clear()
+
+
+class Deadline:
+    def __init__(self, seconds=None, clock=time.monotonic):
+        """
+        Absolute time budget for a call including all of its retries (None = unbounded).
+        """
+        self.clock = clock
+        self.expires_at = None if seconds is None else clock() + seconds
+
+    def remaining(self):
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - self.clock())
+
+    def expired(self):
+        return self.expires_at is not None and self.clock() >= self.expires_at
+
+    def cap(self, timeout):
+        """
+        Limit a request timeout (seconds or a (connect, read) tuple) to the time left.
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        if timeout is None:
+            return remaining
+        if isinstance(timeout, (tuple, list)):
+            return tuple(min(part, remaining) for part in timeout)
+        return min(timeout, remaining)
+
+
+# Defaults per dependency; overridden by the resilience.<dependency> config section.
+DEFAULTS = {
+    "reddit": {"max_attempts": 3, "base_delay": 1.0, "max_delay": 30.0, "deadline": 60.0,
+               "failure_threshold": 5, "reset_timeout": 30.0},
+    "openai": {"max_attempts": 3, "base_delay": 1.0, "max_delay": 20.0, "deadline": 120.0,
+               "failure_threshold": 5, "reset_timeout": 60.0},
+}
+
+class Resilience:
+    def __init__(self, name, retry_policy=None, breaker=None, deadline=None, sleep=time.sleep, clock=time.monotonic):
+        """
+        Runs calls to one external dependency with a deadline, jittered retries and a circuit breaker.
+
+        Parameters:
+            name: Dependency name (reddit, openai), used for metrics and the shared breaker.
+            retry_policy: RetryPolicy for retryable failures. Defaults to a single attempt.
+            breaker: CircuitBreaker guarding the dependency (None disables it).
+            deadline: Seconds a call may take across all attempts (None = unbounded).
+            sleep: Function used to wait between attempts.
+            clock: Monotonic time source for deadlines.
+        """
+        self.name = name
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=1)
+        self.breaker = breaker
+        self.deadline = deadline
+        self.sleep = sleep
+        self.clock = clock
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    @classmethod
+    def from_config(cls, config, dependency):
+        settings = dict(DEFAULTS.get(dependency, {}))
+        settings.update(config.get("resilience", {}).get(dependency, {}))
+        return cls(
+            dependency,
+            retry_policy=RetryPolicy(settings.get("max_attempts", 3), settings.get("base_delay", 1.0),
+                                     settings.get("max_delay", 30.0)),
+            breaker=get_breaker(dependency, settings.get("failure_threshold", 5), settings.get("reset_timeout", 30.0)),
+            deadline=settings.get("deadline")
+        )
+
+    def new_deadline(self):
+        return Deadline(self.deadline, self.clock)
+
+    def _before_attempt(self, operation, deadline):
+        if deadline.expired():
+            raise DeadlineExceeded(f"{self.name} {operation} exceeded its {self.deadline}s deadline")
+        if self.breaker is not None:
+            self.breaker.before_call()
+
+    def _after_failure(self, operation, error, attempt, idempotent, deadline):
+        """
+        Record a failed attempt and return the delay before the next one, or re-raise the error.
+        """
+        retryable = is_retryable(error)
+        if self.breaker is not None:
+            # Client errors prove the dependency answered, so they count as healthy.
+            self.breaker.record_failure() if retryable else self.breaker.record_success()
+        if not (retryable and idempotent) or attempt >= self.retry_policy.max_attempts:
+            raise error
+        delay = self.retry_policy.delay(attempt)
+        remaining = deadline.remaining()
+        if remaining is not None and delay >= remaining:
+            raise error
+        REGISTRY.inc("external_request_retries_total", dependency=self.name, operation=operation)
+        self.logger.warning(
+            f"{self.name} {operation} failed (attempt {attempt}/{self.retry_policy.max_attempts}): {error}; "
+            f"retrying in {delay:.2f}s"
+        )
+        return delay
+
+    def call(self, operation, fn, *args, idempotent=True, deadline=None, **kwargs):
+        """
+        Call fn(*args, **kwargs). Retryable failures are retried only when idempotent is True,
+        since repeating e.g. a submit could post twice.
+        """
+        deadline = deadline or self.new_deadline()
+        attempt = 0
+        while True:
+            attempt += 1
+            self._before_attempt(operation, deadline)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self.sleep(self._after_failure(operation, e, attempt, idempotent, deadline))
+                continue
+            if self.breaker is not None:
+                self.breaker.record_success()
+            return result
+
+    async def acall(self, operation, coro_factory, idempotent=True, deadline=None):
+        """
+        Async variant of call(). coro_factory() must return a fresh coroutine per attempt; each attempt
+        is cancelled once the deadline passes.
+        """
+        import asyncio
+        deadline = deadline or self.new_deadline()
+        attempt = 0
+        while True:
+            attempt += 1
+            self._before_attempt(operation, deadline)
+            try:
+                try:
+                    result = await asyncio.wait_for(coro_factory(), deadline.remaining())
+                except asyncio.TimeoutError:
+                    raise DeadlineExceeded(f"{self.name} {operation} exceeded its {self.deadline}s deadline")
+            except Exception as e:
+                if isinstance(e, DeadlineExceeded) and self.breaker is not None:
+                    self.breaker.record_failure()
+                    raise
+                await asyncio.sleep(self._after_failure(operation, e, attempt, idempotent, deadline))
+                continue
+            if self.breaker is not None:
+                self.breaker.record_success()
+            return result
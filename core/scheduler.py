@@ -0,0 +1,214 @@
+import itertools
+import logging
+import threading
+import time
+
+# Tolerance for floating-point drift when comparing token counts.
+_EPSILON = 1e-9
+
+class TokenBucket:
+    def __init__(self, rate, capacity=1, clock=time.monotonic):
+        """
+        Classic token bucket.
+
+        Parameters:
+            rate: Tokens added per second.
+            capacity: Maximum number of tokens (the allowed burst).
+            clock: Monotonic time source, replaceable in tests.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reconfigure(self, rate, capacity):
+        """
+        Change rate and capacity, keeping the tokens accumulated so far (up to the new capacity).
+        """
+        self._refill()
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = min(self.tokens, capacity)
+
+    def try_acquire(self, tokens=1):
+        self._refill()
+        if self.tokens + _EPSILON >= tokens:
+            self.tokens = max(0.0, self.tokens - tokens)
+            return True
+        return False
+
+    def wait_time(self, tokens=1):
+        """
+        Seconds until the requested number of tokens is available.
+        """
+        self._refill()
+        if self.tokens + _EPSILON >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+
+class Scheduler:
+    def __init__(self, bot_manager, config, clock=time.monotonic, wall_clock=time.time, sleep=None,
+                 config_watcher=None, bots=None):
+        """
+        Long-running scheduler that dispatches configured jobs through the BotManager.
+
+        Every account gets a token bucket refilled once per posting.interval, so no account acts
+        more often than configured. Before an account acts, the rate-limit headers Reddit returned
+        for it (praw's reddit.auth.limits) are checked, and the account is paused until the reset
+        time when too few requests remain. Jobs are dispatched one at a time, so slow calls
+        delay the schedule instead of piling up.
+
+        Parameters:
+            bot_manager: The BotManager whose bots run the jobs.
+            config: The configuration dictionary (posting, scheduler and schedule sections).
+            clock: Monotonic time source for the buckets.
+            wall_clock: Wall-clock time source, compared against Reddit's reset timestamps.
+            sleep: Function used to wait between dispatches. Defaults to waiting on the stop event.
+            config_watcher: Optional ConfigWatcher polled once per pass; changes are applied to the
+                BotManager and to this scheduler without a restart.
+            bots: Optional usernames to schedule; other bots are left alone. All bots when omitted.
+        """
+        self.bot_manager = bot_manager
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self._sleep = sleep
+        self._stop = threading.Event()
+        self.config_watcher = config_watcher
+        self.usernames = set(bots) if bots else None
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.buckets = {}
+        self.job_cycles = {}
+        self.paused_until = {}
+        self.jobs = None
+        self.apply_config(config)
+
+    def apply_config(self, config):
+        """
+        (Re)read the posting interval, scheduler settings and schedule. Existing buckets keep their
+        tokens and only change rate and capacity; bots that were added or removed gain or lose theirs.
+        """
+        scheduler_config = config.get("scheduler", {})
+        self.interval = config.get("posting", {}).get("interval", 3600)
+        self.burst = scheduler_config.get("burst", 1)
+        self.min_remaining = scheduler_config.get("min_remaining", 10)
+        self.poll_interval = scheduler_config.get("poll_interval", 30)
+        jobs = config.get("schedule") or [{"command": "post"}]
+        jobs_changed = jobs != self.jobs
+        self.jobs = jobs
+        buckets = {}
+        for bot in self.bot_manager.get_bots():
+            if self.usernames is not None and bot.username not in self.usernames:
+                continue
+            bot_jobs = [job for job in self.jobs if not job.get("bots") or bot.username in job["bots"]]
+            if not bot_jobs:
+                continue
+            bucket = self.buckets.get(bot.username)
+            if bucket is None:
+                bucket = TokenBucket(1.0 / self.interval, capacity=self.burst, clock=self.clock)
+            else:
+                bucket.reconfigure(1.0 / self.interval, self.burst)
+            buckets[bot.username] = bucket
+            if jobs_changed or bot.username not in self.job_cycles:
+                self.job_cycles[bot.username] = itertools.cycle(bot_jobs)
+        self.buckets = buckets
+        self.job_cycles = {username: cycle for username, cycle in self.job_cycles.items() if username in buckets}
+
+    def _reload(self):
+        if self.config_watcher is None:
+            return
+        config, changed = self.config_watcher.poll()
+        if config is None:
+            return
+        try:
+            self.bot_manager.apply_config(config, changed)
+            self.apply_config(config)
+        except Exception as e:
+            self.logger.error(f"Failed to apply reloaded configuration: {e}")
+
+    def stop(self):
+        self._stop.set()
+
+    def sleep(self, seconds):
+        if self._sleep is not None:
+            self._sleep(seconds)
+        else:
+            self._stop.wait(seconds)
+
+    def run(self, max_dispatches=None):
+        """
+        Dispatch jobs until stop() is called (or max_dispatches jobs have run).
+        """
+        dispatched = 0
+        self.logger.info(f"Scheduler started for {len(self.buckets)} bot(s), interval {self.interval}s.")
+        while not self._stop.is_set():
+            self._reload()
+            for bot in self.bot_manager.get_bots():
+                if self._stop.is_set() or (max_dispatches is not None and dispatched >= max_dispatches):
+                    break
+                if bot.username not in self.buckets or self._reddit_wait(bot) > 0:
+                    continue
+                if not self.buckets[bot.username].try_acquire():
+                    continue
+                job = next(self.job_cycles[bot.username])
+                self._dispatch(bot, job)
+                dispatched += 1
+            if max_dispatches is not None and dispatched >= max_dispatches:
+                break
+            self.sleep(self._next_wake())
+        self.logger.info(f"Scheduler stopped after {dispatched} dispatch(es).")
+        return dispatched
+
+    def _dispatch(self, bot, job):
+        command = job.get("command", "post")
+        target = job.get("target")
+        try:
+            if getattr(self.bot_manager, "command_queue", None) is not None:
+                # One key per account, command and interval slot, so a restarted scheduler does not queue twice.
+                slot = int(self.wall_clock() // self.interval)
+                self.logger.info(f"Queuing '{command}' for bot {bot.username}")
+                self.bot_manager.enqueue_command_for_bot(bot.username, command, target,
+                                                         idempotency_key=f"schedule:{command}:{target}:{slot}")
+                return
+            self.logger.info(f"Dispatching '{command}' for bot {bot.username}")
+            self.bot_manager.execute_command_for_bot(bot.username, command, target)
+        except Exception as e:
+            self.logger.error(f"Scheduled command '{command}' failed for bot {bot.username}: {e}")
+
+    def _next_wake(self):
+        waits = [self.poll_interval]
+        for bot in self.bot_manager.get_bots():
+            if bot.username not in self.buckets:
+                continue
+            waits.append(max(self.buckets[bot.username].wait_time(), self._reddit_wait(bot)))
+        return max(0.0, min(waits))
+
+    def _reddit_wait(self, bot):
+        """
+        Seconds to hold an account back based on the rate-limit state Reddit last reported for it.
+        """
+        paused_until = self.paused_until.get(bot.username, 0)
+        now = self.wall_clock()
+        if paused_until > now:
+            return paused_until - now
+        try:
+            limits = bot.reddit.auth.limits
+        except Exception:
+            return 0.0
+        remaining = limits.get("remaining")
+        reset_timestamp = limits.get("reset_timestamp")
+        if remaining is None or reset_timestamp is None or remaining >= self.min_remaining:
+            return 0.0
+        if reset_timestamp > now:
+            self.paused_until[bot.username] = reset_timestamp
+            self.logger.warning(
+                f"Reddit reports {remaining:.0f} request(s) left for {bot.username}; pausing {reset_timestamp - now:.0f}s."
+            )
+            return reset_timestamp - now
+        return 0.0
@@ -0,0 +1,143 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+def compact_key(fullname):
+    """
+    Pack a Reddit fullname (t1_abc123) into one integer: the base-36 id shifted left three bits
+    plus the type number. Sets of ints take far less memory than sets of strings.
+    """
+    prefix, _, thing_id = fullname.partition("_")
+    kind = int(prefix[1:]) if prefix[:1] == "t" and prefix[1:].isdigit() else 0
+    return int(thing_id, 36) << 3 | kind
+
+
+class SeenIndex:
+    def __init__(self, path="data/seen.db", owner="", bucket_seconds=3600, memory_buckets=48,
+                 retention=30 * 86400, clock=time.time):
+        """
+        Persistent set of processed Reddit item ids, so a restarted bot never handles an item twice.
+
+        Ids are grouped into time buckets by the item's creation time. The newest memory_buckets
+        buckets are kept in memory as sets of packed integers; older ones live only in SQLite and are
+        looked up there. Buckets older than retention are deleted, so neither memory nor the file grows
+        without bound. Some listings (inbox.mentions()) do return items of any age, so callers must
+        skip items created before the retention window themselves (see MentionListener).
+
+        Parameters:
+            path: Path of the SQLite file. Several indexes (one per bot) can share a file.
+            owner: Name the ids are recorded under, usually the bot's username.
+            bucket_seconds: Width of a time bucket.
+            memory_buckets: Number of recent buckets held in memory.
+            retention: Seconds an id is remembered.
+            clock: Time source, replaceable in tests.
+        """
+        self.path = path
+        self.owner = owner
+        self.bucket_seconds = bucket_seconds
+        self.memory_buckets = memory_buckets
+        self.retention = retention
+        self.clock = clock
+        self._buckets = OrderedDict()
+        self._db = None
+        self._pruned_bucket = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def _connect(self):
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS seen (owner TEXT NOT NULL, key INTEGER NOT NULL, "
+                "bucket INTEGER NOT NULL, PRIMARY KEY (owner, key)) WITHOUT ROWID"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS seen_bucket ON seen (owner, bucket)")
+            self._db.commit()
+            self._load_recent()
+        return self._db
+
+    def _current_bucket(self):
+        return int(self.clock() // self.bucket_seconds)
+
+    def _load_recent(self):
+        oldest = self._current_bucket() - self.memory_buckets + 1
+        rows = self._db.execute(
+            "SELECT bucket, key FROM seen WHERE owner = ? AND bucket >= ? ORDER BY bucket", (self.owner, oldest)
+        ).fetchall()
+        for bucket, key in rows:
+            self._buckets.setdefault(bucket, set()).add(key)
+
+    def _in_memory(self, key):
+        return any(key in keys for keys in self._buckets.values())
+
+    def __contains__(self, fullname):
+        key = compact_key(fullname)
+        with self._lock:
+            db = self._connect()
+            if self._in_memory(key):
+                return True
+            return db.execute("SELECT 1 FROM seen WHERE owner = ? AND key = ?", (self.owner, key)).fetchone() is not None
+
+    def is_empty(self):
+        """
+        True when no id is recorded for this owner (e.g. on a bot's very first run).
+        """
+        with self._lock:
+            db = self._connect()
+            return db.execute("SELECT 1 FROM seen WHERE owner = ? LIMIT 1", (self.owner,)).fetchone() is None
+
+    def add(self, fullname, created=None):
+        """
+        Record an id. Returns True if it was new, False if it had already been seen, so callers
+        can use it as an atomic check-and-claim.
+        """
+        key = compact_key(fullname)
+        now_bucket = self._current_bucket()
+        bucket = int(created // self.bucket_seconds) if created is not None else now_bucket
+        with self._lock:
+            db = self._connect()
+            if self._in_memory(key):
+                return False
+            cursor = db.execute("INSERT OR IGNORE INTO seen (owner, key, bucket) VALUES (?, ?, ?)",
+                                (self.owner, key, bucket))
+            db.commit()
+            if not cursor.rowcount:
+                return False
+            if bucket > now_bucket - self.memory_buckets:
+                if bucket not in self._buckets:
+                    self._buckets[bucket] = set()
+                    self._buckets = OrderedDict(sorted(self._buckets.items()))
+                self._buckets[bucket].add(key)
+            self._evict(now_bucket)
+            return True
+
+    def _evict(self, now_bucket):
+        # Spill: buckets that left the memory window are dropped from memory (they stay on disk).
+        oldest_in_memory = now_bucket - self.memory_buckets + 1
+        while self._buckets and next(iter(self._buckets)) < oldest_in_memory:
+            self._buckets.popitem(last=False)
+        if self._pruned_bucket != now_bucket:
+            self._pruned_bucket = now_bucket
+            cutoff = int((self.clock() - self.retention) // self.bucket_seconds)
+            deleted = self._db.execute("DELETE FROM seen WHERE owner = ? AND bucket < ?", (self.owner, cutoff)).rowcount
+            self._db.commit()
+            if deleted:
+                self.logger.info(f"Pruned {deleted} seen id(s) older than {self.retention}s for {self.owner}")
+
+    def memory_size(self):
+        with self._lock:
+            return sum(len(keys) for keys in self._buckets.values())
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+            self._buckets.clear()
@@ -0,0 +1,188 @@
+import json
+import logging
+import os
+import re
+import statistics
+import threading
+import time
+from collections import Counter
+from core.metrics import REGISTRY
+from core.text_terms import content_words
+
+# First line of every profile; LocalProvider uses it to tell a profile from raw posts.
+PROFILE_HEADER = "Subreddit style profile"
+
+_LINK = re.compile(r"https?://|\]\(")
+_LIST_ITEM = re.compile(r"(?m)^\s*(?:[-*+]|\d+[.)])\s+")
+_CODE = re.compile(r"`|^ {4}\S", re.MULTILINE)
+_FIRST_PERSON = re.compile(r"\b(?:i|i'm|i've|my|me)\b", re.IGNORECASE)
+
+def _percent(count, total):
+    return f"{round(100 * count / total) if total else 0}%"
+
+def _words(text):
+    return (text or "").split()
+
+def _excerpt(text, max_words):
+    words = _words(text)
+    return " ".join(words[:max_words]) + (" ..." if len(words) > max_words else "")
+
+
+class StyleProfileStore:
+    def __init__(self, directory="data/style_profiles", refresh_after=10, max_age=7 * 86400, token_budget=300,
+                 example_posts=5, token_counter=None, clock=time.time):
+        """
+        Condenses a subreddit's stored corpus window into a short style profile (title and body
+        length, questions, formatting, recurring topics and a few example posts) and caches it on
+        disk. learn_and_post sends the profile as learned context instead of the raw posts.
+
+        A cached profile is reused until refresh_after submissions newer than the ones it was built
+        from have reached the window, or it is older than max_age.
+
+        Parameters:
+            directory: Directory holding one JSON file per subreddit.
+            refresh_after: New submissions that trigger a rebuild.
+            max_age: Seconds after which a profile is rebuilt regardless.
+            token_budget: Maximum profile size in tokens; example posts are dropped to fit.
+            example_posts: Most recent posts quoted (shortened) as examples.
+            token_counter: TokenCounter used for the budget (a default one is created when omitted).
+            clock: Time source, replaceable in tests.
+        """
+        self.directory = directory
+        self.refresh_after = refresh_after
+        self.max_age = max_age
+        self.token_budget = token_budget
+        self.example_posts = example_posts
+        self._token_counter = token_counter
+        self.clock = clock
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Return a store when learning.style_profiles is set, else None.
+        """
+        learning_config = config.get("learning", {})
+        if not learning_config.get("style_profiles", False):
+            return None
+        return cls(
+            directory=learning_config.get("profile_dir", "data/style_profiles"),
+            refresh_after=learning_config.get("profile_refresh_after", 10),
+            max_age=learning_config.get("profile_max_age", 7 * 86400),
+            token_budget=learning_config.get("profile_token_budget", 300),
+            example_posts=learning_config.get("profile_example_posts", 5)
+        )
+
+    @property
+    def token_counter(self):
+        if self._token_counter is None:
+            from providers.token_budget import TokenCounter
+            self._token_counter = TokenCounter()
+        return self._token_counter
+
+    def _path(self, subreddit_name):
+        return os.path.join(self.directory, f"{subreddit_name.lower()}.json")
+
+    def _lock_for(self, subreddit_name):
+        with self._locks_guard:
+            return self._locks.setdefault(subreddit_name.lower(), threading.Lock())
+
+    def load(self, subreddit_name):
+        """
+        Return the cached entry for a subreddit ({"profile", "anchor", "built_at", "posts"}), or None.
+        """
+        try:
+            with open(self._path(subreddit_name), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, subreddit_name, entry):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(subreddit_name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def _new_posts(self, entry, posts):
+        # posts are newest first, so the anchor's position is the number of posts that arrived since.
+        for index, post in enumerate(posts):
+            if post.get("fullname") == entry.get("anchor"):
+                return index
+        return len(posts)
+
+    def get(self, subreddit_name, posts):
+        """
+        Return the style profile for a subreddit, rebuilding it from posts (the corpus window,
+        newest first) when the cached one is missing or stale.
+        """
+        with self._lock_for(subreddit_name):
+            entry = self.load(subreddit_name)
+            if entry is not None and entry.get("anchor") is not None:
+                fresh = self.clock() - entry.get("built_at", 0) < self.max_age
+                if fresh and self._new_posts(entry, posts) < self.refresh_after:
+                    REGISTRY.inc("style_profile_lookups_total", result="hit")
+                    return entry["profile"]
+            profile = self.build(subreddit_name, posts)
+            self._save(subreddit_name, {
+                "profile": profile,
+                "anchor": posts[0].get("fullname") if posts else None,
+                "built_at": self.clock(),
+                "posts": len(posts)
+            })
+            REGISTRY.inc("style_profile_lookups_total", result="rebuilt")
+            self.logger.info(
+                f"Built style profile for r/{subreddit_name} from {len(posts)} post(s) "
+                f"({self.token_counter.count(profile)} tokens)."
+            )
+            return profile
+
+    def build(self, subreddit_name, posts):
+        """
+        Condense posts into a profile of at most token_budget tokens.
+        """
+        total = len(posts)
+        titles = [post.get("title") or "" for post in posts]
+        bodies = [post.get("selftext") or "" for post in posts]
+        title_lengths = sorted(len(_words(title)) for title in titles) or [0]
+        body_lengths = [len(_words(body)) for body in bodies if body.strip()]
+        openings = Counter(" ".join(_words(title.lower())[:1]) for title in titles if title)
+        topics = Counter()
+        for title, body in zip(titles, bodies):
+            topics.update({word for word in content_words(f"{title} {body}") if not word.isdigit()})
+        recurring = [word for word, docs in topics.most_common(12) if docs > 1]
+
+        lines = [
+            f"{PROFILE_HEADER} for r/{subreddit_name}, from {total} recent post(s):",
+            f"- Titles: median {statistics.median(title_lengths):g} words "
+            f"(range {title_lengths[0]}-{title_lengths[-1]}); "
+            f"{_percent(sum(title.rstrip().endswith('?') for title in titles), total)} are questions; "
+            f"{_percent(sum('!' in title for title in titles), total)} use exclamation marks.",
+            f"- Common title openings: {', '.join(repr(word) for word, _ in openings.most_common(5)) or 'none'}.",
+            f"- Bodies: median {statistics.median(body_lengths) if body_lengths else 0:g} words; "
+            f"{_percent(total - len(body_lengths), total)} title-only; "
+            f"{_percent(sum(bool(_LINK.search(body)) for body in bodies), total)} with links; "
+            f"{_percent(sum(bool(_LIST_ITEM.search(body)) for body in bodies), total)} with lists; "
+            f"{_percent(sum(bool(_CODE.search(body)) for body in bodies), total)} with code.",
+            f"- Voice: {_percent(sum(bool(_FIRST_PERSON.search(f'{t} {b}')) for t, b in zip(titles, bodies)), total)} "
+            f"written in the first person.",
+            f"- Recurring topics: {', '.join(recurring) or 'none'}.",
+        ]
+        header = "\n".join(lines) + "\n"
+        examples = [
+            f"Post Title: {_excerpt(post.get('title'), 20)}\nPost Body: {_excerpt(post.get('selftext'), 30)}\n"
+            for post in posts[:self.example_posts]
+        ]
+        label = "Example posts:\n"
+        used = self.token_counter.count(header + label)
+        fitting = []
+        for example in examples:
+            tokens = self.token_counter.count(example)
+            if used + tokens > self.token_budget:
+                break
+            fitting.append(example)
+            used += tokens
+        return header + (label + "".join(fitting) if fitting else "")
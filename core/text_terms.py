@@ -0,0 +1,31 @@
+import re
+
+_TERM = re.compile(r"\w{3,}")
+
+# Words too common to say anything about relevance.
+STOPWORDS = frozenset("""
+the and for are but not you all any can had her was one our out has him his how its may new now
+old see two way who did get let put say she too use that with have this will your from they know
+want been good much some time very when come here just like long make many more only over such
+take than them well were what into then there their about would could should which while after
+also because being other these those where does doing really thing things think
+""".split())
+
+_SUFFIXES = ("ing", "es", "ed", "s")
+
+def content_words(text):
+    """
+    Lowercased words of at least three characters in text, stopwords left out, in order.
+    Shared by the memory store and the style profiles so both see the same terms.
+    """
+    return [word for word in _TERM.findall((text or "").lower()) if word not in STOPWORDS]
+
+def stem(word):
+    """
+    Crude suffix stripping, so "keyboard" and "keyboards" share a document frequency. The memory
+    index itself uses FTS5's porter tokenizer; this only needs to group the same words together.
+    """
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
@@ -1,30 +1,286 @@
+"""
+Command line entry point.
+
+    python main.py [--config PATH] [--bots NAME,...] <command> ...
+
+Commands:
+    post           Post generated content to the configured (or --subreddit) subreddits.
+    reply          Reply to submissions/comments given as fullnames (t3_..., t1_...) or URLs.
+    learn          Learn from a subreddit and post content in its style.
+    run-scheduler  Run the long-lived scheduler (the default when no command is given).
+    bench          Run the offline end-to-end benchmark (no config or credentials needed).
+    dry-run        Generate post/learn/reply content and print it without submitting anything.
+
+Heavy modules (praw, openai, yaml) are imported only by the commands that use them.
+"""
+import argparse
+import json
 import logging
 import sys
-from config.config import load_config
-from core.account_manager import AccountManager
-from core.bot_manager import BotManager
 
-if __name__ == "__main__":
+DEFAULT_CONFIG = "config/config.yaml"
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Multi-account Reddit bot system.")
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help="path to the YAML config file")
+    parser.add_argument("--bots", default=None, help="comma-separated usernames to act as (default: all bots)")
+    parser.add_argument("--log-level", default="INFO", help="logging level (DEBUG, INFO, WARNING, ...)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--profile", nargs="?", const="deterministic", choices=["deterministic", "sampling"],
+                        help="profile every command (overrides the profiling config section)")
+    parser.add_argument("--profile-dir", default=None, help="directory for profile files and summary.jsonl")
+    commands = parser.add_subparsers(dest="command")
+
+    post = commands.add_parser("post", help="post generated content")
+    post.add_argument("--subreddit", action="append", dest="subreddits",
+                      help="subreddit to post to (repeatable; default: the configured subreddits)")
+
+    reply = commands.add_parser("reply", help="reply to submissions or comments")
+    reply.add_argument("targets", nargs="+", help="fullnames (t3_abc, t1_def) or URLs")
+
+    learn = commands.add_parser("learn", help="learn from a subreddit and post in its style")
+    learn.add_argument("subreddit")
+
+    commands.add_parser("run-scheduler", help="run the long-lived scheduler")
+
+    # Everything after "bench" is passed on to benchmarks/bench_e2e.py (see parse_args).
+    commands.add_parser("bench", help="run the offline end-to-end benchmark", add_help=False)
+
+    dry_run = commands.add_parser("dry-run", help="generate content without submitting it")
+    dry_run.add_argument("action", choices=["post", "learn", "reply"])
+    dry_run.add_argument("argument", nargs="?", help="subreddit for learn, target for reply")
+    dry_run.add_argument("--offline", action="store_true",
+                         help="use the local provider and the stored corpus only (no network)")
+    dry_run.add_argument("--text", default=None, help="reply to this text instead of fetching a target")
+    return parser
+
+def parse_args(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command == "bench":
+        args.bench_args = extra
+    elif extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    return args
+
+
+def load(args, offline=False):
+    """
+    Load the config and build the AccountManager and BotManager for the selected bots.
+    """
+    from config.config import Config, load_config
+    config = load_config(args.config)
+    if offline:
+        config = Config(config, provider={"default": "local"})
+    from core.account_manager import AccountManager
+    from core.bot_manager import BotManager
+    session_factory = None
+    if "http" in config and not offline:
+        from core.http_session import session_factory as build_session_factory
+        session_factory = build_session_factory(config, "reddit")
+    account_manager = AccountManager(config.get("accounts", []), session_factory=session_factory)
+    profiler = None
+    if args.profile:
+        from core.profiling import CommandProfiler
+        profiler = CommandProfiler(
+            output_dir=args.profile_dir or config.get("profiling", {}).get("output_dir", "data/profiles"),
+            mode=args.profile
+        )
+    bot_manager = BotManager(config, account_manager, profiler=profiler)
+    return config, bot_manager, select_bots(bot_manager, args.bots)
+
+def select_bots(bot_manager, names):
+    if not names:
+        return bot_manager.get_bots()
+    bots = []
+    for name in names.split(","):
+        bot = bot_manager.get_bot(name.strip())
+        if bot is None:
+            raise SystemExit(f"Unknown bot: {name.strip()}")
+        bots.append(bot)
+    return bots
+
+def resolve_target(reddit, target):
+    """
+    Turn a fullname (t3_abc, t1_def) or a submission/comment URL into a lazy PRAW object.
+    """
+    if target.startswith(("http://", "https://")):
+        if "/comments/" in target and len([part for part in target.rstrip("/").split("/comments/")[1].split("/") if part]) >= 3:
+            return reddit.comment(url=target)
+        return reddit.submission(url=target)
+    from core.command_queue import resolve_target as resolve_fullname
+    return resolve_fullname(reddit, {"fullname": target})
+
+def describe(result):
+    if result is None:
+        return None
+    if isinstance(result, (list, tuple)):
+        return [describe(item) for item in result]
+    return getattr(result, "fullname", None) or getattr(result, "id", None) or str(result)
+
+def report(args, results):
+    """
+    Print one line (or JSON object) per CommandResult and return the process exit code.
+    """
+    if args.json:
+        print(json.dumps([
+            {"bot": r.username, "command": r.command, "ok": r.ok, "result": describe(r.result),
+             "error": str(r.error) if r.error else None, "elapsed": r.elapsed}
+            for r in results
+        ], indent=2))
+    else:
+        for r in results:
+            outcome = describe(r.result) if r.ok else (r.error or "no result")
+            print(f"{r.username}: {'ok' if r.ok else 'FAILED'} {outcome} ({r.elapsed:.2f}s)")
+    return 0 if results and all(r.ok for r in results) else 1
+
+
+def cmd_post(args):
+    config, bot_manager, bots = load(args)
+    try:
+        if args.subreddits:
+            for bot in bots:
+                bot.subreddits = args.subreddits
+        return report(args, [bot_manager.execute_command_for_bot(bot.username, "post") for bot in bots])
+    finally:
+        bot_manager.shutdown()
+
+def cmd_reply(args):
+    config, bot_manager, bots = load(args)
+    try:
+        results = []
+        for bot in bots:
+            if getattr(bot, "resolves_targets", False):
+                targets = list(args.targets)
+            else:
+                targets = [resolve_target(bot.reddit, target) for target in args.targets]
+            results.append(bot_manager.execute_command_for_bot(
+                bot.username, "reply", targets if len(targets) > 1 else targets[0]
+            ))
+        return report(args, results)
+    finally:
+        bot_manager.shutdown()
+
+def cmd_learn(args):
+    config, bot_manager, bots = load(args)
+    try:
+        return report(args, [bot_manager.execute_command_for_bot(bot.username, "learn_and_post", args.subreddit)
+                             for bot in bots])
+    finally:
+        bot_manager.shutdown()
+
+def cmd_dry_run(args):
+    config, bot_manager, bots = load(args, offline=args.offline)
+    outputs = []
+    try:
+        for bot in bots:
+            provider = bot.content_provider
+            if args.action == "post":
+                title, body = provider.generate_post_content()
+                outputs.append({"bot": bot.username, "title": title, "body": body})
+            elif args.action == "learn":
+                if not args.argument:
+                    raise SystemExit("dry-run learn needs a subreddit")
+                learned_context = bot.learn(args.argument, offline=args.offline)
+                if getattr(bot, "resolves_targets", False):
+                    learned_context = bot_manager.reddit_pool.run(learned_context)
+                title, body = provider.generate_post_content(learned_context or None)
+                outputs.append({"bot": bot.username, "subreddit": args.argument, "title": title, "body": body})
+            else:
+                if args.text is not None:
+                    from types import SimpleNamespace
+                    target = SimpleNamespace(body=args.text, id="dry_run", fullname="t1_dry_run")
+                elif args.argument and not args.offline and getattr(bot, "resolves_targets", False):
+                    target = bot_manager.reddit_pool.run(bot.snapshot(args.argument))
+                elif args.argument and not args.offline:
+                    target = resolve_target(bot.reddit, args.argument)
+                else:
+                    raise SystemExit("dry-run reply needs a target (online) or --text")
+                outputs.append({"bot": bot.username, "reply": provider.generate_reply_content(target, 0)})
+    finally:
+        bot_manager.shutdown()
+    if args.json:
+        print(json.dumps(outputs, indent=2))
+    else:
+        for output in outputs:
+            print(f"--- {output['bot']}")
+            for key in ("title", "body", "reply"):
+                if key in output:
+                    print(f"{key}: {output[key]}")
+    return 0
+
+def cmd_bench(args):
+    from benchmarks.bench_e2e import main as bench_main
+    bench_main(args.bench_args)
+    return 0
+
+def cmd_run_scheduler(args):
+    import threading
+    from config.config import ConfigWatcher
+    from core.metrics import MetricsExporter
+    from core.scheduler import Scheduler
+    try:
+        config_watcher = ConfigWatcher(args.config)
+    except Exception as e:
+        logging.error(f"Failed to load configuration: {e}")
+        return 1
+    config, bot_manager, bots = load(args)
+    if not bots:
+        logging.error("No bots available.")
+        return 1
+
+    exporter = MetricsExporter.from_config(config).start()
+    workers, stop_workers = [], None
+    if bot_manager.command_queue is not None and config.get("queue", {}).get("workers", 0):
+        from core.command_queue import start_worker_processes
+        workers, stop_workers = start_worker_processes(config, config["queue"]["workers"])
+    listener = None
+    if config.get("mentions", {}).get("enabled", False) and bot_manager.reddit_pool is not None:
+        logging.warning("The mention listener needs the praw backend (reddit.backend); not starting it.")
+    elif config.get("mentions", {}).get("enabled", False):
+        from core.mention_listener import MentionListener
+        listener = MentionListener(bot_manager, config)
+        threading.Thread(target=listener.run, name="MentionListener", daemon=True).start()
+    scheduler = Scheduler(bot_manager, config, config_watcher=config_watcher,
+                          bots=[bot.username for bot in bots] if args.bots else None)
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        scheduler.stop()
+    finally:
+        if listener is not None:
+            listener.stop()
+        if stop_workers is not None:
+            stop_workers.set()
+            for worker in workers:
+                worker.join(timeout=30)
+        bot_manager.shutdown()
+        exporter.stop()
+    return 0
+
+COMMANDS = {
+    "post": cmd_post,
+    "reply": cmd_reply,
+    "learn": cmd_learn,
+    "run-scheduler": cmd_run_scheduler,
+    "bench": cmd_bench,
+    "dry-run": cmd_dry_run,
+}
+
+def main(argv=None):
+    args = parse_args(argv)
     logging.basicConfig(
-        level=logging.INFO,
+        level=getattr(logging, args.log_level.upper(), logging.INFO),
         format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S"
     )
-    
+    command = args.command or "run-scheduler"
+    from config.config import ConfigError
     try:
-        config = load_config("config/config.yaml")
-    except Exception as e:
+        return COMMANDS[command](args)
+    except (FileNotFoundError, ConfigError) as e:
         logging.error(f"Failed to load configuration: {e}")
-        sys.exit(1)
-
-    account_manager = AccountManager(config.get("accounts", []))
-    bot_manager = BotManager(config, account_manager)
-    
-    # Define the subreddit to learn from.
-    learn_subreddit = "DnDGreentext"
-    
-    bots = bot_manager.get_bots()
-    if bots:
-        bots[0].learn_and_post(learn_subreddit)
-    else:
-        logging.error("No bots available.")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
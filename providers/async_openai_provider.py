@@ -0,0 +1,78 @@
+import asyncio
+import time
+from core.generation_pool import GenerationPool
+from core.metrics import REGISTRY
+from providers.openai_provider import OpenAIProvider
+
+class AsyncOpenAIProvider(OpenAIProvider):
+    def __init__(self, api_key, pool=None, max_in_flight=4, **kwargs):
+        """
+        OpenAIProvider whose completions run as coroutines, bounded by a GenerationPool.
+
+        The synchronous generate_* methods keep working for RedditBot: they submit the request
+        to the pool's loop and wait, so calls made from several threads overlap instead of queueing.
+
+        Parameters:
+            api_key: The OpenAI API key.
+            pool: A GenerationPool shared with other providers. A private pool is created if omitted.
+            max_in_flight: In-flight limit for the private pool (ignored when a pool is given).
+            **kwargs: Prompt, personality and memory settings passed to OpenAIProvider.
+        """
+        super().__init__(api_key, **kwargs)
+        self.pool = pool or GenerationPool(max_in_flight)
+
+    async def agenerate_post_content(self, learned_context=None):
+        text = await self._acomplete(self._post_messages(learned_context), max_tokens=150, temperature=0.7,
+                                     operation="post")
+        return self._parse_post(text)
+
+    async def agenerate_reply_content(self, target, chain_index):
+        # Thread context collection walks PRAW objects synchronously; keep it off the event loop.
+        loop = asyncio.get_running_loop()
+        context = await loop.run_in_executor(None, self._reply_context, target)
+        return await self._acomplete(self._reply_messages(context, chain_index), max_tokens=100, temperature=0.7,
+                                     operation="reply")
+
+    async def _acomplete(self, messages, max_tokens, temperature, operation="completion"):
+        key = self._cache_key(messages, max_tokens, temperature, operation)
+        if key is not None:
+            cached = await self._run_cache(self._cache_get, key)
+            if cached is not None:
+                return cached
+        ticket = None
+        if self.admission is not None:
+            ticket = await self.admission.aadmit(self.name, self._estimate_tokens(messages, max_tokens))
+        start = time.perf_counter()
+
+        async def attempt(timeout):
+            with REGISTRY.time_request("openai", operation, bot=self.name, model=self.model):
+                return await self._arequest(messages, max_tokens, temperature, timeout)
+
+        try:
+            if self.resilience is None:
+                response = await attempt(self.request_timeout)
+            else:
+                deadline = self.resilience.new_deadline()
+                response = await self.resilience.acall(operation, lambda: attempt(deadline.cap(self.request_timeout)),
+                                                       deadline=deadline)
+        except Exception:
+            self._release(ticket)
+            raise
+        text, usage = self._response_text(response, ticket, operation)
+        if key is not None:
+            await self._run_cache(self._cache_set, key, text, usage, start)
+        return text
+
+    async def _run_cache(self, fn, *args):
+        # The disk tier is SQLite; its reads and writes run in the loop's default executor.
+        if getattr(self.cache, "disk_path", None) is None:
+            return fn(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, fn, *args)
+
+    async def _arequest(self, messages, max_tokens, temperature, timeout=None):
+        async with self.pool.semaphore():
+            return await self._client().acreate(**self._request_kwargs(messages, max_tokens, temperature, timeout))
+
+    def _request(self, messages, max_tokens, temperature, timeout=None):
+        return self.pool.run(self._arequest(messages, max_tokens, temperature, timeout))
@@ -0,0 +1,72 @@
+import logging
+from abc import ABC, abstractmethod
+from core.metrics import REGISTRY
+
+class ContentProvider(ABC):
+    """
+    Interface every content provider implements. RedditBot and BotManager only use these methods,
+    so providers can be swapped per bot in config (provider section).
+    """
+
+    @abstractmethod
+    def generate_post_content(self, learned_context=None, idempotency_key=None):
+        """
+        Return (title, body) for a new post, optionally shaped by learned subreddit context.
+        idempotency_key is the same for every attempt at one command; providers may return the
+        content generated for an earlier attempt.
+        """
+
+    @abstractmethod
+    def generate_reply_content(self, target, chain_index=0):
+        """
+        Return the text of reply #chain_index+1 to a submission or comment.
+        """
+
+    @abstractmethod
+    def collect_thread_context(self, target):
+        """
+        Return the text of the thread leading to target, as given to the model.
+        """
+
+    def generate_reply_contents(self, targets, chain_index=0):
+        """
+        Return one reply per target. Providers that can batch requests override this.
+        """
+        return [self.generate_reply_content(target, chain_index) for target in targets]
+
+
+class FallbackProvider(ContentProvider):
+    def __init__(self, primary, fallback, name=None, no_fallback=()):
+        """
+        Uses primary and switches to fallback for any call the primary fails (including calls
+        rejected by an open circuit breaker or a used-up token budget), so bots keep producing
+        content while the remote model is degraded. Exceptions of the no_fallback types are re-raised.
+        """
+        self.primary = primary
+        self.fallback = fallback
+        self.name = name or ""
+        self.no_fallback = tuple(no_fallback)
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def _call(self, method, *args):
+        try:
+            return getattr(self.primary, method)(*args)
+        except self.no_fallback:
+            raise
+        except Exception as e:
+            REGISTRY.inc("provider_fallbacks_total", bot=self.name, kind=type(e).__name__)
+            self.logger.warning(f"{type(self.primary).__name__}.{method} failed for {self.name}, using "
+                                f"{type(self.fallback).__name__}: {e}")
+            return getattr(self.fallback, method)(*args)
+
+    def generate_post_content(self, learned_context=None, idempotency_key=None):
+        return self._call("generate_post_content", learned_context, idempotency_key)
+
+    def generate_reply_content(self, target, chain_index=0):
+        return self._call("generate_reply_content", target, chain_index)
+
+    def generate_reply_contents(self, targets, chain_index=0):
+        return self._call("generate_reply_contents", targets, chain_index)
+
+    def collect_thread_context(self, target):
+        return self._call("collect_thread_context", target)
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+class CompletionCache:
+    def __init__(self, memory_max_entries=256, memory_ttl=3600, disk_path=None, disk_ttl=86400,
+                 disk_max_entries=10000, report_every=100, clock=time.time):
+        """
+        Two-tier cache for completion text: an in-memory LRU in front of an optional SQLite file.
+
+        Parameters:
+            memory_max_entries: Maximum number of entries kept in memory (least recently used are evicted).
+            memory_ttl: Seconds an in-memory entry stays valid.
+            disk_path: Path of the SQLite file. The disk tier is disabled when omitted.
+            disk_ttl: Seconds an on-disk entry stays valid.
+            disk_max_entries: Maximum number of rows kept on disk (least recently used are evicted).
+            report_every: Log hit/miss statistics after this many lookups (0 disables the report).
+            clock: Time source, replaceable in tests.
+        """
+        self.memory_max_entries = memory_max_entries
+        self.memory_ttl = memory_ttl
+        self.disk_path = disk_path
+        self.disk_ttl = disk_ttl
+        self.disk_max_entries = disk_max_entries
+        self.report_every = report_every
+        self.clock = clock
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0,
+                       "saved_seconds": 0.0, "saved_tokens": 0}
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    @staticmethod
+    def make_key(model, messages, **params):
+        """
+        Build a cache key from the model, the sampling parameters and a hash of the prompt messages.
+        """
+        digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode("utf-8")).hexdigest()
+        param_text = ",".join(f"{name}={params[name]}" for name in sorted(params))
+        return f"{model}|{param_text}|{digest}"
+
+    def _connect(self):
+        if self._db is None:
+            directory = os.path.dirname(self.disk_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, tokens INTEGER NOT NULL, "
+                "latency REAL NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS completions_accessed ON completions (accessed_at)")
+            self._db.commit()
+        return self._db
+
+    def get(self, key):
+        """
+        Return the cached completion text for key, or None on a miss.
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, tokens, latency, created_at = entry
+                if now - created_at <= self.memory_ttl:
+                    self._memory.move_to_end(key)
+                    self._record_hit("memory_hits", tokens, latency)
+                    return value
+                del self._memory[key]
+            if self.disk_path:
+                db = self._connect()
+                row = db.execute(
+                    "SELECT value, tokens, latency, created_at FROM completions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, tokens, latency, created_at = row
+                    if now - created_at <= self.disk_ttl:
+                        db.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (now, key))
+                        db.commit()
+                        self._remember(key, (value, tokens, latency, now))
+                        self._record_hit("disk_hits", tokens, latency)
+                        return value
+                    db.execute("DELETE FROM completions WHERE key = ?", (key,))
+                    db.commit()
+            self._stats["misses"] += 1
+            self._maybe_report()
+            return None
+
+    def set(self, key, value, tokens=0, latency=0.0):
+        """
+        Store a completion along with the tokens and seconds it cost, so hits can report savings.
+        """
+        now = self.clock()
+        with self._lock:
+            self._remember(key, (value, tokens, latency, now))
+            if self.disk_path:
+                db = self._connect()
+                db.execute(
+                    "INSERT OR REPLACE INTO completions (key, value, tokens, latency, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, value, tokens, latency, now, now)
+                )
+                db.execute("DELETE FROM completions WHERE created_at < ?", (now - self.disk_ttl,))
+                db.execute(
+                    "DELETE FROM completions WHERE key IN ("
+                    "SELECT key FROM completions ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_max_entries,)
+                )
+                db.commit()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max_entries:
+            self._memory.popitem(last=False)
+
+    def _record_hit(self, tier, tokens, latency):
+        self._stats["hits"] += 1
+        self._stats[tier] += 1
+        self._stats["saved_tokens"] += tokens
+        self._stats["saved_seconds"] += latency
+        self._maybe_report()
+
+    def _maybe_report(self):
+        lookups = self._stats["hits"] + self._stats["misses"]
+        if self.report_every and lookups % self.report_every == 0:
+            self.logger.info(
+                f"Completion cache: {self._stats['hits']} hits ({self._stats['memory_hits']} memory, "
+                f"{self._stats['disk_hits']} disk), {self._stats['misses']} misses, "
+                f"saved {self._stats['saved_tokens']} tokens and {self._stats['saved_seconds']:.1f}s"
+            )
@@ -0,0 +1,171 @@
+import random
+import re
+import threading
+from collections import OrderedDict
+from core.style_profiles import PROFILE_HEADER
+from providers.base import ContentProvider
+
+_WORD = re.compile(r"\S+")
+_SENTENCE_END = (".", "!", "?")
+
+class NGramModel:
+    def __init__(self, text, order=2):
+        """
+        Word-level Markov chain: maps each run of order words to the words seen after it.
+        """
+        self.order = order
+        self.transitions = {}
+        self.starts = []
+        words = _WORD.findall(text)
+        for index in range(len(words) - order):
+            state = tuple(words[index:index + order])
+            self.transitions.setdefault(state, []).append(words[index + order])
+            if index == 0 or words[index - 1].endswith(_SENTENCE_END):
+                self.starts.append(state)
+        if not self.starts:
+            self.starts = list(self.transitions)
+
+    def __bool__(self):
+        return bool(self.transitions)
+
+    def generate(self, rng, max_words, min_words=1):
+        """
+        Walk the chain from a sentence start, stopping at a sentence end once min_words are out.
+        """
+        state = rng.choice(self.starts)
+        words = list(state)
+        while len(words) < max_words:
+            followers = self.transitions.get(state)
+            if not followers:
+                if len(words) >= min_words:
+                    break
+                state = rng.choice(self.starts)
+                words.extend(state)
+                continue
+            words.append(rng.choice(followers))
+            state = tuple(words[-self.order:])
+            if len(words) >= min_words and words[-1].endswith(_SENTENCE_END):
+                break
+        return " ".join(words[:max_words])
+
+
+class LocalProvider(ContentProvider):
+    TITLE_TEMPLATES = (
+        "Thoughts on {topic}",
+        "Anyone else into {topic}?",
+        "A quick story about {topic}",
+        "What I learned about {topic}",
+    )
+    REPLY_TEMPLATES = (
+        "Good point about {topic}.",
+        "I had the same experience with {topic}.",
+        "Interesting take on {topic}, thanks for sharing.",
+    )
+
+    def __init__(self, personality=None, memory=None, corpus_store=None, subreddits=None, seed=None,
+                 max_cached_models=8, name=None):
+        """
+        Offline content provider: an n-gram model trained on learned subreddit context (or, without it,
+        on the stored corpus, personality and memory), with templates as a last resort.
+        Needs no network and generates in microseconds, for load tests, dry runs and as the fallback
+        when the remote model is degraded.
+
+        Parameters:
+            personality: The bot's personality description (also used as training text).
+            memory: The bot's memory (also used as training text).
+            corpus_store: Optional SubredditCorpusStore whose saved windows are used as training text.
+            subreddits: Subreddits whose stored corpus is used when no learned context is given.
+            seed: Optional seed for reproducible output.
+            max_cached_models: Number of trained models kept, keyed by their training text. The model
+                trained on the stored corpus is kept separately and rebuilt when a corpus file changes.
+            name: The bot's username (for logging).
+        """
+        self.personality = personality or ""
+        self.memory = memory or ""
+        self.corpus_store = corpus_store
+        self.subreddits = subreddits or []
+        self.name = name or ""
+        self.max_cached_models = max_cached_models
+        self._models = OrderedDict()
+        self._corpus_model = None  # (corpus file mtimes, training text, model)
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    def _model(self, text):
+        with self._lock:
+            model = self._models.get(text)
+            if model is None:
+                model = self._models[text] = NGramModel(text)
+                if len(self._models) > self.max_cached_models:
+                    self._models.popitem(last=False)
+            else:
+                self._models.move_to_end(text)
+            return model
+
+    def _corpus_training(self):
+        """
+        Return (training text, model) for posts without learned context. The corpus files are only
+        re-read, and the model retrained, when one of them has changed since the last call.
+        """
+        key = None
+        if self.corpus_store is not None:
+            key = (self.corpus_store.directory,
+                   tuple((name, self.corpus_store.modified_at(name)) for name in self.subreddits))
+        with self._lock:
+            if self._corpus_model is None or self._corpus_model[0] != key:
+                text = self._training_text()
+                self._corpus_model = (key, text, NGramModel(text))
+            return self._corpus_model[1:]
+
+    def _corpus_text(self):
+        if self.corpus_store is None:
+            return ""
+        return "\n".join(
+            f"{post['title']}. {post['selftext']}"
+            for name in self.subreddits
+            for post in self.corpus_store.load(name).get("posts", [])
+        )
+
+    def _training_text(self, learned_context=None):
+        if learned_context and learned_context.startswith(PROFILE_HEADER):
+            # Train on the profile's example posts, not its statistics.
+            learned_context = "\n".join(re.findall(r"(?m)^Post (?:Title|Body): .*$", learned_context))
+        if learned_context:
+            text = re.sub(r"(?m)^Post (Title|Body): ", "", learned_context)
+        else:
+            text = self._corpus_text()
+        return f"{text}\n{self.personality}\n{self.memory}".strip()
+
+    def _topic(self, text):
+        words = [word.strip(".,!?\"'()") for word in _WORD.findall(text)]
+        words = [word for word in words if len(word) > 4]
+        return self._random.choice(words).lower() if words else "this"
+
+    def generate_post_content(self, learned_context=None, idempotency_key=None):
+        if learned_context:
+            text = self._training_text(learned_context)
+            model = self._model(text)
+        else:
+            text, model = self._corpus_training()
+        if not model:
+            topic = self._topic(text)
+            return (self._random.choice(self.TITLE_TEMPLATES).format(topic=topic),
+                    f"Just wanted to share some thoughts on {topic}. {self.personality}".strip())
+        title = model.generate(self._random, max_words=12, min_words=4).rstrip(".!?,;:")
+        body = " ".join(model.generate(self._random, max_words=40, min_words=8) for _ in range(3))
+        return title, body
+
+    def generate_reply_content(self, target, chain_index=0):
+        context = self.collect_thread_context(target)
+        model = self._model(f"{context}\n{self.personality}\n{self.memory}".strip())
+        if not model:
+            return self._random.choice(self.REPLY_TEMPLATES).format(topic=self._topic(context))
+        return model.generate(self._random, max_words=40, min_words=6)
+
+    def collect_thread_context(self, target):
+        """
+        Text of the target itself. Ancestors are not fetched, since that would need the network.
+        """
+        if hasattr(target, "title"):
+            return f"{target.title}. {getattr(target, 'selftext', '')}"
+        return getattr(target, "body", "") or ""
@@ -1,86 +1,351 @@
-import openai
+import json
+import logging
+import time
+from core.http_session import install_openai_session
+from core.metrics import REGISTRY
+from providers.base import ContentProvider
+from providers.thread_context import ThreadContextBuilder
+from providers.token_budget import TokenCounter, budget_learned_context, budget_thread_parts
 
-class OpenAIProvider:
-    def __init__(self, api_key, post_prompt=None, reply_prompt=None, personality=None, memory=None):
+def response_usage(response):
+    """
+    Return the usage block of a ChatCompletion response as a dict (empty when absent).
+    """
+    usage = getattr(response, "usage", None)
+    return dict(usage) if usage else {}
+
+def record_usage(response, model, bot, prefix_tokens=0):
+    """
+    Count prompt and completion tokens reported by a ChatCompletion response, the tokens of the
+    request's static prefix (cacheable by the API) and the prompt tokens the API reports as cached.
+    """
+    usage = response_usage(response)
+    REGISTRY.inc("openai_prompt_tokens_total", usage.get("prompt_tokens", 0), model=model, bot=bot)
+    REGISTRY.inc("openai_completion_tokens_total", usage.get("completion_tokens", 0), model=model, bot=bot)
+    if prefix_tokens:
+        REGISTRY.inc("openai_prompt_prefix_tokens_total", prefix_tokens, model=model, bot=bot)
+    cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+    if cached:
+        REGISTRY.inc("openai_cached_prompt_tokens_total", cached, model=model, bot=bot)
+    return usage
+
+class OpenAIProvider(ContentProvider):
+    # Operations whose completions may be served from the completion cache. Posts are only cached per
+    # command (keyed by its idempotency key, see generate_post_content): the scheduled post job sends
+    # the same prompt every interval, and a cached answer would submit an identical post again.
+    CACHED_OPERATIONS = ("reply", "reply_batch")
+
+    def __init__(self, api_key, post_prompt=None, reply_prompt=None, personality=None, memory=None, model="gpt-3.5-turbo",
+                 cache=None, thread_context=None, completion_client=None, name=None, context_token_budget=None,
+                 max_batch_size=5, session_factory=None, request_timeout=None, resilience=None, memory_store=None,
+                 memory_top_k=5, memory_token_budget=None, admission=None):
         self.api_key = api_key
-        openai.api_key = api_key
         self.post_prompt = post_prompt or "Generate an engaging Reddit post title and body."
         self.reply_prompt = reply_prompt or "Generate a thoughtful reply to the following Reddit content:"
         self.personality = personality or ""
         self.memory = memory or ""
+        self.model = model
+        self.cache = cache
+        self.thread_context = thread_context or ThreadContextBuilder()
+        # Object exposing create()/acreate() like openai.ChatCompletion; defaults to the openai module's.
+        self.completion_client = completion_client
+        # Label used for this provider's metrics (the bot's username).
+        self.name = name or ""
+        # Maximum tokens of learned or thread context per prompt (None = unlimited).
+        self.context_token_budget = context_token_budget
+        self.token_counter = TokenCounter(model)
+        self.last_dropped_tokens = 0
+        self.max_batch_size = max_batch_size
+        # Callable returning the shared requests.Session for OpenAI calls (see core/http_session.py).
+        self.session_factory = session_factory
+        # Seconds, or a (connect, read) tuple, allowed per completion request (None = client default).
+        self.request_timeout = request_timeout
+        # Resilience (deadline, retries, circuit breaker) applied to every completion; None = single attempt.
+        self.resilience = resilience
+        # Optional MemoryStore: when set, the memories relevant to each call are retrieved into the
+        # trailing message (at most memory_top_k, within memory_token_budget tokens) instead of the
+        # whole memory string being sent in the prefix.
+        self.memory_store = memory_store
+        self.memory_top_k = memory_top_k
+        self.memory_token_budget = memory_token_budget
+        # Optional AdmissionController that every request must be admitted by (token budgets).
+        self.admission = admission
+        # Static system messages sent ahead of every post/reply request. They are built once, so
+        # consecutive requests share an identical prefix the API can serve from its prompt cache;
+        # only the trailing user message changes per call.
+        self.post_prefix = self._prefix_messages(self.post_prompt)
+        self.reply_prefix = self._prefix_messages(self.reply_prompt)
+        self._prefix_tokens = None
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def _prefix_messages(self, prompt):
+        # Instructions first: they are the same for every bot, so the shared prefix spans bots too.
+        persona = f"Personality: {self.personality}"
+        if self.memory_store is None:
+            persona += f"\nMemory: {self.memory}"
+        return [{"role": "system", "content": prompt}, {"role": "system", "content": persona}]
+
+    def _memories(self, query):
+        """
+        Memories relevant to query, formatted for the trailing message ("" without a memory store).
+        """
+        if self.memory_store is None:
+            return ""
+        start = time.perf_counter()
+        try:
+            memories = self.memory_store.retrieve(query, self.memory_top_k, self.memory_token_budget, self.token_counter)
+        except Exception as e:
+            self.logger.warning(f"Memory retrieval failed for {self.name}: {e}")
+            return ""
+        finally:
+            REGISTRY.observe("memory_retrieval_seconds", time.perf_counter() - start, bot=self.name)
+        if not memories:
+            return ""
+        return "Relevant memories:\n" + "".join(f"- {memory}\n" for memory in memories) + "\n"
 
-    def generate_post_content(self, learned_context=None):
+    @property
+    def prefix_tokens(self):
+        """
+        Prompt tokens that stay constant between calls, per request kind ({"post": n, "reply": n}).
+        """
+        if self._prefix_tokens is None:
+            self._prefix_tokens = {
+                "post": self.token_counter.count_messages(self.post_prefix),
+                "reply": self.token_counter.count_messages(self.reply_prefix)
+            }
+            self.logger.debug(f"Constant prompt prefix for {self.name or 'provider'}: {self._prefix_tokens['post']} "
+                              f"post token(s), {self._prefix_tokens['reply']} reply token(s).")
+        return self._prefix_tokens
+
+    def _operation_prefix_tokens(self, operation):
+        return self.prefix_tokens["post" if operation == "post" else "reply"]
+
+    def generate_post_content(self, learned_context=None, idempotency_key=None):
         """
         Generate post content using OpenAI's ChatCompletion API, incorporating personality,
-        memory, and optionally additional learned context.
+        memory, and optionally additional learned context. With an idempotency_key, a retry of the
+        same command gets the content generated for its earlier attempt from the completion cache.
+        """
+        text = self._complete(self._post_messages(learned_context), max_tokens=150, temperature=0.7, operation="post",
+                              scope=idempotency_key)
+        return self._parse_post(text)
+
+    def generate_reply_content(self, target, chain_index):
         """
-        prompt = (
-            f"{self.post_prompt}\n\n"
-            f"Personality: {self.personality}\n"
-            f"Memory: {self.memory}\n"
+        Generate a reply using OpenAI's ChatCompletion API, incorporating personality, memory,
+        and the full thread context.
+        """
+        context = self._reply_context(target)
+        return self._complete(self._reply_messages(context, chain_index), max_tokens=100, temperature=0.7,
+                              operation="reply")
+
+    def generate_reply_contents(self, targets, chain_index=0):
+        """
+        Generate replies for several targets, sharing one request (and one personality/memory preamble)
+        per batch of up to max_batch_size targets. Replies that cannot be parsed out of the batch
+        response are generated individually. Returns one reply per target, in order, with None for a
+        target whose reply could not be generated (the bot then generates that one on its own).
+        """
+        contexts = [self._reply_context(target) for target in targets]
+        replies = []
+        for start in range(0, len(contexts), self.max_batch_size):
+            batch = contexts[start:start + self.max_batch_size]
+            parsed = [None] * len(batch)
+            if len(batch) > 1:
+                try:
+                    text = self._complete(self._batch_reply_messages(batch, chain_index),
+                                          max_tokens=100 * len(batch), temperature=0.7, operation="reply_batch")
+                    parsed = self._parse_batch_replies(text, len(batch))
+                except Exception as e:
+                    self.logger.warning(f"Batch reply generation failed, falling back to single replies: {e}")
+            for index, context in enumerate(batch):
+                if parsed[index] is None:
+                    try:
+                        parsed[index] = self._complete(self._reply_messages(context, chain_index), max_tokens=100,
+                                                       temperature=0.7, operation="reply")
+                    except Exception as e:
+                        # One failed reply must not cost the replies to the other targets.
+                        self.logger.warning(f"Reply generation failed for target {start + index + 1}: {e}")
+            replies.extend(parsed)
+        return replies
+
+    def _batch_reply_messages(self, contexts, chain_index):
+        targets = "\n\n".join(
+            f"Target {index + 1}:\n{context}" for index, context in enumerate(contexts)
         )
-        if learned_context:
-            prompt += f"Context: {learned_context}\n"
-        prompt += "\nPost:"
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=150,
-            temperature=0.7
+        prompt = self._memories("\n".join(contexts)) + (
+            f"Write reply #{chain_index+1} for each of the {len(contexts)} targets below. "
+            f"Respond with only a JSON array of {len(contexts)} strings, where item N is the reply to Target N.\n\n"
+            f"{targets}\n\n"
+            f"Replies:"
         )
-        text = response.choices[0].message['content'].strip()
+        return self.reply_prefix + [{"role": "user", "content": prompt}]
+
+    def _parse_batch_replies(self, text, count):
+        """
+        Parse a JSON array of replies. Returns a list of count entries, with None for any reply that is missing.
+        """
+        start, end = text.find("["), text.rfind("]")
+        if start == -1 or end < start:
+            self.logger.warning("Batch reply response contained no JSON array.")
+            return [None] * count
+        try:
+            items = json.loads(text[start:end + 1])
+        except ValueError as e:
+            self.logger.warning(f"Could not parse batch reply response: {e}")
+            return [None] * count
+        if not isinstance(items, list) or len(items) != count:
+            self.logger.warning(f"Batch reply response had {len(items) if isinstance(items, list) else 0} "
+                                f"item(s), expected {count}.")
+            return [None] * count
+        return [item.strip() if isinstance(item, str) and item.strip() else None for item in items]
+
+    def _post_messages(self, learned_context=None):
+        if learned_context and self.context_token_budget is not None:
+            learned_context, dropped = budget_learned_context(self.token_counter, learned_context, self.context_token_budget)
+            self._record_dropped("learned", dropped)
+        prompt = self._memories(learned_context)
+        prompt += f"Context: {learned_context}\n\nPost:" if learned_context else "Post:"
+        return self.post_prefix + [{"role": "user", "content": prompt}]
+
+    def _reply_context(self, target):
+        thread_parts = getattr(target, "thread_parts", None)
+        if thread_parts is not None or hasattr(target, "parent_id"):
+            if thread_parts is not None:
+                # Already read from Reddit (see AsyncRedditBot); no requests needed here.
+                parts = list(thread_parts)
+            else:
+                with REGISTRY.time_request("reddit", "thread_context", bot=self.name):
+                    parts = self.thread_context.collect_parts(target)
+            if self.context_token_budget is not None:
+                parts, dropped = budget_thread_parts(self.token_counter, parts, self.context_token_budget)
+                self._record_dropped("thread", dropped)
+            return "\n\n".join(parts)
+        if hasattr(target, "title"):
+            return f"Post Title: {target.title}\nPost Body: {target.selftext}"
+        if hasattr(target, "body"):
+            return target.body
+        return "No context available."
+
+    def _record_dropped(self, kind, dropped):
+        self.last_dropped_tokens = dropped
+        if dropped:
+            REGISTRY.inc("prompt_context_tokens_dropped_total", dropped, bot=self.name, kind=kind)
+            self.logger.info(
+                f"Dropped {dropped} {kind} context token(s) to fit the {self.context_token_budget}-token budget."
+            )
+
+    def _reply_messages(self, context, chain_index):
+        prompt = self._memories(context) + f"Context:\n{context}\n\nReply #{chain_index+1}:"
+        return self.reply_prefix + [{"role": "user", "content": prompt}]
+
+    def _parse_post(self, text):
         lines = text.split("\n", 1)
         title = lines[0] if lines else "Default Title"
         body = lines[1] if len(lines) > 1 else "Default body content."
         return title, body
 
-    def generate_reply_content(self, target, chain_index):
+    def _complete(self, messages, max_tokens, temperature, operation="completion", scope=None):
+        key = self._cache_key(messages, max_tokens, temperature, operation, scope)
+        if key is not None:
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+        ticket = None
+        if self.admission is not None:
+            ticket = self.admission.admit(self.name, self._estimate_tokens(messages, max_tokens))
+        start = time.perf_counter()
+
+        def attempt(timeout):
+            with REGISTRY.time_request("openai", operation, bot=self.name, model=self.model):
+                return self._request(messages, max_tokens, temperature, timeout)
+
+        try:
+            if self.resilience is None:
+                response = attempt(self.request_timeout)
+            else:
+                deadline = self.resilience.new_deadline()
+                response = self.resilience.call(operation, lambda: attempt(deadline.cap(self.request_timeout)),
+                                                deadline=deadline)
+        except Exception:
+            self._release(ticket)
+            raise
+        text, usage = self._response_text(response, ticket, operation)
+        if key is not None:
+            self._cache_set(key, text, usage, start)
+        return text
+
+    def _cache_key(self, messages, max_tokens, temperature, operation, scope=None):
         """
-        Generate a reply using OpenAI's ChatCompletion API, incorporating personality, memory,
-        and the full thread context.
+        Completion cache key for a request, or None when the operation is not served from the cache.
+        Other operations are cached only within a scope (a command's idempotency key).
         """
-        if hasattr(target, "parent_id"):
-            context = self.collect_thread_context(target)
-        else:
-            if hasattr(target, "title"):
-                context = f"Post Title: {target.title}\nPost Body: {target.selftext}"
-            elif hasattr(target, "body"):
-                context = target.body
-            else:
-                context = "No context available."
-        prompt = (
-            f"{self.reply_prompt}\n\n"
-            f"Personality: {self.personality}\n"
-            f"Memory: {self.memory}\n\n"
-            f"Context:\n{context}\n\n"
-            f"Reply #{chain_index+1}:"
-        )
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=100,
-            temperature=0.7
-        )
-        reply = response.choices[0].message['content'].strip()
-        return reply
+        if self.cache is None:
+            return None
+        if operation in self.CACHED_OPERATIONS:
+            return self.cache.make_key(self.model, messages, max_tokens=max_tokens, temperature=temperature)
+        if scope is not None:
+            return self.cache.make_key(self.model, messages, max_tokens=max_tokens, temperature=temperature,
+                                       scope=scope)
+        return None
+
+    def _cache_get(self, key):
+        cached = self.cache.get(key)
+        REGISTRY.inc("completion_cache_lookups_total", result="miss" if cached is None else "hit", bot=self.name)
+        return cached
+
+    def _cache_set(self, key, text, usage, start):
+        self.cache.set(key, text, tokens=usage.get("total_tokens", 0), latency=time.perf_counter() - start)
+
+    def _response_text(self, response, ticket, operation):
+        """
+        Record a response's token usage, settle its admission ticket and return (text, usage).
+        """
+        usage = record_usage(response, self.model, self.name, self._operation_prefix_tokens(operation))
+        self._settle(ticket, usage)
+        return response.choices[0].message['content'].strip(), usage
+
+    def _estimate_tokens(self, messages, max_tokens):
+        """
+        Tokens a request is admitted for: its prompt plus the most it can generate.
+        """
+        return self.token_counter.count_messages(messages) + max_tokens
+
+    def _settle(self, ticket, usage):
+        if ticket is not None:
+            self.admission.settle(ticket, usage.get("total_tokens", ticket.tokens))
+
+    def _release(self, ticket):
+        if ticket is not None:
+            self.admission.release(ticket)
+
+    def _client(self):
+        if self.completion_client is not None:
+            return self.completion_client
+        import openai
+        if self.session_factory is not None:
+            install_openai_session(self.session_factory)
+        return openai.ChatCompletion
+
+    def _request_kwargs(self, messages, max_tokens, temperature, timeout=None):
+        kwargs = {
+            "api_key": self.api_key,
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        if timeout is not None:
+            kwargs["request_timeout"] = timeout
+        return kwargs
+
+    def _request(self, messages, max_tokens, temperature, timeout=None):
+        return self._client().create(**self._request_kwargs(messages, max_tokens, temperature, timeout))
 
     def collect_thread_context(self, target):
         """
         Collect context from the target by traversing the parent chain.
-        Gathers the original post and all parent comments.
-        """
-        context_parts = []
-        current = target
-        while hasattr(current, "parent_id") and isinstance(current.parent_id, str) and current.parent_id.startswith("t1_"):
-            try:
-                context_parts.insert(0, current.body)
-            except AttributeError:
-                pass
-            try:
-                current = current.parent()
-            except Exception:
-                break
-        if hasattr(current, "title") and hasattr(current, "selftext"):
-            submission_text = f"Post Title: {current.title}\nPost Body: {current.selftext}"
-            context_parts.insert(0, submission_text)
-        return "\n\n".join(context_parts)
+        Gathers the original post and all parent comments, using the shared
+        ThreadContextBuilder so ancestors are fetched in bulk and reused across calls.
+        """
+        return self.thread_context.build(target)
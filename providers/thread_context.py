@@ -0,0 +1,140 @@
+import logging
+import threading
+from collections import OrderedDict
+
+class ThreadContextBuilder:
+    def __init__(self, max_cached_comments=5000, max_cached_submissions=500):
+        """
+        Builds reply context (the submission plus the chain of parent comments) with as few
+        Reddit requests as possible.
+
+        The first lookup in a thread fetches the submission's whole comment tree in one request and
+        indexes every comment by fullname. Later lookups in the same thread, including sibling replies
+        handled by other bots sharing this builder, are served from that index.
+
+        Parameters:
+            max_cached_comments: Maximum number of comments remembered across calls.
+            max_cached_submissions: Maximum number of submissions (and their indexed trees) remembered.
+        """
+        self.max_cached_comments = max_cached_comments
+        self.max_cached_submissions = max_cached_submissions
+        self._comments = OrderedDict()     # comment fullname -> (body, parent_id)
+        self._submissions = OrderedDict()  # submission fullname -> context text
+        self._indexed_trees = set()        # submission fullnames whose comment tree was fetched
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def build(self, target):
+        return "\n\n".join(self.collect_parts(target))
+
+    def collect_parts(self, target):
+        """
+        Return the context parts for a comment, ordered from the submission down to the target itself.
+        """
+        parts = []
+        submission = None
+        body, parent_id = self._remember_comment(target)
+        if body:
+            parts.append(body)
+        node = target
+        while isinstance(parent_id, str) and parent_id.startswith("t1_"):
+            entry = self._lookup(parent_id, target)
+            if entry is None:
+                parent = self._fetch_parent(node, parent_id, target)
+                if parent is None:
+                    break
+                if not hasattr(parent, "parent_id"):
+                    submission = parent
+                    break
+                entry = self._remember_comment(parent)
+                node = parent
+            else:
+                # Served from the index; no PRAW object for this ancestor.
+                node = None
+            body, parent_id = entry
+            if body:
+                parts.append(body)
+        submission_text = self._submission_text(submission, target)
+        if submission_text:
+            parts.append(submission_text)
+        parts.reverse()
+        return parts
+
+    def _lookup(self, fullname, target):
+        with self._lock:
+            entry = self._comments.get(fullname)
+            if entry is not None:
+                self._comments.move_to_end(fullname)
+                return entry
+        self._index_tree(target)
+        with self._lock:
+            return self._comments.get(fullname)
+
+    def _index_tree(self, target):
+        """
+        Fetch the target's submission with its full comment tree (one request) and index every comment.
+        """
+        link_id = getattr(target, "link_id", None)
+        submission = getattr(target, "submission", None)
+        if link_id is None or submission is None:
+            return
+        with self._lock:
+            if link_id in self._indexed_trees:
+                return
+            self._indexed_trees.add(link_id)
+        try:
+            submission.comments.replace_more(limit=0)
+            comments = submission.comments.list()
+        except Exception as e:
+            self.logger.warning(f"Could not fetch comment tree for {link_id}: {e}")
+            return
+        for comment in comments:
+            self._remember_comment(comment)
+        self._remember_submission(link_id, submission)
+
+    def _fetch_parent(self, node, parent_id, target):
+        try:
+            if node is not None:
+                return node.parent()
+            reddit = getattr(target, "_reddit", None)
+            if reddit is not None:
+                return next(iter(reddit.info(fullnames=[parent_id])), None)
+        except Exception as e:
+            self.logger.warning(f"Could not fetch parent {parent_id}: {e}")
+        return None
+
+    def _submission_text(self, submission, target):
+        link_id = getattr(target, "link_id", None)
+        if submission is None:
+            with self._lock:
+                if link_id in self._submissions:
+                    return self._submissions[link_id]
+            submission = getattr(target, "submission", None)
+        if submission is None:
+            return ""
+        return self._remember_submission(link_id, submission)
+
+    def _remember_comment(self, comment):
+        body = getattr(comment, "body", None)
+        parent_id = getattr(comment, "parent_id", None)
+        fullname = getattr(comment, "fullname", None)
+        if isinstance(fullname, str):
+            with self._lock:
+                self._comments[fullname] = (body, parent_id)
+                self._comments.move_to_end(fullname)
+                while len(self._comments) > self.max_cached_comments:
+                    self._comments.popitem(last=False)
+        return body, parent_id
+
+    def _remember_submission(self, link_id, submission):
+        try:
+            text = f"Post Title: {submission.title}\nPost Body: {submission.selftext}"
+        except AttributeError:
+            return ""
+        if isinstance(link_id, str):
+            with self._lock:
+                self._submissions[link_id] = text
+                while len(self._submissions) > self.max_cached_submissions:
+                    evicted, _ = self._submissions.popitem(last=False)
+                    self._indexed_trees.discard(evicted)
+        return text
@@ -0,0 +1,136 @@
+import functools
+import logging
+import re
+
+# Characters per token assumed when tiktoken is not installed.
+CHARS_PER_TOKEN = 4
+
+# Framing tokens the chat format adds around every message.
+TOKENS_PER_MESSAGE = 3
+
+OMITTED_MARKER = "[... earlier comments omitted ...]"
+
+logger = logging.getLogger("TokenBudget")
+
+@functools.lru_cache(maxsize=None)
+def _load_encoding(model):
+    """
+    Load (once per model) the tiktoken encoding, or None when tiktoken is unavailable.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        logger.info("tiktoken is not installed; estimating token counts from text length.")
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+class TokenCounter:
+    def __init__(self, model="gpt-3.5-turbo", cache_size=4096):
+        """
+        Counts tokens with the model's tiktoken encoding (estimated from length without tiktoken).
+        Counts are memoized, since the same personality, memory and thread texts recur across prompts.
+        """
+        self.model = model
+        self.count = functools.lru_cache(maxsize=cache_size)(self._count)
+
+    @property
+    def encoding(self):
+        return _load_encoding(self.model)
+
+    def _count(self, text):
+        if not text:
+            return 0
+        encoding = self.encoding
+        if encoding is None:
+            return -(-len(text) // CHARS_PER_TOKEN)
+        return len(encoding.encode(text))
+
+    def truncate(self, text, max_tokens):
+        """
+        Return the longest prefix of text that fits in max_tokens.
+        """
+        if max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+        encoding = self.encoding
+        if encoding is None:
+            return text[:max_tokens * CHARS_PER_TOKEN]
+        return encoding.decode(encoding.encode(text)[:max_tokens])
+
+    def count_messages(self, messages):
+        """
+        Tokens a list of chat messages takes up in the prompt, including the per-message framing.
+        """
+        return sum(TOKENS_PER_MESSAGE + self.count(message["role"]) + self.count(message["content"])
+                   for message in messages)
+
+
+def fit_parts(counter, parts, budget, priority, min_partial_tokens=16):
+    """
+    Keep as many parts as fit within budget tokens, taking them in priority order.
+    The first part that does not fit is truncated if at least min_partial_tokens remain.
+
+    Parameters:
+        counter: The TokenCounter to measure with.
+        parts: List of text parts.
+        budget: Token budget for all kept parts.
+        priority: Indices of parts, most important first.
+
+    Returns (kept, dropped_tokens) where kept maps part index to (possibly truncated) text.
+    """
+    kept = {}
+    remaining = budget
+    dropped = 0
+    exhausted = False
+    for index in priority:
+        tokens = counter.count(parts[index])
+        if not exhausted and tokens <= remaining:
+            kept[index] = parts[index]
+            remaining -= tokens
+            continue
+        if not exhausted and remaining >= min_partial_tokens:
+            kept[index] = counter.truncate(parts[index], remaining)
+            dropped += tokens - counter.count(kept[index])
+            remaining = 0
+        else:
+            dropped += tokens
+        exhausted = True
+    return kept, dropped
+
+
+def budget_thread_parts(counter, parts, budget):
+    """
+    Fit thread context parts (submission first, target comment last) into budget.
+    The submission is kept first, then comments from the nearest parent outwards; a marker
+    replaces any run of dropped comments. Returns (parts, dropped_tokens).
+    """
+    if not parts:
+        return parts, 0
+    priority = [0] + list(range(len(parts) - 1, 0, -1))
+    kept, dropped = fit_parts(counter, parts, budget, priority)
+    result = []
+    gap = False
+    for index in range(len(parts)):
+        if index in kept:
+            if gap:
+                result.append(OMITTED_MARKER)
+                gap = False
+            result.append(kept[index])
+        else:
+            gap = True
+    return result, dropped
+
+
+def budget_learned_context(counter, learned_context, budget):
+    """
+    Fit learned subreddit context into budget, keeping whole posts in their given order (newest first).
+    Returns (text, dropped_tokens).
+    """
+    posts = [post for post in re.split(r"(?m)^(?=Post Title: )", learned_context) if post]
+    kept, dropped = fit_parts(counter, posts, budget, list(range(len(posts))))
+    return "".join(kept[index] for index in sorted(kept)), dropped
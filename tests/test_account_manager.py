@@ -44,3 +44,48 @@ def test_account_manager():
     assert first.username == "user1"
     assert second.username == "user2"
     assert third.username == "user1"
+
+def test_identity_is_resolved_once():
+    accounts = [{"username": "user1", "password": "pass", "client_id": "cid1", "client_secret": "csecret1", "user_agent": "agent1"}]
+    am = AccountManager(accounts)
+    calls = []
+    class CountingReddit(DummyReddit):
+        def me(self):
+            calls.append(self.username)
+            return self.username
+    reddit = CountingReddit("user1")
+    am.reddit_instances = [reddit]
+    assert am.get_identity(reddit) == "user1"
+    assert am.get_identity(reddit) == "user1"
+    assert calls == ["user1"]
+
+def test_identity_falls_back_to_configured_username():
+    accounts = [{"username": "user1", "password": "pass", "client_id": "cid1", "client_secret": "csecret1", "user_agent": "agent1"}]
+    am = AccountManager(accounts)
+    class BrokenReddit(DummyReddit):
+        def me(self):
+            raise Exception("network down")
+    reddit = BrokenReddit("ignored")
+    am.reddit_instances = [reddit]
+    assert am.get_identity(reddit) == "user1"
+
+def test_instances_are_built_lazily(monkeypatch):
+    accounts = [{"username": f"user{i}", "client_id": f"cid{i}"} for i in range(100)]
+    built = []
+    def fake_build(self, acc):
+        built.append(acc["username"])
+        return DummyReddit(acc["username"])
+    monkeypatch.setattr(AccountManager, "_build_reddit", fake_build)
+    am = AccountManager(accounts)
+    assert built == []
+    assert am.get_next_account().username == "user0"
+    assert am.get_instance(0).username == "user0"
+    assert built == ["user0"]
+
+def test_build_reddit_returns_a_separate_instance(monkeypatch):
+    monkeypatch.setattr(AccountManager, "_build_reddit", lambda self, acc: DummyReddit(acc["username"]))
+    am = AccountManager([{"username": "user1"}])
+    separate = am.build_reddit(0)
+    assert separate.username == "user1"
+    assert separate is not am.get_instance(0)
+    assert am.build_reddit(0) is not separate
@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+from core.admission import AdmissionController, BudgetExceeded
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    def __call__(self):
+        return self.now
+    def sleep(self, seconds):
+        self.now += seconds
+
+def make_controller(clock, **kwargs):
+    return AdmissionController(clock=clock, sleep=clock.sleep, **kwargs)
+
+def test_per_bot_budget_isolates_noisy_bot():
+    clock = FakeClock()
+    controller = make_controller(clock, global_limits={"tokens_per_minute": 1000},
+                                 bot_limits={"tokens_per_minute": 400}, policy="reject")
+    controller.admit("noisy", 300)
+    with pytest.raises(BudgetExceeded):
+        controller.admit("noisy", 300)
+    controller.admit("quiet", 300)
+    assert controller.usage("noisy")["tokens_per_minute"] == 300
+    assert controller.usage()["tokens_per_minute"] == 600
+
+def test_settle_and_release_correct_reservations():
+    clock = FakeClock()
+    controller = make_controller(clock, bot_limits={"tokens_per_day": 1000}, policy="reject")
+    ticket = controller.admit("bot", 600)
+    controller.settle(ticket, 150)
+    failed = controller.admit("bot", 800)
+    controller.release(failed)
+    controller.release(failed)
+    assert controller.usage("bot") == {"tokens_per_minute": 150, "tokens_per_day": 150}
+    with pytest.raises(BudgetExceeded):
+        controller.admit("bot", 2000)
+
+def test_queue_policy_waits_for_the_window():
+    clock = FakeClock()
+    controller = make_controller(clock, bot_limits={"tokens_per_minute": 500}, policy="queue", max_wait=90)
+    controller.admit("bot", 400)
+    clock.now += 10
+    controller.admit("bot", 400)
+    # The first reservation leaves the minute window 60s after it was made.
+    assert clock.now == pytest.approx(1060.0)
+    controller.max_wait = 5
+    with pytest.raises(BudgetExceeded):
+        controller.admit("bot", 400)
+
+def test_async_admission_does_not_block():
+    clock = FakeClock()
+    controller = make_controller(clock, global_limits={"tokens_per_minute": 100}, policy="degrade")
+    async def run():
+        await controller.aadmit("bot", 100)
+        with pytest.raises(BudgetExceeded):
+            await controller.aadmit("bot", 1)
+    asyncio.run(run())
+
+def test_apply_config_keeps_usage():
+    clock = FakeClock()
+    controller = make_controller(clock, bot_limits={"tokens_per_minute": 100}, policy="reject")
+    controller.admit("bot", 100)
+    controller.apply_config({"budgets": {"policy": "reject", "per_bot": {"tokens_per_minute": 150}}})
+    controller.admit("bot", 50)
+    with pytest.raises(BudgetExceeded):
+        controller.admit("bot", 1)
@@ -0,0 +1,78 @@
+import asyncio
+import time
+import pytest
+import openai
+from core.generation_pool import GenerationPool
+from providers.async_openai_provider import AsyncOpenAIProvider
+
+class DummyResponse:
+    def __init__(self, text):
+        self.choices = [type("Choice", (), {"message": {"content": text}})()]
+
+def make_slow_acreate(delay, tracker):
+    async def dummy_acreate(*args, **kwargs):
+        tracker["in_flight"] += 1
+        tracker["peak"] = max(tracker["peak"], tracker["in_flight"])
+        await asyncio.sleep(delay)
+        tracker["in_flight"] -= 1
+        user_message = kwargs["messages"][-1]["content"]
+        if "Post:" in user_message:
+            return DummyResponse("Async Title\nAsync Body")
+        return DummyResponse("Async Reply")
+    return dummy_acreate
+
+def test_sync_wrapper_returns_content(monkeypatch):
+    tracker = {"in_flight": 0, "peak": 0}
+    monkeypatch.setattr(openai.ChatCompletion, "acreate", make_slow_acreate(0, tracker))
+    pool = GenerationPool(max_in_flight=2)
+    provider = AsyncOpenAIProvider("dummy_key", pool=pool, personality="Test personality")
+    try:
+        assert provider.generate_post_content() == ("Async Title", "Async Body")
+        class DummyTarget:
+            title = "Dummy Title"
+            selftext = "Dummy Body"
+        assert provider.generate_reply_content(DummyTarget(), 0) == "Async Reply"
+    finally:
+        pool.close()
+
+def test_generation_overlaps_within_limit(monkeypatch):
+    tracker = {"in_flight": 0, "peak": 0}
+    monkeypatch.setattr(openai.ChatCompletion, "acreate", make_slow_acreate(0.1, tracker))
+    pool = GenerationPool(max_in_flight=3)
+    providers = [AsyncOpenAIProvider("dummy_key", pool=pool) for _ in range(6)]
+    try:
+        start = time.perf_counter()
+        results = pool.gather([p.agenerate_post_content() for p in providers])
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.close()
+    assert results == [("Async Title", "Async Body")] * 6
+    assert tracker["peak"] == 3
+    # Six 0.1s calls with three in flight take two rounds, not six.
+    assert elapsed < 0.45
+
+def test_disk_cache_runs_off_the_event_loop(monkeypatch, tmp_path):
+    import threading
+    from providers.completion_cache import CompletionCache
+    tracker = {"in_flight": 0, "peak": 0}
+    monkeypatch.setattr(openai.ChatCompletion, "acreate", make_slow_acreate(0, tracker))
+    cache = CompletionCache(disk_path=str(tmp_path / "cache.db"))
+    threads = []
+    for name in ("get", "set"):
+        original = getattr(cache, name)
+        def record(*args, original=original, **kwargs):
+            threads.append(threading.current_thread().name)
+            return original(*args, **kwargs)
+        monkeypatch.setattr(cache, name, record)
+    pool = GenerationPool()
+    provider = AsyncOpenAIProvider("dummy_key", pool=pool, cache=cache)
+    class DummyTarget:
+        title = "Dummy Title"
+        selftext = "Dummy Body"
+    try:
+        assert provider.generate_reply_content(DummyTarget(), 0) == "Async Reply"
+        assert provider.generate_reply_content(DummyTarget(), 0) == "Async Reply"
+    finally:
+        pool.close()
+        cache.close()
+    assert len(threads) == 3 and "GenerationPool" not in threads
@@ -0,0 +1,172 @@
+import asyncio
+import time
+from bots.async_reddit_bot import AsyncRedditBot, ThreadSnapshot
+from core.bot_manager import BotManager
+from core.corpus_store import SubredditCorpusStore
+
+# Dummy asyncpraw objects: every Reddit call is a coroutine, as in asyncpraw.
+class DummyAsyncReddit:
+    def __init__(self, username, things=None):
+        self.username = username
+        self.things = things or {}
+        self.submitted = []
+        self.closed = False
+        self.requests = 0
+    async def subreddit(self, name):
+        return DummyAsyncSubreddit(self, name)
+    async def submission(self, id=None, url=None, fetch=True):
+        return self.things.get(f"t3_{id}") or DummyAsyncThing(self, "t3", id or url, title="Untitled", selftext="")
+    async def comment(self, id=None, url=None, fetch=True):
+        return self.things.get(f"t1_{id}") or DummyAsyncThing(self, "t1", id or url)
+    async def close(self):
+        self.closed = True
+
+class DummyAsyncSubreddit:
+    def __init__(self, reddit, name):
+        self.reddit = reddit
+        self.name = name
+    async def submit(self, title, selftext):
+        await asyncio.sleep(0.1)
+        self.reddit.submitted.append((self.name, title))
+        return DummyAsyncThing(self.reddit, "t3", f"new_{self.name}", title=title, selftext=selftext)
+    async def new(self, limit, params=None):
+        for i in range(limit):
+            yield DummyAsyncThing(self.reddit, "t3", f"p{i}", title=f"Post {i} Title", selftext=f"Post {i} Body",
+                                  created_utc=1000 - i)
+
+class DummyAsyncThing:
+    def __init__(self, reddit, kind, id, parent=None, **attributes):
+        self.reddit = reddit
+        self.id = id
+        self.fullname = f"{kind}_{id}"
+        self._parent = parent
+        self.loads = 0
+        self.replies = []
+        self._fetched = False
+        self.__dict__.update(attributes)
+    async def load(self):
+        self.loads += 1
+        self.reddit.requests += 1
+        self._fetched = True
+        return self
+    async def refresh(self):
+        # Like asyncpraw, a comment comes back with its nearest ancestors (but not the submission).
+        await self.load()
+        node = self._parent
+        for _ in range(8):
+            if node is None or not node.fullname.startswith("t1_"):
+                break
+            node._fetched = True
+            node = node._parent
+        return self
+    async def parent(self):
+        return self._parent
+    async def reply(self, text):
+        self.replies.append(text)
+        return DummyAsyncThing(self.reddit, "t1", f"reply_to_{self.id}", body=text)
+
+class DummyContentProvider:
+    def __init__(self):
+        self.targets = []
+    def generate_post_content(self, learned_context=None):
+        return ("Learned Title" if learned_context else "Dummy Title", learned_context or "Dummy Body")
+    def generate_reply_content(self, target, chain_index):
+        self.targets.append(target)
+        return f"Reply to {target.fullname}"
+
+class DummyAccountManager:
+    def __init__(self, usernames):
+        self.instances = [DummyAsyncReddit(username) for username in usernames]
+    def build_async_reddit(self, index):
+        return self.instances[index]
+
+def make_bot(reddit, config=None, **kwargs):
+    return AsyncRedditBot(None, config or {"subreddits": ["one", "two"]}, content_provider=DummyContentProvider(),
+                          reddit_instance=reddit, username=reddit.username, **kwargs)
+
+def test_async_bot_posts_to_all_subreddits_concurrently():
+    reddit = DummyAsyncReddit("bot_user_1")
+    bot = make_bot(reddit)
+    start = time.perf_counter()
+    submissions = asyncio.run(bot.handle_command("post"))
+    assert [submission.title for submission in submissions] == ["Dummy Title", "Dummy Title"]
+    assert sorted(reddit.submitted) == [("one", "Dummy Title"), ("two", "Dummy Title")]
+    assert time.perf_counter() - start < 0.18
+
+def test_async_bot_replies_to_fullname_with_thread_context():
+    reddit = DummyAsyncReddit("bot_user_1")
+    submission = DummyAsyncThing(reddit, "t3", "abc", title="Dragons", selftext="Discuss.")
+    parent = DummyAsyncThing(reddit, "t1", "p1", parent=submission, body="I like red ones.")
+    comment = DummyAsyncThing(reddit, "t1", "c1", parent=parent, body="Green ones are better.")
+    reddit.things = {"t1_c1": comment}
+    bot = make_bot(reddit)
+    result = asyncio.run(bot.handle_command("reply", "t1_c1"))
+    assert result.body == "Reply to t1_c1"
+    assert comment.replies == ["Reply to t1_c1"]
+    snapshot = bot.content_provider.targets[0]
+    assert isinstance(snapshot, ThreadSnapshot)
+    assert snapshot.thread_parts == ["Post Title: Dragons\nPost Body: Discuss.", "I like red ones.", "Green ones are better."]
+    assert snapshot.body == "Green ones are better."
+
+def test_async_bot_resolves_queued_targets():
+    reddit = DummyAsyncReddit("bot_user_1")
+    bot = make_bot(reddit)
+    targets = asyncio.run(bot.resolve([{"fullname": "t3_abc"}, "t1_def",
+                                       "https://www.reddit.com/r/test/comments/abc/title/def/"]))
+    assert [target.fullname for target in targets[:2]] == ["t3_abc", "t1_def"]
+    assert targets[2].fullname.startswith("t1_")
+    comments = asyncio.run(bot.handle_command("reply", [{"fullname": "t3_abc"}, "t3_xyz"]))
+    assert [comment.body for comment in comments] == ["Reply to t3_abc", "Reply to t3_xyz"]
+
+def test_async_bot_learns_through_corpus_store(tmp_path):
+    reddit = DummyAsyncReddit("bot_user_1")
+    store = SubredditCorpusStore(directory=str(tmp_path), window_size=10, fetch_limit=5)
+    bot = make_bot(reddit, {"subreddits": [], "learning": {"context_posts": 2}}, corpus_store=store)
+    submission = asyncio.run(bot.handle_command("learn_and_post", "python"))
+    assert submission.title == "Learned Title"
+    assert "Post 0 Title" in submission.selftext and "Post 2 Title" not in submission.selftext
+    assert len(store.load("python")["posts"]) == 10
+    assert reddit.submitted == [("python", "Learned Title")]
+
+def test_bot_manager_runs_async_bots_on_one_loop(monkeypatch):
+    usernames = ["bot_user_1", "bot_user_2", "bot_user_3"]
+    config = {
+        "accounts": [{"username": username} for username in usernames],
+        "subreddits": ["dummy_subreddit"],
+        "reddit": {"backend": "asyncpraw"},
+        "execution": {"parallel": True, "timeout": 0.5}
+    }
+    account_manager = DummyAccountManager(usernames)
+    bot_manager = BotManager(config, account_manager)
+    assert all(isinstance(bot, AsyncRedditBot) for bot in bot_manager.get_bots())
+
+    async def fake_post(self, content=None, idempotency_key=None):
+        await (await self.areddit()).subreddit("dummy_subreddit")
+        await asyncio.sleep(5 if self.username == "bot_user_2" else 0.1)
+        return "done"
+    for bot in bot_manager.get_bots():
+        monkeypatch.setattr(bot, "post", fake_post.__get__(bot))
+    start = time.perf_counter()
+    results = bot_manager.execute_command_for_all("post")
+    assert time.perf_counter() - start < 1.5
+    assert [r.ok for r in results] == [True, False, True]
+    assert isinstance(results[1].error, TimeoutError)
+    assert bot_manager.execute_command_for_bot("bot_user_1", "post").result == "done"
+    bot_manager.shutdown()
+    assert all(reddit.closed for reddit in account_manager.instances)
+
+def test_async_bot_reads_shared_thread_once():
+    reddit = DummyAsyncReddit("bot_user_1")
+    submission = DummyAsyncThing(reddit, "t3", "abc", title="Dragons", selftext="Discuss.")
+    node = submission
+    for depth in range(10):
+        node = DummyAsyncThing(reddit, "t1", f"c{depth}", parent=node, body=f"Comment {depth}")
+    sibling = DummyAsyncThing(reddit, "t1", "s9", parent=node._parent, body="Sibling")
+    reddit.things = {"t1_c9": node, "t1_s9": sibling}
+    bot = make_bot(reddit)
+    comments = asyncio.run(bot.handle_command("reply", ["t1_c9", "t1_s9"]))
+    assert [comment.body for comment in comments] == ["Reply to t1_c9", "Reply to t1_s9"]
+    snapshots = bot.content_provider.targets
+    assert len(snapshots[0].thread_parts) == 11 and snapshots[1].thread_parts[-1] == "Sibling"
+    # Both targets, the submission and one ancestor beyond the first context: 4 requests instead of 22.
+    assert reddit.requests == 4 and submission.loads == 1
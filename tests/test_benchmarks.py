@@ -0,0 +1,49 @@
+from benchmarks.bench_e2e import percentile, run_benchmarks
+from benchmarks.fakes import FakeOpenAIBackend, FakeRedditBackend, FakeTransport, LatencyModel
+from core.http_session import build_session
+
+def test_percentile():
+    values = [i / 100 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.5
+    assert percentile(values, 99) == 0.99
+    assert percentile([], 95) == 0.0
+
+def test_fake_transport_serves_praw():
+    import praw
+    transport = FakeTransport(FakeRedditBackend(seed_posts=3))
+    session = transport.mount(build_session("reddit"))
+    reddit = praw.Reddit(client_id="cid", client_secret="secret", username="bench_bot", password="pw",
+                         user_agent="test", requestor_kwargs={"session": session})
+    assert str(reddit.user.me()) == "bench_bot"
+    assert len(list(reddit.subreddit("sub").new(limit=10))) == 3
+    submission = reddit.subreddit("sub").submit(title="T", selftext="B")
+    comment = submission.reply("first").reply("second")
+    assert comment.parent().body == "first"
+    assert next(reddit.info(fullnames=[comment.fullname])).body == "second"
+    assert list(reddit.subreddit("sub").new(limit=10, params={"before": submission.fullname})) == []
+    assert transport.request_counts["access_token"] == 1 and transport.request_counts["submit"] == 1
+
+def test_fake_transport_serves_openai_and_errors():
+    transport = FakeTransport(openai=FakeOpenAIBackend())
+    session = transport.mount(build_session("openai"))
+    response = session.post("https://api.openai.com/v1/chat/completions",
+                            json={"model": "gpt-4", "messages": [{"role": "user", "content": "x" * 40}]})
+    assert response.json()["usage"]["prompt_tokens"] == 10
+    transport.openai.latency = LatencyModel(error_rate=1.0, seed=1)
+    response = session.post("https://api.openai.com/v1/chat/completions", json={"messages": []})
+    assert response.status_code == 503
+
+def test_run_benchmarks_offline(tmp_path):
+    reports = run_benchmarks(bots=2, iterations=4, data_dir=str(tmp_path))
+    scenarios = [report["scenario"] for report in reports]
+    assert scenarios == [
+        "RedditBot.post", "RedditBot.reply", "RedditBot.learn_and_post",
+        "BotManager.execute_command_for_all[sequential]", "BotManager.execute_command_for_all[parallel]",
+    ]
+    assert all(report["failures"] == 0 for report in reports)
+    assert all(report["operations"] > 0 for report in reports)
+
+def test_memory_benchmark_runs(tmp_path):
+    from benchmarks.bench_memory import run_benchmark
+    inserted, latencies = run_benchmark(str(tmp_path / "bench.db"), entries=200, queries=5, vocabulary=500)
+    assert inserted > 0 and len(latencies) == 5
@@ -37,6 +37,10 @@ class DummyAccountManager:
         self.reddit_instances = [DummyReddit("bot_user_1"), DummyReddit("bot_user_2")]
     def get_next_account(self):
         return self.reddit_instances[0]
+    def get_instance(self, index):
+        return self.reddit_instances[index]
+    def get_identity(self, reddit):
+        return reddit.username
 
 def test_bot_manager_initialization():
     config = {
@@ -84,3 +88,233 @@ def test_bot_manager_execute_command_for_bot(monkeypatch):
         monkeypatch.setattr(bot, "handle_command", fake_handle_command.__get__(bot))
     bot_manager.execute_command_for_bot("bot_user_2", "reply", target="dummy_target")
     assert any(username == "bot_user_2" and command == "reply" and target == "dummy_target" for username, command, target in calls)
+
+def test_bot_manager_prefetches_async_content(monkeypatch):
+    config = {
+        "accounts": [
+            {"username": "bot_user_1", "password": "pass", "client_id": "cid1", "client_secret": "cs1", "user_agent": "ua1"},
+            {"username": "bot_user_2", "password": "pass", "client_id": "cid2", "client_secret": "cs2", "user_agent": "ua2"}
+        ],
+        "subreddits": ["dummy_subreddit"],
+        "openai_api_key": "dummy_key",
+        "openai": {"max_in_flight": 2},
+        "personalities": {}
+    }
+    bot_manager = BotManager(config, DummyAccountManager())
+    async def fake_agenerate(self, learned_context=None):
+        return (f"Title {self.personality}", "Body")
+    from providers.async_openai_provider import AsyncOpenAIProvider
+    monkeypatch.setattr(AsyncOpenAIProvider, "agenerate_post_content", fake_agenerate)
+    calls = []
+    def fake_handle_command(self, command, target=None, content=None):
+        calls.append((self.username, command, content))
+    for bot in bot_manager.get_bots():
+        monkeypatch.setattr(bot, "handle_command", fake_handle_command.__get__(bot))
+    try:
+        bot_manager.execute_command_for_all("post")
+    finally:
+        bot_manager.generation_pool.close()
+    assert calls == [("bot_user_1", "post", ("Title ", "Body")), ("bot_user_2", "post", ("Title ", "Body"))]
+
+def test_startup_defers_heavy_imports():
+    from benchmarks.bench_startup import measure_startup
+    run = measure_startup(accounts=200, repeat=1)[0]
+    assert run["praw_imported"] is False
+    assert run["openai_imported"] is False
+
+def test_bot_manager_parallel_fan_out(monkeypatch):
+    import time
+    config = {
+        "accounts": [{"username": f"bot_user_{i}"} for i in range(1, 5)],
+        "subreddits": ["dummy_subreddit"],
+        "execution": {"parallel": True, "max_workers": 4, "timeout": 0.5}
+    }
+    account_manager = DummyAccountManager()
+    account_manager.reddit_instances = [DummyReddit(f"bot_user_{i}") for i in range(1, 5)]
+    bot_manager = BotManager(config, account_manager)
+    def fake_handle_command(self, command, target):
+        if self.username == "bot_user_2":
+            raise RuntimeError("boom")
+        if self.username == "bot_user_3":
+            time.sleep(2)
+        time.sleep(0.1)
+        return "done"
+    for bot in bot_manager.get_bots():
+        monkeypatch.setattr(bot, "handle_command", fake_handle_command.__get__(bot))
+    start = time.perf_counter()
+    results = bot_manager.execute_command_for_all("post")
+    elapsed = time.perf_counter() - start
+    bot_manager.shutdown()
+    assert [r.username for r in results] == ["bot_user_1", "bot_user_2", "bot_user_3", "bot_user_4"]
+    assert [r.ok for r in results] == [True, False, False, True]
+    assert isinstance(results[1].error, RuntimeError)
+    assert isinstance(results[2].error, TimeoutError)
+    assert results[0].elapsed >= 0.1
+    # Slow and failing bots do not hold up the others.
+    assert elapsed < 1.5
+
+def test_bot_manager_indexes_bots_by_username():
+    config = {"accounts": [{"username": "bot_user_1"}, {"username": "bot_user_2"}]}
+    bot_manager = BotManager(config, DummyAccountManager())
+    assert bot_manager.get_bot("bot_user_2") is bot_manager.get_bots()[1]
+    assert bot_manager.execute_command_for_bot("missing", "post") is None
+
+def test_bot_manager_applies_reloaded_config():
+    import copy
+    config = {
+        "accounts": [{"username": "bot_user_1"}, {"username": "bot_user_2"}],
+        "subreddits": ["dummy_subreddit"],
+        "openai_api_key": "dummy_key",
+        "personalities": {
+            "bot_user_1": {"description": "Personality1", "memory": "Memory1"},
+            "bot_user_2": {"description": "Personality2", "memory": "Memory2"}
+        }
+    }
+    bot_manager = BotManager(config, DummyAccountManager())
+    bot_1, bot_2 = bot_manager.get_bots()
+    provider_1, provider_2 = bot_1.content_provider, bot_2.content_provider
+
+    new_config = copy.deepcopy(config)
+    new_config["subreddits"] = ["other_subreddit"]
+    new_config["personalities"]["bot_user_2"]["description"] = "Changed"
+    bot_manager.apply_config(new_config)
+    assert bot_1.subreddits == ["other_subreddit"]
+    assert bot_1.content_provider is provider_1
+    assert bot_2.content_provider is not provider_2
+    assert bot_2.content_provider.personality == "Changed"
+
+def test_bot_manager_reload_adds_and_removes_accounts():
+    config = {"accounts": [{"username": "user1"}, {"username": "user2"}]}
+    account_manager = AccountManager(config["accounts"])
+    account_manager.reddit_instances = [DummyReddit("user1"), DummyReddit("user2")]
+    bot_manager = BotManager(config, account_manager)
+    reddit_1 = bot_manager.get_bot("user1").reddit
+    bot_manager.apply_config({"accounts": [{"username": "user1"}, {"username": "user3", "password": "x"}]})
+    assert [bot.username for bot in bot_manager.get_bots()] == ["user1", "user3"]
+    assert bot_manager.get_bot("user2") is None
+    # The unchanged account keeps its Reddit instance.
+    assert bot_manager.get_bot("user1").reddit is reddit_1
+    assert account_manager._instances[1] is None
+
+def test_bot_manager_enqueues_commands(tmp_path):
+    config = {
+        "accounts": [{"username": "bot_user_1"}, {"username": "bot_user_2"}],
+        "queue": {"enabled": True, "path": str(tmp_path / "queue.db")}
+    }
+    bot_manager = BotManager(config, DummyAccountManager())
+    ids = bot_manager.enqueue_command_for_all("learn_and_post", "DnDGreentext", idempotency_key="run-1")
+    assert bot_manager.enqueue_command_for_all("learn_and_post", "DnDGreentext", idempotency_key="run-1") == ids
+    assert bot_manager.command_queue.stats() == {"pending": 2}
+    bot_manager.shutdown()
+
+def test_bot_manager_selects_providers_per_bot():
+    from providers.base import FallbackProvider
+    from providers.local_provider import LocalProvider
+    config = {
+        "accounts": [{"username": "bot_user_1"}, {"username": "bot_user_2"}],
+        "openai_api_key": "dummy_key",
+        "provider": {"default": "openai", "fallback": "local", "bots": {"bot_user_2": "local"}}
+    }
+    bot_manager = BotManager(config, DummyAccountManager())
+    bot_1, bot_2 = bot_manager.get_bots()
+    assert isinstance(bot_1.content_provider, FallbackProvider)
+    assert isinstance(bot_2.content_provider, LocalProvider)
+    # Without an API key every bot gets the local provider instead of static strings.
+    bot_manager = BotManager({"accounts": [{"username": "bot_user_1"}]}, DummyAccountManager())
+    assert isinstance(bot_manager.get_bots()[0].content_provider, LocalProvider)
+
+def test_bot_manager_degrades_to_local_when_budget_is_used_up(monkeypatch):
+    import openai
+    from providers.base import FallbackProvider
+    def unexpected_create(*args, **kwargs):
+        raise AssertionError("the budget should refuse this request")
+    monkeypatch.setattr(openai.ChatCompletion, "create", unexpected_create)
+    config = {
+        "accounts": [{"username": "bot_user_1"}],
+        "openai_api_key": "dummy_key",
+        "personalities": {"bot_user_1": {"description": "Loves dragons and wizards.", "memory": ""}},
+        "budgets": {"enabled": True, "policy": "degrade", "per_bot": {"tokens_per_minute": 10}}
+    }
+    bot_manager = BotManager(config, DummyAccountManager())
+    provider = bot_manager.get_bots()[0].content_provider
+    assert isinstance(provider, FallbackProvider)
+    title, body = provider.generate_post_content()
+    assert title and body
+    config = dict(config, budgets=dict(config["budgets"], policy="reject"), provider={"fallback": "local"})
+    bot_manager.apply_config(config)
+    from core.admission import BudgetExceeded
+    with pytest.raises(BudgetExceeded):
+        bot_manager.get_bots()[0].content_provider.generate_post_content()
+
+def test_bot_manager_reload_applies_resilience_to_providers():
+    config = {"accounts": [{"username": "bot_user_1"}], "openai_api_key": "dummy_key"}
+    bot_manager = BotManager(config, DummyAccountManager())
+    bot = bot_manager.get_bots()[0]
+    provider = bot.content_provider
+    bot_manager.apply_config(dict(config, resilience={"openai": {"max_attempts": 7}}))
+    assert bot.content_provider is not provider
+    assert bot.content_provider.resilience.retry_policy.max_attempts == 7
+
+def test_bot_manager_reload_applies_http_settings():
+    config = {"accounts": [{"username": "user1"}], "openai_api_key": "dummy_key", "http": {"read_timeout": 30.0}}
+    account_manager = AccountManager(config["accounts"], session_factory=lambda: None)
+    account_manager.reddit_instances = [DummyReddit("user1")]
+    bot_manager = BotManager(config, account_manager)
+    bot = bot_manager.get_bots()[0]
+    assert bot.reddit is not None
+    provider = bot.content_provider
+    bot_manager.apply_config(dict(config, http={"read_timeout": 5.0, "pool_maxsize": 64}))
+    assert bot.content_provider is not provider
+    assert bot.content_provider.request_timeout == (5.0, 5.0)
+    assert account_manager.session_factory.options == {"read_timeout": 5.0, "pool_maxsize": 64}
+    assert account_manager._instances == [None] and bot._reddit is None
+
+def test_timeout_counts_queue_time_and_busy_bots_are_not_rerun(monkeypatch):
+    import threading
+    from core.bot_manager import BotBusy
+    config = {
+        "accounts": [{"username": "bot_user_1"}, {"username": "bot_user_2"}],
+        "subreddits": ["dummy_subreddit"],
+        "execution": {"parallel": True, "max_workers": 1, "timeout": 0.2}
+    }
+    account_manager = DummyAccountManager()
+    account_manager.reddit_instances = [DummyReddit("bot_user_1"), DummyReddit("bot_user_2")]
+    bot_manager = BotManager(config, account_manager)
+    release = threading.Event()
+    calls = []
+    def fake_handle_command(self, command, target):
+        calls.append(self.username)
+        if self.username == "bot_user_1":
+            release.wait(5)
+        return "done"
+    for bot in bot_manager.get_bots():
+        monkeypatch.setattr(bot, "handle_command", fake_handle_command.__get__(bot))
+    # bot_user_2 never gets the single worker, yet the call still returns at the deadline.
+    results = bot_manager.execute_command_for_all("post")
+    assert [r.ok for r in results] == [False, False]
+    assert all(isinstance(r.error, TimeoutError) for r in results)
+    # Both commands are still in flight, so neither bot is started a second time.
+    results = bot_manager.execute_command_for_all("post")
+    assert all(isinstance(r.error, BotBusy) for r in results)
+    assert isinstance(bot_manager.execute_command_for_bot("bot_user_1", "post").error, BotBusy)
+    release.set()
+    bot_manager.shutdown()
+    assert calls.count("bot_user_1") == 1
+    assert calls.count("bot_user_2") <= 1
+
+def test_command_results_report_whether_reddit_was_written():
+    config = {"accounts": [{"username": "bot_user_1"}], "subreddits": ["dummy_subreddit"]}
+    bot_manager = BotManager(config, DummyAccountManager())
+    bot = bot_manager.get_bot("bot_user_1")
+    class FailingProvider:
+        def generate_post_content(self, learned_context=None):
+            raise RuntimeError("model unavailable")
+    bot.content_provider = FailingProvider()
+    result = bot_manager.execute_command_for_bot("bot_user_1", "post")
+    assert result.ok is False and result.wrote is False
+    bot.content_provider = None
+    def failing_submit(title, selftext):
+        raise TimeoutError("no response")
+    bot.reddit.subreddit = lambda name: type("S", (), {"submit": staticmethod(failing_submit)})()
+    result = bot_manager.execute_command_for_bot("bot_user_1", "post")
+    assert result.ok is False and result.wrote is True
@@ -0,0 +1,159 @@
+import threading
+import pytest
+from core.command_queue import CommandQueue, CommandWorker, encode_target, resolve_target
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+    def __call__(self):
+        return self.now
+
+class DummyThing:
+    def __init__(self, fullname):
+        self.fullname = fullname
+
+class DummyReddit:
+    def submission(self, id):
+        return DummyThing(f"t3_{id}")
+    def comment(self, id):
+        return DummyThing(f"t1_{id}")
+
+def test_targets_round_trip_as_fullnames():
+    encoded = encode_target([DummyThing("t3_abc"), DummyThing("t1_def")])
+    assert encoded == [{"fullname": "t3_abc"}, {"fullname": "t1_def"}]
+    resolved = resolve_target(DummyReddit(), encoded)
+    assert [thing.fullname for thing in resolved] == ["t3_abc", "t1_def"]
+    assert encode_target("DnDGreentext") == "DnDGreentext"
+
+def test_enqueue_is_idempotent(tmp_path):
+    queue = CommandQueue(str(tmp_path / "queue.db"))
+    first = queue.enqueue("bot_user_1", "post", idempotency_key="k1")
+    assert queue.enqueue("bot_user_1", "post", idempotency_key="k1") == first
+    assert queue.enqueue("bot_user_1", "post") != first
+    assert queue.stats() == {"pending": 2}
+
+def test_expired_lease_is_reclaimed_and_retries_back_off(tmp_path):
+    clock = FakeClock()
+    queue = CommandQueue(str(tmp_path / "queue.db"), lease_seconds=60, max_attempts=2, retry_backoff=10, clock=clock)
+    command_id = queue.enqueue("bot_user_1", "learn_and_post", "DnDGreentext")
+    claimed = queue.claim("worker-a")
+    assert claimed.target == "DnDGreentext" and claimed.attempts == 1
+    assert queue.claim("worker-b") is None
+
+    # worker-a dies; once the lease expires another worker picks the command up.
+    clock.now += 61
+    reclaimed = queue.claim("worker-b")
+    assert reclaimed.id == command_id and reclaimed.attempts == 2
+    assert queue.complete(command_id, "worker-a") is False
+    assert queue.fail(command_id, "worker-b", RuntimeError("boom")) == "failed"
+    assert queue.get(command_id)["error"] == "boom"
+
+def test_failed_command_is_retried_after_backoff(tmp_path):
+    clock = FakeClock()
+    queue = CommandQueue(str(tmp_path / "queue.db"), max_attempts=3, retry_backoff=10, clock=clock)
+    command_id = queue.enqueue("bot_user_1", "post")
+    queue.claim("worker-a")
+    assert queue.fail(command_id, "worker-a", "rate limited") == "pending"
+    assert queue.claim("worker-a") is None
+    clock.now += 10
+    assert queue.claim("worker-a").id == command_id
+    assert queue.complete(command_id, "worker-a", ["t3_new"]) is True
+    assert queue.get(command_id)["result"] == ["t3_new"]
+
+def test_concurrent_claims_never_share_a_command(tmp_path):
+    path = str(tmp_path / "queue.db")
+    producer = CommandQueue(path)
+    for i in range(40):
+        producer.enqueue("bot_user_1", "post", idempotency_key=f"post-{i}")
+    claimed = []
+    def work(name):
+        queue = CommandQueue(path)
+        while True:
+            command = queue.claim(name)
+            if command is None:
+                break
+            claimed.append(command.id)
+            queue.complete(command.id, name)
+        queue.close()
+    threads = [threading.Thread(target=work, args=(f"worker-{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == sorted(set(claimed))
+    assert len(claimed) == 40
+    assert producer.stats() == {"done": 40}
+
+class DummyBot:
+    def __init__(self, username):
+        self.username = username
+        self.reddit = DummyReddit()
+
+class DummyBotManager:
+    def __init__(self):
+        self.bots = [DummyBot("bot_user_1")]
+        self.calls = []
+    def get_bots(self):
+        return self.bots
+    def get_bot(self, username):
+        return self.bots[0] if username == "bot_user_1" else None
+    def execute_command_for_bot(self, username, command, target=None, idempotency_key=None):
+        from core.bot_manager import CommandResult
+        self.calls.append((username, command, target.fullname))
+        return CommandResult(username, command, True, DummyThing("t1_reply"), None, 0.0)
+
+def test_worker_resolves_targets_and_completes(tmp_path):
+    queue = CommandQueue(str(tmp_path / "queue.db"))
+    command_id = queue.enqueue("bot_user_1", "reply", DummyThing("t3_abc"))
+    manager = DummyBotManager()
+    worker = CommandWorker(manager, queue, worker_id="w1", sleep=lambda seconds: None)
+    assert worker.run(max_commands=1) == 1
+    assert manager.calls == [("bot_user_1", "reply", "t3_abc")]
+    assert queue.get(command_id)["status"] == "done"
+    assert queue.get(command_id)["result"] == "t1_reply"
+
+def test_worker_renews_lease_while_command_runs(tmp_path):
+    import time
+    queue = CommandQueue(str(tmp_path / "queue.db"), lease_seconds=0.3)
+    command_id = queue.enqueue("bot_user_1", "reply", DummyThing("t3_abc"))
+    manager = DummyBotManager()
+    original = manager.execute_command_for_bot
+    def slow_execute(username, command, target=None, idempotency_key=None):
+        time.sleep(0.5)
+        # Past the original lease: a second worker must not get the command.
+        assert queue.claim("w2") is None
+        return original(username, command, target)
+    manager.execute_command_for_bot = slow_execute
+    worker = CommandWorker(manager, queue, worker_id="w1", sleep=lambda seconds: None)
+    assert worker.run(max_commands=1) == 1
+    assert queue.get(command_id)["status"] == "done"
+
+def test_failures_after_a_write_are_not_retried(tmp_path):
+    from core.bot_manager import CommandResult
+    queue = CommandQueue(str(tmp_path / "queue.db"), max_attempts=3)
+    command_id = queue.enqueue("bot_user_1", "reply", DummyThing("t3_abc"))
+    manager = DummyBotManager()
+    manager.execute_command_for_bot = lambda username, command, target=None, idempotency_key=None: CommandResult(
+        username, command, False, None, TimeoutError("deadline"), 0.0)
+    CommandWorker(manager, queue, worker_id="w1").run_once()
+    record = queue.get(command_id)
+    assert record["status"] == "failed" and record["attempts"] == 1
+
+def test_failures_before_a_write_are_retried(tmp_path):
+    from core.bot_manager import CommandResult
+    queue = CommandQueue(str(tmp_path / "queue.db"), max_attempts=3)
+    command_id = queue.enqueue("bot_user_1", "reply", DummyThing("t3_abc"))
+    manager = DummyBotManager()
+    manager.execute_command_for_bot = lambda username, command, target=None, idempotency_key=None: CommandResult(
+        username, command, False, None, RuntimeError("generation failed"), 0.0, False)
+    CommandWorker(manager, queue, worker_id="w1").run_once()
+    assert queue.get(command_id)["status"] == "pending"
+
+def test_command_for_a_missing_bot_is_failed(tmp_path):
+    queue = CommandQueue(str(tmp_path / "queue.db"), max_attempts=1)
+    command_id = queue.enqueue("bot_user_1", "reply", DummyThing("t3_abc"))
+    manager = DummyBotManager()
+    manager.execute_command_for_bot = lambda username, command, target=None, idempotency_key=None: None
+    assert CommandWorker(manager, queue, worker_id="w1").run_once() is None
+    record = queue.get(command_id)
+    assert record["status"] == "failed" and "bot_user_1" in record["error"]
@@ -0,0 +1,84 @@
+import pytest
+from providers.completion_cache import CompletionCache
+from providers.openai_provider import OpenAIProvider
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    def __call__(self):
+        return self.now
+
+def test_memory_lru_eviction():
+    cache = CompletionCache(memory_max_entries=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"
+    cache.set("c", "C")
+    # "b" was least recently used and is evicted.
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+
+def test_ttl_expiry_and_disk_tier(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "cache.sqlite3")
+    cache = CompletionCache(memory_ttl=10, disk_path=path, disk_ttl=100, clock=clock)
+    cache.set("key", "value", tokens=42, latency=1.5)
+    clock.now += 50
+    # Memory entry expired, disk entry still valid.
+    assert cache.get("key") == "value"
+    stats = cache.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["saved_tokens"] == 42
+    clock.now += 200
+    assert cache.get("key") is None
+    cache.close()
+
+def test_disk_tier_persists_and_is_bounded(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = CompletionCache(disk_path=path, disk_max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, key.upper())
+    cache.close()
+    reopened = CompletionCache(disk_path=path)
+    assert reopened.get("a") is None
+    assert reopened.get("c") == "C"
+    reopened.close()
+
+def test_provider_uses_cache(monkeypatch):
+    calls = []
+    class DummyResponse:
+        def __init__(self, text):
+            self.choices = [type("Choice", (), {"message": {"content": text}})()]
+            self.usage = {"total_tokens": 30}
+    def dummy_request(self, messages, max_tokens, temperature, timeout=None):
+        calls.append(messages)
+        return DummyResponse("Cached Reply")
+    monkeypatch.setattr(OpenAIProvider, "_request", dummy_request)
+    cache = CompletionCache()
+    provider = OpenAIProvider("dummy_key", personality="Test personality", cache=cache)
+    target = type("Target", (), {"body": "Nice dragon!"})()
+    assert provider.generate_reply_content(target, 0) == "Cached Reply"
+    assert provider.generate_reply_content(target, 0) == "Cached Reply"
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_posts_are_cached_only_within_one_command(monkeypatch):
+    calls = []
+    class DummyResponse:
+        def __init__(self, text):
+            self.choices = [type("Choice", (), {"message": {"content": text}})()]
+            self.usage = {"total_tokens": 30}
+    def dummy_request(self, messages, max_tokens, temperature, timeout=None):
+        calls.append(messages)
+        return DummyResponse(f"Title {len(calls)}\nBody")
+    monkeypatch.setattr(OpenAIProvider, "_request", dummy_request)
+    provider = OpenAIProvider("dummy_key", cache=CompletionCache())
+    # A retry of the same command gets the content generated for its first attempt...
+    assert provider.generate_post_content(idempotency_key="command-1") == ("Title 1", "Body")
+    assert provider.generate_post_content(idempotency_key="command-1") == ("Title 1", "Body")
+    # ...while another command, or a post without a key, samples afresh.
+    assert provider.generate_post_content(idempotency_key="command-2") == ("Title 2", "Body")
+    assert provider.generate_post_content() == ("Title 3", "Body")
+    assert provider.generate_post_content() == ("Title 4", "Body")
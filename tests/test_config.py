@@ -29,3 +29,74 @@ personalities:
     assert config["accounts"][0]["username"] == "test_user"
     assert config["subreddits"][0] == "test_subreddit"
     assert config["openai"]["post_prompt"] == "Test post prompt"
+
+def test_load_config_rejects_invalid_values(tmp_path):
+    from config.config import ConfigError
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text("""
+accounts:
+  - username: "a"
+  - username: "a"
+posting:
+  interval: -5
+replies:
+  chain_length: 0
+budgets:
+  policy: "spend"
+  per_bot:
+    tokens_per_minute: 0
+reddit:
+  backend: "trio"
+""")
+    with pytest.raises(ConfigError) as excinfo:
+        load_config(str(config_file))
+    message = str(excinfo.value)
+    assert "duplicated" in message
+    assert "posting.interval" in message
+    assert "replies.chain_length" in message
+    assert "budgets.policy" in message and "budgets.per_bot.tokens_per_minute" in message
+    assert "reddit.backend" in message
+
+def test_load_config_caches_by_mtime_and_accepts_yml(tmp_path):
+    import os
+    config_file = tmp_path / "config.yml"
+    config_file.write_text("subreddits: [one]\n")
+    first = load_config(str(tmp_path / "config.yaml"))
+    assert first["subreddits"] == ["one"]
+    assert load_config(str(config_file)) is first
+    config_file.write_text("subreddits: [two]\n")
+    stat = os.stat(config_file)
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert load_config(str(config_file))["subreddits"] == ["two"]
+
+def test_config_watcher_reports_changed_sections(tmp_path):
+    import os
+    from config.config import ConfigWatcher
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text("subreddits: [one]\nposting:\n  interval: 100\n")
+    watcher = ConfigWatcher(str(config_file))
+    assert watcher.poll() == (None, set())
+
+    def rewrite(text, offset):
+        config_file.write_text(text)
+        stat = os.stat(config_file)
+        os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + offset * 1_000_000_000))
+
+    rewrite("subreddits: [one]\nposting:\n  interval: 50\n", 1)
+    config, changed = watcher.poll()
+    assert changed == {"posting"}
+    assert config["posting"]["interval"] == 50
+
+    # An invalid edit is ignored and the last good configuration stays active.
+    rewrite("subreddits: [one]\nposting:\n  interval: fast\n", 2)
+    assert watcher.poll() == (None, set())
+    assert watcher.config["posting"]["interval"] == 50
+
+def test_empty_sections_become_empty_mappings(tmp_path):
+    from core.bot_manager import BotManager
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text("accounts:\n  - username: bot_user_1\nsubreddits:\nlearning:\nposting:\nexecution:\n")
+    config = load_config(str(config_file))
+    assert config["learning"] == {} and config["posting"] == {} and config["subreddits"] == []
+    bot_manager = BotManager(config, None)
+    assert [bot.username for bot in bot_manager.get_bots()] == ["bot_user_1"]
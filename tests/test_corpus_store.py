@@ -0,0 +1,49 @@
+import pytest
+from core.corpus_store import SubredditCorpusStore
+
+class DummySubmission:
+    def __init__(self, number):
+        self.fullname = f"t3_{number}"
+        self.title = f"Post {number} Title"
+        self.selftext = f"Post {number} Body"
+        self.created_utc = number
+
+class DummySubreddit:
+    def __init__(self, newest):
+        self.newest = newest
+        self.calls = []
+    def new(self, limit, params=None):
+        self.calls.append((limit, params))
+        oldest = 0
+        if params and "before" in params:
+            oldest = int(params["before"][3:])
+        numbers = range(self.newest, oldest, -1)
+        if params and "before" in params:
+            # Reddit returns the submissions closest to the anchor.
+            numbers = list(numbers)[-limit:]
+        return [DummySubmission(n) for n in list(numbers)[:limit]]
+
+def test_first_refresh_reads_window(tmp_path):
+    store = SubredditCorpusStore(directory=str(tmp_path), window_size=10, fetch_limit=5)
+    subreddit = DummySubreddit(newest=30)
+    posts = store.refresh(subreddit, "Dummy")
+    assert [p["fullname"] for p in posts] == [f"t3_{n}" for n in range(30, 20, -1)]
+    assert subreddit.calls == [(10, None)]
+
+def test_incremental_refresh_fetches_only_new(tmp_path):
+    store = SubredditCorpusStore(directory=str(tmp_path), window_size=10, fetch_limit=5)
+    store.refresh(DummySubreddit(newest=30), "Dummy")
+    subreddit = DummySubreddit(newest=32)
+    # A new store instance reads the persisted window.
+    posts = SubredditCorpusStore(directory=str(tmp_path), window_size=10, fetch_limit=5).refresh(subreddit, "Dummy")
+    assert subreddit.calls == [(5, {"before": "t3_30"})]
+    assert [p["fullname"] for p in posts][:3] == ["t3_32", "t3_31", "t3_30"]
+    assert len(posts) == 10
+
+def test_large_gap_rereads_window(tmp_path):
+    store = SubredditCorpusStore(directory=str(tmp_path), window_size=10, fetch_limit=5)
+    store.refresh(DummySubreddit(newest=30), "Dummy")
+    subreddit = DummySubreddit(newest=50)
+    posts = store.refresh(subreddit, "Dummy")
+    assert subreddit.calls == [(5, {"before": "t3_30"}), (10, None)]
+    assert posts[0]["fullname"] == "t3_50"
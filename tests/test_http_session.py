@@ -0,0 +1,67 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from core.http_session import build_session, pool_stats, session_factory
+from core.metrics import REGISTRY
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Set-Cookie", "session=abc")
+        self.end_headers()
+        self.wfile.write(body)
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/"
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_session_reuses_connections_and_reports_stats(server):
+    REGISTRY.reset()
+    session = build_session(name="test", pool_maxsize=2, connect_timeout=1, read_timeout=2)
+    for _ in range(5):
+        assert session.get(server).text == "ok"
+    assert pool_stats(session) == {"requests": 5, "connections": 1, "reused": 4}
+    counters = {(c["name"], c["labels"]["client"]): c["value"] for c in REGISTRY.snapshot()["counters"]}
+    assert counters[("http_requests_total", "test")] == 5
+    assert counters[("http_connections_opened_total", "test")] == 1
+    # Cookies are never stored on the shared session.
+    assert len(session.cookies) == 0
+
+def test_session_applies_default_timeouts(monkeypatch):
+    import requests
+    seen = []
+    def fake_request(self, method, url, **kwargs):
+        seen.append(kwargs.get("timeout"))
+    monkeypatch.setattr(requests.Session, "request", fake_request)
+    session = build_session(connect_timeout=1.5, read_timeout=20)
+    session.request("GET", "https://example.invalid")
+    session.request("GET", "https://example.invalid", timeout=16.0)
+    assert seen == [(1.5, 20), (1.5, 16.0)]
+
+def test_session_factory_shares_one_session():
+    config = {"http": {"pool_maxsize": 8, "read_timeout": 10, "openai": {"read_timeout": 60}}}
+    factory = session_factory(config, "openai")
+    assert factory.options == {"pool_maxsize": 8, "read_timeout": 60}
+    assert factory() is factory()
+    assert factory().read_timeout == 60
+
+def test_connections_are_counted_when_pools_are_evicted(server):
+    REGISTRY.reset()
+    # One pool is kept, so alternating hosts evicts the other host's pool (and its connection).
+    session = build_session(name="evict", pool_connections=1, connect_timeout=1, read_timeout=2)
+    other = server.replace("127.0.0.1", "localhost")
+    for url in (server, other, server, server):
+        assert session.get(url).text == "ok"
+    assert pool_stats(session) == {"requests": 4, "connections": 3, "reused": 1}
+    counters = {(c["name"], c["labels"]["client"]): c["value"] for c in REGISTRY.snapshot()["counters"]}
+    assert counters[("http_connections_opened_total", "evict")] == 3
@@ -0,0 +1,75 @@
+import time
+import pytest
+from providers.base import ContentProvider, FallbackProvider
+from providers.local_provider import LocalProvider, NGramModel
+
+LEARNED = (
+    "Post Title: My dragon ate the party wizard\nPost Body: The wizard cast fireball. The dragon was not amused. "
+    "The party fled into the forest and the bard wrote a song about it.\n\n"
+    "Post Title: Our rogue stole from the king\nPost Body: The king was not amused. The rogue fled into the night.\n\n"
+)
+
+class DummyComment:
+    def __init__(self, body):
+        self.body = body
+
+def test_local_provider_generates_offline_from_learned_context():
+    provider = LocalProvider(personality="A grumpy dungeon master.", seed=1)
+    assert isinstance(provider, ContentProvider)
+    title, body = provider.generate_post_content(LEARNED)
+    assert title and body
+    vocabulary = set(LEARNED.split()) | set("A grumpy dungeon master.".split())
+    assert set(body.split()) <= vocabulary
+    reply = provider.generate_reply_content(DummyComment("The dragon was not amused by the wizard."))
+    assert reply
+
+def test_local_provider_falls_back_to_templates():
+    provider = LocalProvider(seed=1)
+    title, body = provider.generate_post_content()
+    assert title in [t.format(topic="this") for t in LocalProvider.TITLE_TEMPLATES]
+    assert provider.generate_reply_content(DummyComment("")) in [t.format(topic="this") for t in LocalProvider.REPLY_TEMPLATES]
+
+def test_local_provider_is_fast():
+    provider = LocalProvider(seed=1)
+    provider.generate_post_content(LEARNED)
+    start = time.perf_counter()
+    for _ in range(1000):
+        provider.generate_post_content(LEARNED)
+    # Trained models are cached, so each post costs well under a millisecond.
+    assert (time.perf_counter() - start) / 1000 < 0.001
+
+def test_local_provider_rereads_corpus_only_when_it_changes(tmp_path):
+    import os
+    from core.corpus_store import SubredditCorpusStore
+    store = SubredditCorpusStore(directory=str(tmp_path))
+    store._save("dnd", {"posts": [{"title": "My dragon ate the wizard", "selftext": "The wizard was not amused."}]})
+    loads = []
+    original_load = store.load
+    store.load = lambda name: loads.append(name) or original_load(name)
+    provider = LocalProvider(corpus_store=store, subreddits=["dnd"], seed=1)
+    for _ in range(5):
+        provider.generate_post_content()
+    assert loads == ["dnd"]
+    store._save("dnd", {"posts": [{"title": "Our rogue stole the crown", "selftext": "The king fled."}]})
+    path = os.path.join(str(tmp_path), "dnd.json")
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 1))
+    title, body = provider.generate_post_content()
+    assert loads == ["dnd", "dnd"]
+    assert "dragon" not in f"{title} {body}" and "rogue" in f"{title} {body}"
+
+def test_ngram_model_stops_at_sentence_end():
+    model = NGramModel("one two three. four five six.")
+    import random
+    assert model.generate(random.Random(0), max_words=10, min_words=1).endswith(".")
+
+def test_fallback_provider_switches_on_failure():
+    class Failing(ContentProvider):
+        def generate_post_content(self, learned_context=None):
+            raise ConnectionError("down")
+        def generate_reply_content(self, target, chain_index=0):
+            return "primary reply"
+        def collect_thread_context(self, target):
+            return ""
+    provider = FallbackProvider(Failing(), LocalProvider(seed=1), name="bot_user_1")
+    assert provider.generate_post_content()[0]
+    assert provider.generate_reply_content(DummyComment("hi")) == "primary reply"
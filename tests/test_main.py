@@ -0,0 +1,103 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+import main
+from core.bot_manager import CommandResult
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+CONFIG = """
+accounts:
+  - username: "bot_user_1"
+    password: "pass"
+    client_id: "cid"
+    client_secret: "csecret"
+    user_agent: "ua"
+  - username: "bot_user_2"
+    password: "pass"
+    client_id: "cid2"
+    client_secret: "csecret2"
+    user_agent: "ua2"
+subreddits:
+  - "test_subreddit"
+openai_api_key: "dummy_key"
+personalities:
+  bot_user_1:
+    description: "A grumpy dungeon master. The dragon was not amused by the party wizard."
+    memory: "Runs a weekly tabletop game."
+"""
+
+def test_parser_subcommands():
+    parser = main.build_parser()
+    args = parser.parse_args(["--bots", "bot_user_1", "post", "--subreddit", "a", "--subreddit", "b"])
+    assert args.command == "post" and args.subreddits == ["a", "b"] and args.bots == "bot_user_1"
+    args = parser.parse_args(["reply", "t3_abc", "t1_def"])
+    assert args.targets == ["t3_abc", "t1_def"]
+    args = parser.parse_args(["dry-run", "learn", "python", "--offline"])
+    assert (args.action, args.argument, args.offline) == ("learn", "python", True)
+    args = main.parse_args(["bench", "--bots", "50", "--help"])
+    assert args.bench_args == ["--bots", "50", "--help"]
+    assert parser.parse_args([]).command is None
+
+def test_cli_does_not_import_heavy_modules_for_help():
+    script = (
+        "import sys, main\n"
+        "main.build_parser().format_help()\n"
+        "print(sorted(m for m in ('praw', 'openai', 'yaml', 'requests') if m in sys.modules))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", script], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "[]"
+
+def test_dry_run_offline_uses_local_provider(tmp_path, capsys):
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(CONFIG)
+    exit_code = main.main(["--config", str(config_file), "--bots", "bot_user_1", "--json", "dry-run", "post", "--offline"])
+    assert exit_code == 0
+    outputs = json.loads(capsys.readouterr().out)
+    assert [output["bot"] for output in outputs] == ["bot_user_1"]
+    assert outputs[0]["title"] and outputs[0]["body"]
+
+def test_dry_run_offline_reply_needs_text(tmp_path, capsys):
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(CONFIG)
+    assert main.main(["--config", str(config_file), "dry-run", "reply", "--offline", "--text", "Nice dragon!"]) == 0
+    assert capsys.readouterr().out.count("reply: ") == 2
+    with pytest.raises(SystemExit):
+        main.main(["--config", str(config_file), "dry-run", "reply", "--offline"])
+
+def test_unknown_bot_exits(tmp_path):
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(CONFIG)
+    with pytest.raises(SystemExit):
+        main.main(["--config", str(config_file), "--bots", "nobody", "dry-run", "post", "--offline"])
+
+def test_report_exit_code(capsys):
+    args = main.build_parser().parse_args(["post"])
+    ok = CommandResult("bot_user_1", "post", True, [type("S", (), {"fullname": "t3_abc"})()], None, 0.1)
+    failed = CommandResult("bot_user_2", "post", False, None, RuntimeError("boom"), 0.2)
+    assert main.report(args, [ok]) == 0
+    assert main.report(args, [ok, failed]) == 1
+    output = capsys.readouterr().out
+    assert "bot_user_1: ok ['t3_abc']" in output and "bot_user_2: FAILED boom" in output
+
+def test_resolve_target_accepts_fullnames_and_urls():
+    class DummyReddit:
+        def submission(self, id=None, url=None):
+            return ("submission", id or url)
+        def comment(self, id=None, url=None):
+            return ("comment", id or url)
+    reddit = DummyReddit()
+    assert main.resolve_target(reddit, "t3_abc") == ("submission", "abc")
+    assert main.resolve_target(reddit, "t1_def") == ("comment", "def")
+    url = "https://www.reddit.com/r/test/comments/abc/some_title/"
+    assert main.resolve_target(reddit, url) == ("submission", url)
+    url = "https://www.reddit.com/r/test/comments/abc/some_title/def/"
+    assert main.resolve_target(reddit, url) == ("comment", url)
+
+def test_invalid_config_exits_cleanly(tmp_path, caplog):
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text("accounts: []\nsubreddits: not-a-list\n")
+    assert main.main(["--config", str(config_file), "dry-run", "post", "--offline"]) == 1
+    assert "Invalid configuration" in caplog.text
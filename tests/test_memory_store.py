@@ -0,0 +1,56 @@
+import pytest
+from core.memory_store import MemoryStore
+from core.text_terms import stem
+
+class WordCounter:
+    def count(self, text):
+        return len(text.split())
+
+def test_search_ranks_relevant_entries(tmp_path):
+    store = MemoryStore(str(tmp_path / "bot.db"))
+    store.add("post", "Posted in r/gaming: My favourite roguelike is Hades")
+    store.add("reply", "Replied to: best laptop for college\nGet one with a good keyboard")
+    store.add("post", "Posted in r/cooking: Sourdough starter tips")
+    results = store.search("Which roguelike should I play next?", limit=2)
+    assert results[0] == ("Posted in r/gaming: My favourite roguelike is Hades", "post")
+    assert store.retrieve("sourdough bread", top_k=1) == ["Posted in r/cooking: Sourdough starter tips"]
+    store.close()
+
+def test_search_without_indexed_terms_returns_nothing(tmp_path):
+    store = MemoryStore(str(tmp_path / "bot.db"))
+    store.add("post", "first entry")
+    store.add("post", "second entry")
+    assert store.retrieve(None, top_k=1) == []
+    assert store.retrieve("unknownword", top_k=1) == []
+    assert store.retrieve("second", top_k=1) == ["second entry"]
+
+def test_retrieve_respects_token_budget(tmp_path):
+    store = MemoryStore(str(tmp_path / "bot.db"))
+    store.add("post", "python " + "long " * 20)
+    store.add("post", "python tips")
+    assert store.retrieve("python", top_k=5, token_budget=5, token_counter=WordCounter()) == ["python tips"]
+
+def test_notes_replace_previous_notes(tmp_path):
+    path = str(tmp_path / "bot.db")
+    store = MemoryStore(path)
+    store.set_notes("I study physics. I play chess.")
+    store.set_notes("I study physics. I play chess.")
+    assert len(store) == 2
+    store.set_notes("I cook pasta.")
+    assert len(store) == 1
+    assert store.retrieve("chess openings") == []
+    assert store.retrieve("cook dinner") == ["I cook pasta."]
+    store.close()
+    assert len(MemoryStore(path)) == 1
+
+def test_prunes_oldest_posts_but_keeps_notes(tmp_path):
+    store = MemoryStore(str(tmp_path / "bot.db"), max_entries=5)
+    store.set_notes("I love astronomy.")
+    for index in range(10):
+        store.add("reply", f"reply number {index} about telescopes")
+    assert len(store) <= 5
+    assert "I love astronomy." in store.retrieve("astronomy")
+    replies = [content for content, _ in store.search("telescopes", 10)]
+    assert "reply number 9 about telescopes" in replies and "reply number 0 about telescopes" not in replies
+    docs = store._connect().execute("SELECT docs FROM terms WHERE term = ?", (stem("telescopes"),)).fetchone()[0]
+    assert docs == len(replies)
@@ -0,0 +1,98 @@
+import pytest
+from core.mention_listener import MentionListener
+
+class DummyMention:
+    def __init__(self, fullname, body, author="someone"):
+        self.fullname = fullname
+        self.body = body
+        self.author = author
+        self.created_utc = None
+        self.read = False
+    def mark_read(self):
+        self.read = True
+
+class DummyBot:
+    def __init__(self, username):
+        self.username = username
+        self.replies = []
+    def reply(self, target, reddit=None):
+        self.replies.append(target.fullname)
+        return "comment"
+
+class DummyBotManager:
+    def __init__(self):
+        self.bots = [DummyBot("bot_user_1"), DummyBot("bot_user_2")]
+    def get_bots(self):
+        return self.bots
+
+def test_listener_replies_once_to_summons(tmp_path):
+    mentions = {
+        "bot_user_1": [
+            DummyMention("t1_a", "hey u/bot_user_1 what do you think?"),
+            DummyMention("t1_b", "u/Bot_User_1 from our own account", author="bot_user_2"),
+            DummyMention("t1_c", "no summons here"),
+            DummyMention("t1_a", "hey u/bot_user_1 what do you think?"),
+        ],
+        "bot_user_2": [],
+    }
+    def stream_factory(bot):
+        return iter(mentions[bot.username] + [None])
+    manager = DummyBotManager()
+    config = {"mentions": {"seen_path": str(tmp_path / "seen.db"), "poll_interval": 0}}
+    listener = MentionListener(manager, config, stream_factory=stream_factory, sleep=lambda seconds: None)
+    listener.run(max_passes=1)
+    assert manager.bots[0].replies == ["t1_a"]
+    assert mentions["bot_user_1"][0].read
+
+    # A new listener (after a restart) sees the same backlog and skips everything.
+    restarted = MentionListener(manager, config, stream_factory=stream_factory, sleep=lambda seconds: None)
+    restarted.run(max_passes=1)
+    assert manager.bots[0].replies == ["t1_a"]
+
+def test_listener_skips_backlog_and_mentions_older_than_retention(tmp_path):
+    now = [1_000_000.0]
+    old = DummyMention("t1_old", "u/bot_user_1 from last year")
+    old.created_utc = now[0] - 40 * 86400
+    backlog = DummyMention("t1_backlog", "u/bot_user_1 before we started")
+    backlog.created_utc = now[0] - 60
+    fresh = DummyMention("t1_fresh", "u/bot_user_1 just now")
+    fresh.created_utc = now[0] + 5
+    mentions = [old, backlog, fresh]
+    manager = DummyBotManager()
+    config = {"mentions": {"seen_path": str(tmp_path / "seen.db"), "poll_interval": 0, "retention_days": 30}}
+    stream_factory = lambda bot: iter((mentions if bot.username == "bot_user_1" else []) + [None])
+    listener = MentionListener(manager, config, stream_factory=stream_factory, sleep=lambda seconds: None,
+                               clock=lambda: now[0])
+    listener.run(max_passes=1)
+    assert manager.bots[0].replies == ["t1_fresh"]
+
+    # After a restart the backlog cutoff no longer applies, but the retention window still does.
+    now[0] += 3600
+    late = DummyMention("t1_late", "u/bot_user_1 sent while we were down")
+    late.created_utc = now[0] - 1800
+    mentions[:] = [old, late]
+    restarted = MentionListener(manager, config, stream_factory=stream_factory, sleep=lambda seconds: None,
+                                clock=lambda: now[0])
+    restarted.run(max_passes=1)
+    assert manager.bots[0].replies == ["t1_fresh", "t1_late"]
+
+def test_listener_uses_its_own_reddit_instances(tmp_path):
+    class DummyInbox:
+        def mentions(self, **kwargs):
+            return [DummyMention("t1_x", "u/bot_user_1 hi")]
+    class DummyReddit:
+        inbox = DummyInbox()
+    built = []
+    manager = DummyBotManager()
+    manager.bots = manager.bots[:1]
+    def build_reddit_for(username):
+        built.append(username)
+        return DummyReddit()
+    manager.build_reddit_for = build_reddit_for
+    replied_with = []
+    manager.bots[0].reply = lambda target, reddit=None: replied_with.append(reddit) or "comment"
+    config = {"mentions": {"seen_path": str(tmp_path / "seen.db"), "poll_interval": 0}}
+    listener = MentionListener(manager, config, sleep=lambda seconds: None, clock=lambda: 0)
+    listener.run(max_passes=2)
+    assert built == ["bot_user_1"]
+    assert replied_with == [listener.readers["bot_user_1"]]
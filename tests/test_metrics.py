@@ -0,0 +1,41 @@
+import json
+import urllib.request
+import pytest
+from core.metrics import MetricsExporter, MetricsRegistry
+
+def test_time_request_records_latency_and_errors():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    with registry.time_request("reddit", "submit", bot="bot_user_1"):
+        pass
+    with pytest.raises(ValueError):
+        with registry.time_request("openai", "post", bot="bot_user_1"):
+            raise ValueError("bad")
+    snapshot = registry.snapshot()
+    assert {h["labels"]["dependency"] for h in snapshot["histograms"]} == {"reddit", "openai"}
+    errors = [c for c in snapshot["counters"] if c["name"] == "external_request_errors_total"]
+    assert errors[0]["labels"]["kind"] == "ValueError"
+    assert errors[0]["value"] == 1
+
+def test_render_prometheus():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.inc("openai_prompt_tokens_total", 12, bot="bot_user_1", model="gpt")
+    registry.observe("external_request_seconds", 0.5, dependency="openai", operation="post")
+    text = registry.render_prometheus()
+    assert '# TYPE openai_prompt_tokens_total counter' in text
+    assert 'openai_prompt_tokens_total{bot="bot_user_1",model="gpt"} 12' in text
+    assert 'external_request_seconds_bucket{dependency="openai",operation="post",le="0.1"} 0' in text
+    assert 'external_request_seconds_bucket{dependency="openai",operation="post",le="1.0"} 1' in text
+    assert 'external_request_seconds_count{dependency="openai",operation="post"} 1' in text
+
+def test_exporter_serves_and_dumps(tmp_path):
+    registry = MetricsRegistry()
+    registry.inc("commands_total", command="post")
+    json_path = str(tmp_path / "metrics.json")
+    exporter = MetricsExporter(registry, port=0, host="127.0.0.1", json_path=json_path, json_interval=60).start()
+    try:
+        body = urllib.request.urlopen(f"http://127.0.0.1:{exporter.port}/metrics", timeout=5).read().decode()
+    finally:
+        exporter.stop()
+    assert 'commands_total{command="post"} 1' in body
+    with open(json_path) as f:
+        assert json.load(f)["counters"][0]["name"] == "commands_total"
@@ -1,5 +1,6 @@
 import pytest
 import openai
+from openai import api_requestor
 from providers.openai_provider import OpenAIProvider
 
 # DummyResponse mimics the ChatCompletion API response.
@@ -10,7 +11,7 @@ class DummyResponse:
 # Dummy completion function that accepts arbitrary keyword arguments.
 def dummy_completion_create(*args, **kwargs):
     messages = kwargs.get("messages", [])
-    user_message = messages[0]["content"] if messages else ""
+    user_message = messages[-1]["content"] if messages else ""
     if "Post:" in user_message:
         return DummyResponse("Test Title\nTest Body")
     else:
@@ -72,7 +73,7 @@ def test_collect_thread_context():
 def test_generate_reply_content_with_thread(monkeypatch):
     captured_prompts = []
     def dummy_completion_create_capture(*args, **kwargs):
-        captured_prompts.append(kwargs["messages"][0]["content"])
+        captured_prompts.append(kwargs["messages"][-1]["content"])
         return DummyResponse("Test Reply")
     monkeypatch.setattr(openai.ChatCompletion, "create", dummy_completion_create_capture)
     
@@ -102,3 +103,157 @@ def test_generate_reply_content_with_thread(monkeypatch):
     assert "Submission Body" in prompt, f"Prompt does not contain 'Submission Body': {prompt}"
     assert "Comment Body" in prompt, f"Prompt does not contain 'Comment Body': {prompt}"
     assert reply == "Test Reply"
+
+def test_generate_reply_contents_batches(monkeypatch):
+    calls = []
+    def dummy_batch_create(*args, **kwargs):
+        prompt = kwargs["messages"][-1]["content"]
+        calls.append("\n".join(message["content"] for message in kwargs["messages"]))
+        if "JSON array" in prompt:
+            return DummyResponse('["Reply one", "Reply two", "Reply three"]')
+        return DummyResponse("Single Reply")
+    monkeypatch.setattr(openai.ChatCompletion, "create", dummy_batch_create)
+    provider = OpenAIProvider("dummy_key", personality="Test personality", memory="Test memory")
+    class DummyTarget:
+        def __init__(self, body):
+            self.body = body
+    replies = provider.generate_reply_contents([DummyTarget("a"), DummyTarget("b"), DummyTarget("c")])
+    assert replies == ["Reply one", "Reply two", "Reply three"]
+    assert len(calls) == 1
+    assert calls[0].count("Personality: Test personality") == 1
+
+def test_generate_reply_contents_falls_back_on_bad_batch(monkeypatch):
+    calls = []
+    def dummy_batch_create(*args, **kwargs):
+        prompt = kwargs["messages"][-1]["content"]
+        calls.append(prompt)
+        if "JSON array" in prompt:
+            return DummyResponse("Sorry, here are some replies without JSON.")
+        return DummyResponse("Single Reply")
+    monkeypatch.setattr(openai.ChatCompletion, "create", dummy_batch_create)
+    provider = OpenAIProvider("dummy_key")
+    class DummyTarget:
+        body = "Body"
+    replies = provider.generate_reply_contents([DummyTarget(), DummyTarget()])
+    assert replies == ["Single Reply", "Single Reply"]
+    assert len(calls) == 3
+
+def test_generate_reply_contents_isolates_failed_targets(monkeypatch):
+    def dummy_batch_create(*args, **kwargs):
+        prompt = kwargs["messages"][-1]["content"]
+        if "JSON array" in prompt:
+            raise RuntimeError("batch failed")
+        if "Broken body" in prompt:
+            raise RuntimeError("single failed")
+        return DummyResponse("Single Reply")
+    monkeypatch.setattr(openai.ChatCompletion, "create", dummy_batch_create)
+    provider = OpenAIProvider("dummy_key")
+    class DummyTarget:
+        def __init__(self, body):
+            self.body = body
+    replies = provider.generate_reply_contents([DummyTarget("Body"), DummyTarget("Broken body"), DummyTarget("Body")])
+    assert replies == ["Single Reply", None, "Single Reply"]
+
+def test_provider_uses_shared_session_and_timeout(monkeypatch):
+    from core import http_session
+    calls = []
+    def fake_create(*args, **kwargs):
+        calls.append(kwargs.get("request_timeout"))
+        return DummyResponse("Test Title\nTest Body")
+    monkeypatch.setattr(openai.ChatCompletion, "create", fake_create)
+    monkeypatch.setattr(openai, "requestssession", None)
+    monkeypatch.setattr(http_session, "_openai_session", {"factory": None})
+    api_requestor._thread_context.session = "thread-session"
+    factory = lambda: "shared-session"
+    provider = OpenAIProvider("dummy_key", session_factory=factory, request_timeout=(2.0, 30.0))
+    provider.generate_post_content()
+    provider.generate_post_content()
+    assert calls == [(2.0, 30.0), (2.0, 30.0)]
+    assert openai.requestssession is factory
+    # Only openai's public setting is used; its per-thread session cache is left alone.
+    assert api_requestor._thread_context.session == "thread-session"
+    del api_requestor._thread_context.session
+
+def test_static_prefix_is_shared_between_calls(monkeypatch):
+    from core.metrics import REGISTRY
+    REGISTRY.reset()
+    requests = []
+    def dummy_create(*args, **kwargs):
+        requests.append(kwargs["messages"])
+        response = DummyResponse("Test Title\nTest Body")
+        response.usage = {"prompt_tokens": 50, "completion_tokens": 5, "total_tokens": 55,
+                          "prompt_tokens_details": {"cached_tokens": 32}}
+        return response
+    monkeypatch.setattr(openai.ChatCompletion, "create", dummy_create)
+    provider = OpenAIProvider("dummy_key", post_prompt="Test post prompt", personality="Test personality",
+                              memory="Test memory", name="bot_user_1")
+    provider.generate_post_content("First context")
+    provider.generate_post_content("Second context")
+    first, second = requests
+    assert first[:-1] == second[:-1] == provider.post_prefix
+    assert all(message["role"] == "system" for message in provider.post_prefix)
+    assert "Personality: Test personality" in provider.post_prefix[-1]["content"]
+    assert first[-1] == {"role": "user", "content": "Context: First context\n\nPost:"}
+    assert "Test personality" not in second[-1]["content"]
+    prefix = provider.prefix_tokens["post"]
+    assert prefix > 0
+    counters = {c["name"]: c["value"] for c in REGISTRY.snapshot()["counters"] if c["labels"].get("bot") == "bot_user_1"}
+    assert counters["openai_prompt_prefix_tokens_total"] == 2 * prefix
+    assert counters["openai_cached_prompt_tokens_total"] == 64
+
+def test_memory_store_replaces_static_memory(monkeypatch, tmp_path):
+    from core.memory_store import MemoryStore
+    requests = []
+    def dummy_create(*args, **kwargs):
+        requests.append(kwargs["messages"])
+        return DummyResponse("Test Reply")
+    monkeypatch.setattr(openai.ChatCompletion, "create", dummy_create)
+    store = MemoryStore(str(tmp_path / "bot.db"))
+    store.set_notes("I build mechanical keyboards. I bake bread on weekends.")
+    store.add("reply", "Replied to: keyboard switches\nLinear switches are great for gaming")
+    provider = OpenAIProvider("dummy_key", personality="Test personality", memory="unused", memory_store=store, memory_top_k=2)
+    class DummyTarget:
+        body = "What keyboard switches do you recommend?"
+    provider.generate_reply_content(DummyTarget(), 0)
+    messages = requests[0]
+    assert "Memory:" not in messages[1]["content"]
+    assert messages[-1]["content"].startswith("Relevant memories:\n")
+    assert "Linear switches" in messages[-1]["content"] and "mechanical keyboards" in messages[-1]["content"]
+    assert "bake bread" not in messages[-1]["content"]
+
+def test_admission_settles_to_reported_usage(monkeypatch):
+    from core.admission import AdmissionController, BudgetExceeded
+    def dummy_create(*args, **kwargs):
+        response = DummyResponse("Test Title\nTest Body")
+        response.usage = {"prompt_tokens": 40, "completion_tokens": 10, "total_tokens": 50}
+        return response
+    monkeypatch.setattr(openai.ChatCompletion, "create", dummy_create)
+    admission = AdmissionController(bot_limits={"tokens_per_minute": 400}, policy="reject")
+    provider = OpenAIProvider("dummy_key", name="bot_user_1", admission=admission)
+    provider.generate_post_content()
+    assert admission.usage("bot_user_1")["tokens_per_minute"] == 50
+    def failing_create(*args, **kwargs):
+        raise ConnectionError("down")
+    monkeypatch.setattr(openai.ChatCompletion, "create", failing_create)
+    with pytest.raises(ConnectionError):
+        provider.generate_post_content()
+    assert admission.usage("bot_user_1")["tokens_per_minute"] == 50
+    admission.apply_config({"budgets": {"policy": "reject", "per_bot": {"tokens_per_minute": 100}}})
+    with pytest.raises(BudgetExceeded):
+        provider.generate_post_content()
+
+def test_posts_bypass_the_completion_cache(monkeypatch):
+    from providers.completion_cache import CompletionCache
+    calls = []
+    def counting_create(*args, **kwargs):
+        calls.append(kwargs["messages"][-1]["content"])
+        return dummy_completion_create(*args, **kwargs)
+    monkeypatch.setattr(openai.ChatCompletion, "create", counting_create)
+    provider = OpenAIProvider("dummy_key", cache=CompletionCache())
+    provider.generate_post_content()
+    provider.generate_post_content()
+    assert len(calls) == 2
+    target = type("Target", (), {"body": "Nice dragon!"})()
+    provider.generate_reply_content(target, 0)
+    provider.generate_reply_content(target, 0)
+    assert len(calls) == 3
@@ -0,0 +1,47 @@
+import json
+import os
+import time
+import pytest
+from core.metrics import REGISTRY
+from core.profiling import CommandProfiler
+
+def busy(seconds):
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+
+def run_command(bot):
+    with REGISTRY.time_request("reddit", "listing", bot=bot):
+        time.sleep(0.05)
+    with REGISTRY.time_request("openai", "post", bot=bot, model="m"):
+        time.sleep(0.1)
+    # Waits recorded for other bots are not attributed to this command.
+    with REGISTRY.time_request("openai", "post", bot="someone_else", model="m"):
+        pass
+    busy(0.05)
+
+@pytest.mark.parametrize("mode, extension", [("deterministic", ".prof"), ("sampling", ".folded")])
+def test_profiler_writes_profile_and_split_summary(tmp_path, mode, extension):
+    profiler = CommandProfiler(output_dir=str(tmp_path), mode=mode, sample_interval=0.001)
+    with profiler.profile("learn_and_post", bot="bot_user_1"):
+        run_command("bot_user_1")
+    with open(tmp_path / "summary.jsonl") as f:
+        summary = json.loads(f.readline())
+    assert summary["command"] == "learn_and_post"
+    assert summary["network_wait_seconds"] == pytest.approx(0.05, abs=0.03)
+    assert summary["model_wait_seconds"] == pytest.approx(0.1, abs=0.03)
+    assert summary["cpu_seconds"] >= 0.04
+    assert summary["profile"].endswith(extension) and os.path.getsize(summary["profile"]) > 0
+
+def test_bot_profiles_handle_command(tmp_path):
+    from bots.reddit_bot import RedditBot
+    profiler = CommandProfiler(output_dir=str(tmp_path))
+    bot = RedditBot(None, {}, username="bot_user_1", profiler=profiler)
+    assert bot.handle_command("unknown") is None
+    with open(tmp_path / "summary.jsonl") as f:
+        assert json.loads(f.readline())["bot"] == "bot_user_1"
+
+def test_profiler_from_config():
+    assert CommandProfiler.from_config({}) is None
+    profiler = CommandProfiler.from_config({"profiling": {"enabled": True, "mode": "sampling"}})
+    assert profiler.mode == "sampling"
@@ -56,6 +56,8 @@ class DummyCommentForest:
 class DummyAccountManager:
     def get_next_account(self):
         return DummyReddit("dummy_user")
+    def get_identity(self, reddit):
+        return reddit.username
 
 def test_reddit_bot_post(monkeypatch):
     dummy_am = DummyAccountManager()
@@ -114,3 +116,66 @@ def test_reddit_bot_learn_and_post(monkeypatch):
     assert "Post 1 Title" in body
     # Verify that no comment text is present.
     assert "Comment 1 Body" not in body
+
+def test_reddit_bot_reply_many_uses_batch_generation():
+    class BatchContentProvider(DummyContentProvider):
+        def __init__(self):
+            self.batches = []
+        def generate_reply_contents(self, targets, chain_index=0):
+            self.batches.append(len(targets))
+            return [f"Batch Reply {i}" for i in range(len(targets))]
+    provider = BatchContentProvider()
+    config = {"subreddits": ["dummy_subreddit"], "replies": {"chain_length": 1}}
+    bot = RedditBot(DummyAccountManager(), config, content_provider=provider,
+                    reddit_instance=DummyReddit("dummy_user"), username="dummy_user")
+    targets = [DummySubmission(f"Title {i}", "Body") for i in range(3)]
+    comments = bot.handle_command("reply", targets)
+    assert provider.batches == [3]
+    assert [comment.body for comment in comments] == ["Batch Reply 0", "Batch Reply 1", "Batch Reply 2"]
+
+def test_reddit_calls_retry_reads_but_not_submits(monkeypatch):
+    from core.resilience import Resilience, RetryPolicy
+    config = {"subreddits": ["dummy_subreddit"]}
+    bot = RedditBot(DummyAccountManager(), config, content_provider=DummyContentProvider(),
+                    reddit_instance=DummyReddit("dummy_user"))
+    bot.resilience = Resilience("reddit", RetryPolicy(max_attempts=3, random_source=lambda: 0.0), sleep=lambda s: None)
+    attempts = {"submit": 0, "listing": 0}
+    def failing(operation):
+        def fn(*args, **kwargs):
+            attempts[operation] += 1
+            if attempts[operation] < 3:
+                raise ConnectionError("reset by peer")
+            return operation
+        return fn
+    assert bot._reddit_call("listing", failing("listing")) == "listing"
+    assert attempts["listing"] == 3
+    with pytest.raises(ConnectionError):
+        bot._reddit_call("submit", failing("submit"))
+    assert attempts["submit"] == 1
+
+def test_reddit_bot_learn_offline_uses_stored_corpus():
+    class DummyCorpusStore:
+        def load(self, name):
+            return {"posts": [{"title": "Stored Title", "selftext": "Stored Body"}]}
+    class OfflineAccountManager:
+        def get_next_account(self):
+            raise AssertionError("offline learning must not contact Reddit")
+    bot = RedditBot(OfflineAccountManager(), {}, content_provider=DummyContentProvider(), username="dummy_user",
+                    corpus_store=DummyCorpusStore())
+    assert bot.learn("dummy_subreddit", offline=True) == "Post Title: Stored Title\nPost Body: Stored Body\n\n"
+
+def test_reddit_bot_records_posts_and_replies_in_memory():
+    class DummyMemoryStore:
+        def __init__(self):
+            self.entries = []
+        def add(self, kind, content, ref=None):
+            self.entries.append((kind, content))
+    store = DummyMemoryStore()
+    bot = RedditBot(DummyAccountManager(), {"subreddits": ["dummy_subreddit"]}, content_provider=DummyContentProvider(),
+                    reddit_instance=DummyReddit("dummy_user"), username="dummy_user", memory_store=store)
+    bot.post()
+    bot.reply(DummySubmission("Test Title", "Test Body"))
+    assert store.entries == [
+        ("post", "Posted in r/dummy_subreddit: Dummy Title\nDummy Body"),
+        ("reply", "Replied to: Test Title\nDummy Reply"),
+    ]
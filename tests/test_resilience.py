@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+from core.resilience import (CircuitBreaker, CircuitOpenError, Deadline, DeadlineExceeded, Resilience, RetryPolicy,
+                             is_retryable)
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+    def __call__(self):
+        return self.now
+    def sleep(self, seconds):
+        self.now += seconds
+
+class ServerError(Exception):
+    pass
+
+class Forbidden(Exception):
+    pass
+
+def flaky(failures, error=ServerError):
+    calls = []
+    def fn():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error("boom")
+        return "ok"
+    return fn, calls
+
+def test_retry_policy_uses_bounded_full_jitter():
+    policy = RetryPolicy(max_attempts=5, base_delay=1.0, max_delay=3.0, random_source=lambda: 1.0)
+    assert [policy.delay(n) for n in range(1, 5)] == [1.0, 2.0, 3.0, 3.0]
+    assert RetryPolicy(random_source=lambda: 0.0).delay(3) == 0.0
+
+def test_retries_retryable_errors_only():
+    clock = FakeClock()
+    resilience = Resilience("test", RetryPolicy(max_attempts=3, random_source=lambda: 1.0), sleep=clock.sleep, clock=clock)
+    fn, calls = flaky(2)
+    assert resilience.call("op", fn) == "ok"
+    assert len(calls) == 3
+    assert clock.now == pytest.approx(0.5 + 1.0)
+
+    fn, calls = flaky(1, Forbidden)
+    with pytest.raises(Forbidden):
+        resilience.call("op", fn)
+    assert len(calls) == 1
+    assert not is_retryable(Forbidden())
+
+    fn, calls = flaky(1)
+    with pytest.raises(ServerError):
+        resilience.call("submit", fn, idempotent=False)
+    assert len(calls) == 1
+
+def test_deadline_stops_retries():
+    clock = FakeClock()
+    resilience = Resilience("test", RetryPolicy(max_attempts=10, base_delay=4.0, random_source=lambda: 1.0),
+                            deadline=10.0, sleep=clock.sleep, clock=clock)
+    fn, calls = flaky(10)
+    with pytest.raises(ServerError):
+        resilience.call("op", fn)
+    # Waits of 4s and 8s would overrun the 10s deadline, so only one retry happens.
+    assert len(calls) == 2
+    assert Deadline(5.0, clock).cap((10.0, 30.0)) == (5.0, 5.0)
+
+def test_circuit_breaker_opens_and_recovers():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=30.0, clock=clock)
+    resilience = Resilience("test", breaker=breaker, sleep=clock.sleep, clock=clock)
+    for _ in range(2):
+        with pytest.raises(ServerError):
+            resilience.call("op", flaky(1)[0])
+    assert breaker.state == CircuitBreaker.OPEN
+    fn, calls = flaky(0)
+    with pytest.raises(CircuitOpenError):
+        resilience.call("op", fn)
+    assert calls == []
+
+    clock.now += 30
+    assert resilience.call("op", fn) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_half_open_probe_failure_reopens():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10.0, clock=clock)
+    breaker.record_failure()
+    clock.now += 10
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_async_call_is_cancelled_at_deadline():
+    resilience = Resilience("test", RetryPolicy(max_attempts=3), deadline=0.05)
+    async def hang():
+        await asyncio.sleep(10)
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(resilience.acall("op", hang))
@@ -0,0 +1,98 @@
+import pytest
+from core.scheduler import Scheduler, TokenBucket
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+    def __call__(self):
+        return self.now
+    def sleep(self, seconds):
+        self.now += seconds
+
+class DummyAuth:
+    def __init__(self):
+        self.limits = {"remaining": None, "reset_timestamp": None, "used": None}
+
+class DummyReddit:
+    def __init__(self):
+        self.auth = DummyAuth()
+
+class DummyBot:
+    def __init__(self, username):
+        self.username = username
+        self.reddit = DummyReddit()
+
+class DummyBotManager:
+    def __init__(self, usernames):
+        self.bots = [DummyBot(name) for name in usernames]
+        self.calls = []
+        self.clock = None
+    def get_bots(self):
+        return self.bots
+    def execute_command_for_bot(self, bot_username, command, target=None):
+        self.calls.append((self.clock(), bot_username, command, target))
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=0.5, capacity=1, clock=clock)
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.wait_time() == pytest.approx(2.0)
+    clock.now += 2
+    assert bucket.try_acquire()
+
+def test_scheduler_honours_posting_interval():
+    clock = FakeClock()
+    manager = DummyBotManager(["bot_user_1", "bot_user_2"])
+    manager.clock = clock
+    config = {
+        "posting": {"interval": 100},
+        "schedule": [{"command": "learn_and_post", "target": "DnDGreentext"}, {"command": "post"}]
+    }
+    scheduler = Scheduler(manager, config, clock=clock, wall_clock=clock, sleep=clock.sleep)
+    scheduler.run(max_dispatches=6)
+    assert [(round(t), name, cmd) for t, name, cmd, _ in manager.calls] == [
+        (0, "bot_user_1", "learn_and_post"), (0, "bot_user_2", "learn_and_post"),
+        (100, "bot_user_1", "post"), (100, "bot_user_2", "post"),
+        (200, "bot_user_1", "learn_and_post"), (200, "bot_user_2", "learn_and_post"),
+    ]
+
+def test_scheduler_pauses_on_reddit_rate_limit():
+    clock = FakeClock(now=1000.0)
+    manager = DummyBotManager(["bot_user_1"])
+    manager.clock = clock
+    manager.bots[0].reddit.auth.limits = {"remaining": 2, "reset_timestamp": 1300.0, "used": 598}
+    scheduler = Scheduler(manager, {"posting": {"interval": 10}, "scheduler": {"poll_interval": 1000}},
+                          clock=clock, wall_clock=clock, sleep=clock.sleep)
+    scheduler.run(max_dispatches=1)
+    assert manager.calls[0][0] == pytest.approx(1300.0)
+
+def test_scheduler_applies_reloaded_interval():
+    clock = FakeClock()
+    manager = DummyBotManager(["bot_user_1"])
+    manager.clock = clock
+
+    class Watcher:
+        def __init__(self):
+            self.pending = None
+        def poll(self):
+            pending, self.pending = self.pending, None
+            return pending or (None, set())
+
+    watcher = Watcher()
+    manager.apply_config = lambda config, changed: None
+    scheduler = Scheduler(manager, {"posting": {"interval": 100}}, clock=clock, wall_clock=clock,
+                          sleep=clock.sleep, config_watcher=watcher)
+    scheduler.run(max_dispatches=1)
+    watcher.pending = ({"posting": {"interval": 10}}, {"posting"})
+    scheduler.run(max_dispatches=2)
+    assert [round(t) for t, _, _, _ in manager.calls] == [0, 10, 20]
+
+def test_scheduler_only_runs_selected_bots():
+    clock = FakeClock()
+    manager = DummyBotManager(["bot_user_1", "bot_user_2"])
+    manager.clock = clock
+    scheduler = Scheduler(manager, {"posting": {"interval": 100}}, clock=clock, wall_clock=clock,
+                          sleep=clock.sleep, bots=["bot_user_2"])
+    scheduler.run(max_dispatches=2)
+    assert [name for _, name, _, _ in manager.calls] == ["bot_user_2", "bot_user_2"]
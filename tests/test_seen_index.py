@@ -0,0 +1,37 @@
+import pytest
+from core.seen_index import SeenIndex, compact_key
+
+class FakeClock:
+    def __init__(self, now=100000.0):
+        self.now = now
+    def __call__(self):
+        return self.now
+
+def test_compact_key_distinguishes_types():
+    assert compact_key("t1_abc") != compact_key("t3_abc")
+    assert compact_key("t1_abc") == int("abc", 36) << 3 | 1
+
+def test_seen_ids_survive_restart(tmp_path):
+    path = str(tmp_path / "seen.db")
+    seen = SeenIndex(path, owner="bot_user_1")
+    assert seen.add("t1_abc") is True
+    assert seen.add("t1_abc") is False
+    seen.close()
+    reopened = SeenIndex(path, owner="bot_user_1")
+    assert "t1_abc" in reopened
+    assert reopened.add("t1_abc") is False
+    # Indexes are kept per owner.
+    assert "t1_abc" not in SeenIndex(path, owner="bot_user_2")
+
+def test_old_buckets_spill_to_disk_and_expire(tmp_path):
+    clock = FakeClock()
+    seen = SeenIndex(str(tmp_path / "seen.db"), bucket_seconds=10, memory_buckets=2, retention=100, clock=clock)
+    seen.add("t1_old", created=clock.now)
+    clock.now += 30
+    seen.add("t1_new", created=clock.now)
+    # The old id left memory but is still found on disk.
+    assert seen.memory_size() == 1
+    assert "t1_old" in seen
+    clock.now += 200
+    seen.add("t1_newest", created=clock.now)
+    assert "t1_old" not in seen
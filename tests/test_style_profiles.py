@@ -0,0 +1,69 @@
+from bots.reddit_bot import RedditBot
+from core.corpus_store import SubredditCorpusStore
+from core.style_profiles import PROFILE_HEADER, StyleProfileStore
+from providers.local_provider import LocalProvider
+from providers.token_budget import TokenCounter
+
+def make_posts(count, start=0):
+    posts = []
+    for i in range(start, start + count):
+        title = f"How do I tune my telescope mount number {i}?" if i % 2 else f"Saturn through my telescope tonight {i}"
+        body = " ".join(["Clear skies and steady seeing over the observatory, tracking the planets all night."] * 8)
+        posts.append({"fullname": f"t3_{i}", "title": title, "selftext": body, "created_utc": i})
+    posts.reverse()  # newest first, like the corpus window
+    return posts
+
+def raw_context(posts):
+    return "".join(f"Post Title: {post['title']}\nPost Body: {post['selftext']}\n\n" for post in posts)
+
+def test_profile_is_compact_and_describes_the_subreddit(tmp_path):
+    posts = make_posts(50)
+    store = StyleProfileStore(directory=str(tmp_path), token_budget=300)
+    profile = store.build("astronomy", posts)
+    counter = TokenCounter()
+    assert profile.startswith(f"{PROFILE_HEADER} for r/astronomy, from 50 recent post(s):")
+    assert "50% are questions" in profile
+    assert "telescope" in profile and "Post Title: How do I tune my telescope mount number 49?" in profile
+    assert counter.count(profile) <= 300
+    assert counter.count(profile) * 10 < counter.count(raw_context(posts))
+
+def test_profile_is_cached_until_enough_new_posts_arrive(tmp_path):
+    now = [1000.0]
+    store = StyleProfileStore(directory=str(tmp_path), refresh_after=5, max_age=3600, clock=lambda: now[0])
+    posts = make_posts(20)
+    first = store.get("astronomy", posts)
+    builds = []
+    original_build = store.build
+    store.build = lambda name, window: builds.append(len(window)) or original_build(name, window)
+    assert store.get("astronomy", make_posts(4, start=20) + posts) == first
+    assert builds == []
+    store.get("astronomy", make_posts(5, start=20) + posts)
+    assert builds == [25]
+    now[0] += 3600
+    store.get("astronomy", make_posts(5, start=20) + posts)
+    assert builds == [25, 25]
+    assert store.load("astronomy")["anchor"] == "t3_24"
+
+def test_learn_returns_style_profile_from_the_corpus_window(tmp_path):
+    corpus_store = SubredditCorpusStore(directory=str(tmp_path / "corpus"))
+    corpus_store._save("astronomy", {"posts": make_posts(30), "full_refresh_at": 0})
+    config = {"learning": {"context_posts": 2}}
+    bot = RedditBot(None, config, username="bot_user_1", corpus_store=corpus_store)
+    assert bot.learn("astronomy", offline=True).count("Post Title:") == 2
+    bot.style_profiles = StyleProfileStore(directory=str(tmp_path / "profiles"))
+    profile = bot.learn("astronomy", offline=True)
+    assert profile.startswith(PROFILE_HEADER) and "from 30 recent post(s)" in profile
+
+def test_local_provider_trains_on_profile_examples_only(tmp_path):
+    profile = StyleProfileStore(directory=str(tmp_path)).build("astronomy", make_posts(10))
+    provider = LocalProvider(seed=1)
+    text = provider._training_text(profile)
+    assert "Saturn through my telescope" in text
+    assert "are questions" not in text and "Post Title:" not in text
+
+def test_profile_omits_example_label_when_no_example_fits(tmp_path):
+    store = StyleProfileStore(directory=str(tmp_path), token_budget=300)
+    header_only = store.build("astronomy", make_posts(10)).split("Example posts:")[0]
+    store.token_budget = TokenCounter().count(header_only) + 5
+    profile = store.build("astronomy", make_posts(10))
+    assert "Example posts:" not in profile and profile == header_only
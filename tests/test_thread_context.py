@@ -0,0 +1,69 @@
+import pytest
+from providers.thread_context import ThreadContextBuilder
+
+class DummyComment:
+    def __init__(self, comment_id, body, parent_id, submission=None):
+        self.id = comment_id
+        self.fullname = f"t1_{comment_id}"
+        self.body = body
+        self.parent_id = parent_id
+        self.link_id = "t3_sub"
+        self.submission = submission
+        self.parent_calls = 0
+    def parent(self):
+        self.parent_calls += 1
+        raise AssertionError("parent() should not be needed when the tree is indexed")
+
+class DummyForest:
+    def __init__(self, comments):
+        self._comments = comments
+        self.fetches = 0
+    def replace_more(self, limit):
+        self.fetches += 1
+    def list(self):
+        return list(self._comments)
+
+class DummySubmission:
+    title = "Submission Title"
+    selftext = "Submission Body"
+    def __init__(self):
+        self.comments = DummyForest([])
+
+def build_chain(depth):
+    submission = DummySubmission()
+    comments = []
+    parent_id = "t3_sub"
+    for i in range(depth):
+        comment = DummyComment(f"c{i}", f"Comment {i}", parent_id, submission)
+        comments.append(comment)
+        parent_id = comment.fullname
+    submission.comments._comments = comments
+    return submission, comments
+
+def test_deep_chain_uses_one_tree_fetch():
+    submission, comments = build_chain(15)
+    builder = ThreadContextBuilder()
+    context = builder.build(comments[-1])
+    expected = ["Post Title: Submission Title\nPost Body: Submission Body"] + [f"Comment {i}" for i in range(15)]
+    assert context == "\n\n".join(expected)
+    assert submission.comments.fetches == 1
+
+def test_sibling_replies_reuse_index():
+    submission, comments = build_chain(5)
+    sibling = DummyComment("sibling", "Sibling", comments[3].fullname, submission)
+    builder = ThreadContextBuilder()
+    builder.build(comments[-1])
+    context = builder.build(sibling)
+    assert context.endswith("Comment 3\n\nSibling")
+    assert submission.comments.fetches == 1
+
+def test_falls_back_to_parent_without_submission():
+    class Submission:
+        title = "T"
+        selftext = "B"
+    class Comment:
+        parent_id = "t1_x"
+        body = "Reply"
+        def parent(self):
+            return Submission()
+    assert ThreadContextBuilder().build(Comment()) == "Post Title: T\nPost Body: B\n\nReply"
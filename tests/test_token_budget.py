@@ -0,0 +1,42 @@
+import pytest
+from providers.token_budget import (OMITTED_MARKER, TokenCounter, budget_learned_context,
+                                    budget_thread_parts, fit_parts)
+
+class WordCounter(TokenCounter):
+    """Counts one token per word, so budgets are easy to reason about."""
+    def _count(self, text):
+        return len(text.split())
+    def truncate(self, text, max_tokens):
+        return " ".join(text.split()[:max_tokens])
+
+def test_fit_parts_respects_priority():
+    counter = WordCounter()
+    parts = ["a a a", "b b", "c c c c"]
+    kept, dropped = fit_parts(counter, parts, budget=5, priority=[2, 0, 1], min_partial_tokens=1)
+    assert kept == {2: "c c c c", 0: "a"}
+    assert dropped == 4
+
+def test_thread_keeps_submission_and_nearest_parents():
+    counter = WordCounter()
+    parts = ["submission " * 5, "far " * 20, "middle " * 20, "parent " * 5, "target " * 5]
+    parts = [part.strip() for part in parts]
+    result, dropped = budget_thread_parts(counter, parts, budget=20)
+    assert result[0] == parts[0]
+    assert result[1] == OMITTED_MARKER
+    assert result[-2:] == [parts[3], parts[4]]
+    assert dropped == 40
+
+def test_learned_context_keeps_newest_posts():
+    counter = WordCounter()
+    context = "".join(f"Post Title: T{i}\nPost Body: {'word ' * 10}\n\n" for i in range(5))
+    trimmed, dropped = budget_learned_context(counter, context, budget=30)
+    assert trimmed.startswith("Post Title: T0")
+    assert "T1" in trimmed
+    assert "T3" not in trimmed
+    assert dropped > 0
+
+def test_default_counter_is_cached():
+    counter = TokenCounter()
+    assert counter.count("hello world") > 0
+    counter.count("hello world")
+    assert counter.count.cache_info().hits >= 1